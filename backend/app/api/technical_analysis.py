@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from typing import Dict, Any, List
 import logging
 from ..services.technical_analysis import technical_analysis_service
@@ -35,6 +36,27 @@ async def get_technical_analysis(
         logger.error(f"Error fetching technical analysis for {ticker}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch technical analysis for {ticker}")
 
+@router.get("/valuation/{ticker}/technical-analysis/ai-summary/stream")
+async def stream_technical_ai_summary(
+    ticker: str,
+    period: str = Query(default="1y", regex="^(3mo|6mo|1y|3y)$")
+):
+    """Stream the Claude technical commentary as it is generated"""
+    tech_data = technical_analysis_service.get_technical_analysis(ticker, period)
+    if not tech_data:
+        raise HTTPException(status_code=404, detail=f"Technical analysis data not found for ticker: {ticker}")
+    
+    # Initialize fresh Claude service to get latest API keys
+    claude_service = ClaudeService()
+    if not claude_service.is_available():
+        raise HTTPException(status_code=503, detail="Claude service not available")
+    
+    return StreamingResponse(
+        claude_service.technical_analyst_agent_stream(tech_data.get('indicator_values', {}), ticker),
+        media_type="text/plain",
+        headers={"Cache-Control": "no-cache"}
+    )
+
 async def generate_ai_summary(data: Dict[str, Any], ticker: str) -> str:
     """Generate AI-powered summary for technical analysis using Claude"""
     try:
@@ -419,55 +419,42 @@ async def get_corporate_governance(ticker: str) -> Dict[str, Any]:
     try:
         logger.info(f"Fetching corporate governance for {ticker}")
         
-        # Get comprehensive corporate governance analysis
-        governance = await corporate_governance_service.get_corporate_governance_analysis(ticker)
+        # Get comprehensive corporate governance analysis as a JSON-ready dict
+        governance = await corporate_governance_service.get_corporate_governance_analysis(ticker, raw=True)
         
         # Convert to frontend format
         response = {
-            "ticker": governance.ticker,
-            "company_name": governance.company_name,
-            "analysis_date": governance.analysis_date.isoformat() if hasattr(governance.analysis_date, 'isoformat') else str(governance.analysis_date),
+            "ticker": governance["ticker"],
+            "company_name": governance["company_name"],
+            "analysis_date": governance["analysis_date"],
             
             # Shareholding pattern
-            "latest_shareholding": {
-                "date": governance.latest_shareholding.date.isoformat() if governance.latest_shareholding else None,
-                "promoter_percentage": governance.latest_shareholding.promoter_percentage if governance.latest_shareholding else 0,
-                "fii_percentage": governance.latest_shareholding.fii_percentage if governance.latest_shareholding else 0,
-                "dii_percentage": governance.latest_shareholding.dii_percentage if governance.latest_shareholding else 0,
-                "public_percentage": governance.latest_shareholding.public_percentage if governance.latest_shareholding else 0,
-                "pledged_percentage": governance.latest_shareholding.pledged_percentage if governance.latest_shareholding else 0
-            } if governance.latest_shareholding else None,
+            "latest_shareholding": governance["latest_shareholding"],
             
             # Dividend history
             "dividend_history": [
                 {
-                    "ex_date": dividend.ex_date.isoformat(),
-                    "dividend_per_share": dividend.dividend_per_share,
-                    "dividend_type": dividend.dividend_type
+                    "ex_date": dividend["ex_date"],
+                    "dividend_per_share": dividend["dividend_per_share"],
+                    "dividend_type": dividend["dividend_type"]
                 }
-                for dividend in governance.dividend_history
+                for dividend in governance["dividend_history"]
             ],
             
             # Financial metrics
-            "dividend_yield_ttm": governance.dividend_yield_ttm,
-            "dividend_payout_ratio": governance.dividend_payout_ratio,
+            "dividend_yield_ttm": governance["dividend_yield_ttm"],
+            "dividend_payout_ratio": governance["dividend_payout_ratio"],
             
             # Governance metrics
-            "governance_metrics": {
-                "promoter_stability_score": governance.governance_metrics.promoter_stability_score,
-                "pledging_risk_score": governance.governance_metrics.pledging_risk_score,
-                "dividend_consistency_score": governance.governance_metrics.dividend_consistency_score,
-                "transparency_score": governance.governance_metrics.transparency_score,
-                "overall_governance_score": governance.governance_metrics.overall_governance_score
-            },
+            "governance_metrics": governance["governance_metrics"],
             
             # Content summary
-            "simple_mode_summary": governance.simple_mode_summary,
-            "agentic_mode_interpretation": governance.agentic_mode_interpretation,
+            "simple_mode_summary": governance["simple_mode_summary"],
+            "agentic_mode_interpretation": governance["agentic_mode_interpretation"],
             
             # Data quality
-            "data_warnings": governance.data_warnings,
-            "last_updated": governance.last_updated.isoformat() if hasattr(governance.last_updated, 'isoformat') else str(governance.last_updated)
+            "data_warnings": governance["data_warnings"],
+            "last_updated": governance["last_updated"]
         }
         
         logger.info(f"Corporate governance analysis completed for {ticker}")
@@ -16,7 +16,7 @@ router = APIRouter(prefix="/api/valuation", tags=["valuation"])
 async def get_financial_data(ticker: str, years: int = 5):
     """Get historical financial data for DCF analysis"""
     try:
-        financial_data = DataService.get_financial_data(ticker, years)
+        financial_data = await DataService.get_financial_data_cached(ticker, years)
         if not financial_data:
             raise HTTPException(status_code=404, detail=f"Financial data not found for ticker: {ticker}")
         return financial_data
@@ -47,7 +47,7 @@ async def get_dcf_defaults(ticker: str, sector: str = Query(None, description="S
         # Fallback to DataService if enhanced service fails
         if not financial_data:
             logger.info(f"Using DataService fallback for {ticker}")
-            financial_data = DataService.get_financial_data(ticker)
+            financial_data = await DataService.get_financial_data_cached(ticker)
         
         if not financial_data:
             # Generate mock defaults for demonstration
@@ -70,7 +70,7 @@ async def calculate_dcf_valuation(ticker: str, assumptions: DCFAssumptions):
         logger.info(f"DCF calculation request for {ticker} with assumptions: {assumptions}")
         
         # Fetch financial data
-        financial_data = DataService.get_financial_data(ticker)
+        financial_data = await DataService.get_financial_data_cached(ticker)
         if not financial_data:
             logger.error(f"No financial data found for ticker: {ticker}")
             raise HTTPException(status_code=404, detail=f"Financial data not found for ticker: {ticker}")
@@ -122,7 +122,7 @@ async def quick_dcf_valuation(
     """Quick DCF calculation with optional parameter overrides"""
     try:
         # Get financial data and defaults
-        financial_data = DataService.get_financial_data(ticker)
+        financial_data = await DataService.get_financial_data_cached(ticker)
         if not financial_data:
             raise HTTPException(status_code=404, detail=f"Financial data not found for ticker: {ticker}")
         
@@ -160,7 +160,7 @@ async def get_sensitivity_analysis(ticker: str):
     """Get sensitivity analysis using default assumptions"""
     try:
         # Get financial data and defaults
-        financial_data = DataService.get_financial_data(ticker)
+        financial_data = await DataService.get_financial_data_cached(ticker)
         if not financial_data:
             raise HTTPException(status_code=404, detail=f"Financial data not found for ticker: {ticker}")
         
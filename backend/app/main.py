@@ -22,6 +22,7 @@ from .routers.valuation_models import router as valuation_models_router
 from .api.enhanced_company import router as enhanced_company_router
 # from .api.enhanced_valuation import router as enhanced_valuation_router
 from .services.enhanced_data_service import get_enhanced_data_service
+from .services.claude_service import close_http_client
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -173,6 +174,11 @@ async def startup_event():
     
     logger.info("EquityScope API startup complete")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled connections on shutdown"""
+    await close_http_client()
+
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """Custom HTTP exception handler"""
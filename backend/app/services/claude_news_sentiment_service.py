@@ -3,9 +3,12 @@
 
 import logging
 import asyncio
+import hashlib
+import json
+import time
 from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 
 from .claude_service import claude_service
 from .intelligent_cache import intelligent_cache, CacheType
@@ -39,6 +42,9 @@ class ClaudeNewsSentimentService:
     
     def __init__(self):
         self.cache_duration = timedelta(hours=6)  # Cache sentiment for 6 hours
+        self.conditional_refresh_window = timedelta(hours=24)  # Reuse unchanged-context sentiment on force refresh
+        self.claude_health_ttl = 30.0  # Seconds between Claude availability probes
+        self._claude_ok_until = 0.0  # Monotonic deadline of the last successful probe
         self.sector_themes = {
             "ENERGY": {
                 "positive": ["renewable transition progress", "strong energy demand", "commodity price recovery"],
@@ -83,12 +89,20 @@ class ClaudeNewsSentimentService:
             NewsSentiment with Claude-generated headlines and contextual analysis
         """
         try:
+            context_hash = self._hash_context(context)
+            
             # Check cache first
             if not force_refresh:
                 cached_sentiment = await self._get_cached_sentiment(context.ticker)
                 if cached_sentiment:
                     logger.info(f"Cache hit for {context.ticker} sentiment analysis")
                     return cached_sentiment
+            else:
+                # Conditional refresh: skip Claude if the context hasn't moved
+                revalidated = await self._revalidate_cached_sentiment(context.ticker, context_hash)
+                if revalidated:
+                    logger.info(f"Context unchanged for {context.ticker}, reusing cached sentiment")
+                    return revalidated
             
             logger.info(f"Generating Claude-based sentiment analysis for {context.company_name} ({context.ticker})")
             
@@ -105,7 +119,7 @@ class ClaudeNewsSentimentService:
             )
             
             # Cache the result
-            await self._cache_sentiment(context.ticker, news_sentiment)
+            await self._cache_sentiment(context.ticker, news_sentiment, context_hash)
             
             logger.info(f"Generated {sentiment_analysis['sentiment_label']} sentiment ({sentiment_analysis['sentiment_score']:.3f}) for {context.ticker}")
             return news_sentiment
@@ -158,30 +172,29 @@ class ClaudeNewsSentimentService:
         """
         
         try:
-            # Check if Claude service is available and re-initialize if needed
-            if not claude_service.is_available():
-                logger.warning(f"Claude service not available, reinitializing...")
-                claude_service._initialize_client()
-            
-            if not claude_service.is_available():
+            if not self._ensure_claude_available():
                 logger.warning(f"Claude service still not available after reinitialize, using fallback")
                 return self._generate_sector_based_sentiment(context)
             
             # Get Claude analysis using generate_completion
-            claude_response = await claude_service.generate_completion(
-                prompt=prompt,
-                system_prompt="You are a financial news analyst. Generate realistic news sentiment analysis in valid JSON format.",
-                max_tokens=1000,
-                temperature=0.7
-            )
+            try:
+                claude_response = await claude_service.generate_completion(
+                    prompt=prompt,
+                    system_prompt="You are a financial news analyst. Generate realistic news sentiment analysis in valid JSON format.",
+                    max_tokens=1000,
+                    temperature=0.7
+                )
+            except Exception:
+                self._claude_ok_until = 0.0
+                raise
             
             # Parse Claude response (it's text, need to extract JSON)
             if not claude_response:
+                self._claude_ok_until = 0.0
                 logger.warning(f"Empty response from Claude for {context.ticker}")
                 return self._generate_sector_based_sentiment(context)
             
             # Try to extract JSON from text response
-            import json
             try:
                 # Claude might return JSON wrapped in markdown code blocks
                 text_response = claude_response.strip()
@@ -191,11 +204,12 @@ class ClaudeNewsSentimentService:
                     text_response = text_response.replace("```", "").strip()
                 
                 sentiment_data = json.loads(text_response)
-                logger.info(f"Successfully parsed Claude sentiment data for {context.ticker}: {sentiment_data}")
+                logger.debug("Parsed Claude sentiment for %s", context.ticker)
                 
             except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse Claude JSON response for {context.ticker}: {e}")
-                logger.error(f"Raw Claude response: {claude_response[:500]}...")
+                logger.error("Failed to parse Claude JSON for %s: %s", context.ticker, e)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Raw Claude response: %s...", claude_response[:500])
                 return self._generate_sector_based_sentiment(context)
             
             # Validate and process sentiment score
@@ -222,6 +236,26 @@ class ClaudeNewsSentimentService:
             # Fallback to intelligent sector-based sentiment
             return self._generate_sector_based_sentiment(context)
     
+    def _ensure_claude_available(self) -> bool:
+        """
+        Check Claude availability, re-initializing the client if needed.
+        
+        A healthy result is trusted for ``claude_health_ttl`` seconds so the
+        probe doesn't run on every request.
+        """
+        if time.monotonic() < self._claude_ok_until:
+            return True
+        
+        if not claude_service.is_available():
+            logger.warning(f"Claude service not available, reinitializing...")
+            claude_service._initialize_client()
+            
+            if not claude_service.is_available():
+                return False
+        
+        self._claude_ok_until = time.monotonic() + self.claude_health_ttl
+        return True
+    
     def _generate_sector_based_sentiment(self, context: SentimentContext) -> Dict[str, Any]:
         """Generate sector-based sentiment when Claude fails"""
         
@@ -301,30 +335,74 @@ class ClaudeNewsSentimentService:
             last_updated=datetime.now()
         )
     
-    async def _get_cached_sentiment(self, ticker: str) -> Optional[NewsSentiment]:
-        """Retrieve cached sentiment analysis"""
+    def _hash_context(self, context: SentimentContext) -> str:
+        """Fingerprint the sentiment context so unchanged fundamentals can skip regeneration"""
+        context_json = json.dumps(asdict(context), sort_keys=True, default=str)
+        return hashlib.blake2b(context_json.encode(), digest_size=16).hexdigest()
+    
+    async def _get_cached_entry(self, ticker: str) -> Optional[Dict[str, Any]]:
+        """Retrieve the raw cached sentiment entry"""
         try:
-            cached_data = await intelligent_cache.get(
+            return await intelligent_cache.get(
                 cache_type=CacheType.AI_INSIGHTS,
                 identifier=ticker,
                 analysis_type="claude_sentiment"
             )
-            
+        except Exception as e:
+            logger.error(f"Error retrieving cached sentiment for {ticker}: {e}")
+            return None
+    
+    def _sentiment_from_cache(self, cached_data: Dict[str, Any]) -> NewsSentiment:
+        """Rebuild NewsSentiment from a cached entry"""
+        return NewsSentiment(
+            headlines=cached_data["headlines"],
+            sentiment_score=cached_data["sentiment_score"],
+            sentiment_label=cached_data["sentiment_label"],
+            news_count=cached_data["news_count"],
+            last_updated=datetime.fromisoformat(cached_data["last_updated"])
+        )
+    
+    async def _get_cached_sentiment(self, ticker: str) -> Optional[NewsSentiment]:
+        """Retrieve cached sentiment analysis"""
+        try:
+            cached_data = await self._get_cached_entry(ticker)
             if cached_data:
-                return NewsSentiment(
-                    headlines=cached_data["headlines"],
-                    sentiment_score=cached_data["sentiment_score"],
-                    sentiment_label=cached_data["sentiment_label"],
-                    news_count=cached_data["news_count"],
-                    last_updated=datetime.fromisoformat(cached_data["last_updated"])
-                )
+                return self._sentiment_from_cache(cached_data)
             return None
             
         except Exception as e:
             logger.error(f"Error retrieving cached sentiment for {ticker}: {e}")
             return None
     
-    async def _cache_sentiment(self, ticker: str, sentiment: NewsSentiment) -> bool:
+    async def _revalidate_cached_sentiment(self, ticker: str, context_hash: str) -> Optional[NewsSentiment]:
+        """
+        Reuse cached sentiment when the context hash matches and the entry is recent.
+        
+        Only ``last_updated`` is bumped; no Claude call is made.
+        """
+        try:
+            cached_data = await self._get_cached_entry(ticker)
+            if not cached_data or cached_data.get("context_hash") != context_hash:
+                return None
+            
+            cached_sentiment = self._sentiment_from_cache(cached_data)
+            if datetime.now() - cached_sentiment.last_updated >= self.conditional_refresh_window:
+                return None
+            
+            cached_sentiment.last_updated = datetime.now()
+            await self._cache_sentiment(ticker, cached_sentiment, context_hash)
+            return cached_sentiment
+            
+        except Exception as e:
+            logger.error(f"Error revalidating cached sentiment for {ticker}: {e}")
+            return None
+    
+    async def _cache_sentiment(
+        self,
+        ticker: str,
+        sentiment: NewsSentiment,
+        context_hash: Optional[str] = None
+    ) -> bool:
         """Cache sentiment analysis result"""
         try:
             cache_data = {
@@ -332,7 +410,8 @@ class ClaudeNewsSentimentService:
                 "sentiment_score": sentiment.sentiment_score,
                 "sentiment_label": sentiment.sentiment_label,
                 "news_count": sentiment.news_count,
-                "last_updated": sentiment.last_updated.isoformat()
+                "last_updated": sentiment.last_updated.isoformat(),
+                "context_hash": context_hash
             }
             
             success = await intelligent_cache.set(
@@ -1,180 +1,217 @@
 import os
+import sys
+import re
+import zlib
+import asyncio
 import logging
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple, Union, AsyncIterator
 import anthropic
-from anthropic import Anthropic
+import httpx
+from anthropic import AsyncAnthropic
+import hashlib
 import json
+import uuid
+import copy
+import math
+import orjson
+import numpy as np
+from cachetools import TTLCache
 from datetime import datetime, timedelta
 from functools import lru_cache
+from types import MappingProxyType
 from ..api.settings import get_user_api_keys
 from .intelligent_cache import intelligent_cache, CacheType
 
 logger = logging.getLogger(__name__)
 
-class ClaudeService:
-    """Service for interacting with Claude AI for agentic workflow."""
+DEFAULT_CLAUDE_MODEL = "claude-3-haiku-20240307"
+
+# Messages API output-token ceiling per model; requests above it are rejected outright
+MODEL_MAX_OUTPUT_TOKENS = MappingProxyType({
+    "claude-3-haiku-20240307": 4096,
+    "claude-3-sonnet-20240229": 4096,
+    "claude-3-opus-20240229": 4096,
+    "claude-3-5-haiku-20241022": 8192,
+    "claude-3-5-sonnet-20241022": 8192,
+})
+
+def _max_output_tokens(model: str) -> int:
+    """Output-token ceiling for model, assuming the Claude 3 limit for unlisted models."""
+    return MODEL_MAX_OUTPUT_TOKENS.get(model, 4096)
+
+# Process-wide cap on in-flight Claude requests across every ClaudeService instance (tier rate limits)
+CLAUDE_MAX_CONCURRENCY = int(os.getenv("CLAUDE_MAX_CONCURRENCY", "8"))
+_request_semaphore = asyncio.Semaphore(CLAUDE_MAX_CONCURRENCY)
+
+# Pool limits for the process-wide HTTP/2 connection to the Anthropic API
+_HTTP_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16)
+_http_client: Optional[httpx.AsyncClient] = None
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Process-wide pooled HTTP/2 client, shared by every ClaudeService instance."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = anthropic.DefaultAsyncHttpxClient(http2=True, limits=_HTTP_LIMITS)
+    return _http_client
+
+async def close_http_client() -> None:
+    """Close pooled connections to the Anthropic API (application shutdown)."""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+# Bump when the agentic batch system prompts change so cached responses are invalidated
+PROMPT_VERSION = "v4"
+
+# Persistent cache TTLs for agent responses, keyed by agent name
+AGENT_CACHE_TTLS = {
+    "generator": timedelta(hours=24),
+    "checker": timedelta(hours=24),
+    "bull_commentator": timedelta(hours=24),
+    "bear_commentator": timedelta(hours=24),
+    "technical_analyst": timedelta(hours=1),
+    "news_sentiment": timedelta(hours=6),
+}
+
+_JSON_DECODER = json.JSONDecoder()
+
+# Messages API usage counters tracked for cost reporting
+_USAGE_FIELDS = ("input_tokens", "output_tokens", "cache_creation_input_tokens", "cache_read_input_tokens")
+
+# Claude-3-Haiku pricing per token, in _USAGE_FIELDS order: $0.25 per 1M input tokens,
+# $1.25 per 1M output tokens; prompt-cache writes bill at 1.25x and reads at 0.1x the input rate
+_USAGE_PRICES = np.array([0.25, 1.25, 0.25 * 1.25, 0.25 * 0.1]) / 1000000
+
+def _dumps_for_prompt(data: Any) -> str:
+    """Serialize an agent's output for embedding in the next agent's prompt."""
+    return orjson.dumps(data).decode()
+
+# str.translate table deleting C0/C1 control characters from Claude responses
+_CONTROL_CHARS = dict.fromkeys([*range(0x00, 0x20), *range(0x7f, 0xa0)])
+
+# Display names for the most-analysed Indian tickers
+_TICKER_TO_NAME = MappingProxyType({
+    'RELIANCE.NS': 'Reliance Industries Limited',
+    'TCS.NS': 'Tata Consultancy Services',
+    'HDFCBANK.NS': 'HDFC Bank Limited',
+    'INFY.NS': 'Infosys Limited',
+    'ICICIBANK.NS': 'ICICI Bank Limited',
+    'HINDUNILVR.NS': 'Hindustan Unilever Limited',
+    'ITC.NS': 'ITC Limited',
+    'SBIN.NS': 'State Bank of India',
+    'BHARTIARTL.NS': 'Bharti Airtel Limited',
+    'KOTAKBANK.NS': 'Kotak Mahindra Bank Limited'
+})
+
+class _JsonObjectScanner:
+    """Accumulates streamed text and reports when the first top-level JSON object closes."""
     
     def __init__(self):
-        self.client = None
-        self._initialize_client()
-        self._setup_company_references()
-    
-    def _initialize_client(self):
-        """Initialize Claude client with API key from user settings only."""
-        try:
-            # Get API keys from user settings only (no environment fallback)
-            api_keys = get_user_api_keys()
-            claude_api_key = api_keys.get('claude_api_key')
-            
-            logger.info(f"🔍 Claude initialization - API keys retrieved: {list(api_keys.keys())}")
-            logger.info(f"🔍 Claude initialization - Claude key present: {bool(claude_api_key)}")
-            if claude_api_key:
-                logger.info(f"🔍 Claude initialization - Key length: {len(claude_api_key)}")
-            
-            if claude_api_key:
-                self.client = Anthropic(api_key=claude_api_key)
-                logger.info("✅ Claude client initialized successfully with user-provided key")
-            else:
-                logger.warning("❌ Claude API key not configured in settings panel - AI features disabled")
-                self.client = None
-                
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize Claude client: {e}")
-            self.client = None
+        self.parts: List[str] = []
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
     
-    def _setup_company_references(self):
-        """Set up reference companies for benchmarking and context."""
-        # Top 30 Global Companies by Market Cap (for benchmarking context)
-        self.top_global_companies = {
-            'Technology': ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 'META', 'NVDA', 'ADBE', 'CRM', 'ORCL'],
-            'Financial': ['BRK-A', 'JPM', 'V', 'MA', 'BAC', 'WFC', 'GS', 'MS', 'AXP', 'C'],
-            'Healthcare': ['JNJ', 'UNH', 'PFE', 'ABBV', 'TMO', 'ABT', 'LLY', 'MRK', 'DHR', 'BMY'],
-            'Consumer': ['PG', 'HD', 'KO', 'PEP', 'WMT', 'MCD', 'NKE', 'SBUX', 'TGT', 'LOW'],
-            'Industrial': ['HON', 'UPS', 'CAT', 'BA', 'GE', 'MMM', 'LMT', 'RTX', 'DE', 'EMR'],
-            'Energy': ['XOM', 'CVX', 'COP', 'EOG', 'SLB', 'PSX', 'VLO', 'MPC', 'OXY', 'HAL']
-        }
-        
-        # Top 30 Indian Companies by Market Cap (for domestic benchmarking)
-        self.top_indian_companies = {
-            'Technology': ['TCS.NS', 'INFY.NS', 'HCLTECH.NS', 'WIPRO.NS', 'TECHM.NS', 'LTI.NS'],
-            'Financial': ['HDFCBANK.NS', 'ICICIBANK.NS', 'KOTAKBANK.NS', 'SBIN.NS', 'AXISBANK.NS', 'INDUSINDBK.NS'],
-            'Energy': ['RELIANCE.NS', 'ONGC.NS', 'IOC.NS', 'BPCL.NS', 'HINDPETRO.NS', 'GAIL.NS', 'NTPC.NS'],
-            'Consumer': ['HINDUNILVR.NS', 'ITC.NS', 'NESTLEIND.NS', 'BRITANNIA.NS', 'DABUR.NS', 'GODREJCP.NS'],
-            'Automotive': ['MARUTI.NS', 'TATAMOTORS.NS', 'M&M.NS', 'BAJAJ-AUTO.NS', 'EICHERMOT.NS', 'HEROMOTOCO.NS'],
-            'Pharma': ['SUNPHARMA.NS', 'DRREDDY.NS', 'CIPLA.NS', 'DIVISLAB.NS', 'BIOCON.NS', 'LUPIN.NS'],
-            'Industrial': ['LT.NS', 'ULTRACEMCO.NS', 'ASIANPAINT.NS', 'TITAN.NS', 'BHARTIARTL.NS', 'ADANIPORTS.NS'],
-            'Materials': ['COALINDIA.NS', 'HINDALCO.NS', 'TATASTEEL.NS', 'JSW.NS', 'VEDL.NS', 'NMDC.NS']
-        }
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
     
-    def _get_industry_context(self, sector: str, ticker: str) -> str:
-        """Get industry context and peer companies for benchmarking."""
-        is_indian = ticker.endswith('.NS')
-        
-        # Find relevant peer companies
-        peers = []
-        if is_indian:
-            for industry, companies in self.top_indian_companies.items():
-                if any(company in companies for company in [ticker]):
-                    peers = [c for c in companies if c != ticker][:5]
-                    break
-            
-            if not peers and sector:
-                # Try to match by sector name
-                sector_mapping = {
-                    'Technology': 'Technology',
-                    'Financial Services': 'Financial',
-                    'Energy': 'Energy',
-                    'Consumer Defensive': 'Consumer',
-                    'Consumer Cyclical': 'Consumer',
-                    'Healthcare': 'Pharma',
-                    'Industrials': 'Industrial',
-                    'Basic Materials': 'Materials'
-                }
-                industry_key = sector_mapping.get(sector, 'Technology')
-                peers = self.top_indian_companies.get(industry_key, [])[:5]
-        else:
-            # Global company
-            for industry, companies in self.top_global_companies.items():
-                if any(company in companies for company in [ticker.replace('.NS', '')]):
-                    peers = [c for c in companies if c != ticker.replace('.NS', '')][:5]
-                    break
-        
-        context = f"""
-INDUSTRY CONTEXT & PEER BENCHMARKING:
-Sector: {sector}
-Geographic Focus: {'Indian Market' if is_indian else 'Global Market'}
-Key Peer Companies: {', '.join(peers) if peers else 'N/A'}
+    def feed(self, chunk: str) -> bool:
+        """Add a text delta; True once braces balance after the opening '{'."""
+        self.parts.append(chunk)
+        for char in chunk:
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = self.started
+            elif char == '{':
+                self.started = True
+                self.depth += 1
+            elif char == '}' and self.started:
+                self.depth -= 1
+                if self.depth == 0:
+                    return True
+        return False
 
-When analyzing this company, consider:
-1. How it compares to these industry leaders in terms of scale, efficiency, and growth
-2. Industry-specific challenges and opportunities
-3. Competitive positioning relative to top {'domestic' if is_indian else 'global'} peers
-4. Market dynamics and competitive landscape trends
-        """
-        
-        return context
-    
-    def reinitialize_client(self):
-        """Reinitialize Claude client with updated API keys."""
-        self._initialize_client()
-    
-    def is_available(self) -> bool:
-        """Check if Claude service is available."""
-        return self.client is not None
+# yfinance sector -> Indian reference industry, used when a ticker isn't in the peer tables
+INDIAN_SECTOR_TO_INDUSTRY = {
+    'Technology': 'Technology',
+    'Financial Services': 'Financial',
+    'Energy': 'Energy',
+    'Consumer Defensive': 'Consumer',
+    'Consumer Cyclical': 'Consumer',
+    'Healthcare': 'Pharma',
+    'Industrials': 'Industrial',
+    'Basic Materials': 'Materials'
+}
+
+# Token budget for the article block of the generator prompt
+NEWS_PROMPT_TOKEN_BUDGET = 3000
+
+# Approximate UTF-8 bytes per Claude token, for budgeting prompts locally
+_BYTES_PER_TOKEN = 4
+
+def _estimate_tokens(text: str) -> int:
+    """Approximate Claude token count of text without a round trip to the API."""
+    return -(-len(text.encode()) // _BYTES_PER_TOKEN)
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens, never splitting a multi-byte character."""
+    encoded = text.encode()
+    limit = max(max_tokens, 0) * _BYTES_PER_TOKEN
+    if len(encoded) <= limit:
+        return text
+    return encoded[:limit].decode(errors='ignore')
+
+def _pack_news_articles(articles: List[Dict[str, Any]], budget: int = NEWS_PROMPT_TOKEN_BUDGET) -> str:
+    """Pack articles into the prompt, giving each an equal share of the budget still unspent."""
+    parts = []
+    for i, article in enumerate(articles):
+        header = f"ARTICLE {i+1}:\nURL: {article['url']}\nTitle: {article['title']}\nContent: "
+        # Short articles pass their unused share on; a long one can't crowd out those after it
+        share = budget // (len(articles) - i)
+        content = _truncate_to_tokens(article['content'], share - _estimate_tokens(header))
+        parts.append(f"{header}{content}...")
+        budget -= _estimate_tokens(parts[-1])
+        if budget <= 0:
+            break
+    return "\n\n".join(parts)
+
+_WORD_RE = re.compile(r"\w+")
+
+# Width of the hashed bag-of-words vectors used to spot near-duplicate article titles
+_TITLE_EMBEDDING_DIMENSIONS = 384
+
+def _embed_title(text: str) -> np.ndarray:
+    """L2-normalised signed feature hash of a title's word unigrams and bigrams."""
+    tokens = _WORD_RE.findall(text.lower())
+    features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    vector = np.zeros(_TITLE_EMBEDDING_DIMENSIONS, dtype=np.float32)
+    if not features:
+        return vector
     
-    async def generate_completion(
-        self,
-        prompt: str,
-        system_prompt: Optional[str] = None,
-        max_tokens: int = 4000,
-        temperature: float = 0.3,
-        model: str = "claude-3-haiku-20240307"  # Updated to available model
-    ) -> Optional[str]:
-        """Generate a completion using Claude."""
-        if not self.client:
-            logger.error("Claude client not initialized")
-            return None
-        
-        try:
-            messages = [{"role": "user", "content": prompt}]
-            
-            response = self.client.messages.create(
-                model=model,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                system=system_prompt or "You are a helpful AI assistant specialized in financial analysis.",
-                messages=messages
-            )
-            
-            if response.content and len(response.content) > 0:
-                return response.content[0].text
-            else:
-                logger.error("Empty response from Claude")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Error generating Claude completion: {e}")
-            return None
+    hashes = np.fromiter((zlib.crc32(f.encode()) for f in features), dtype=np.uint32, count=len(features))
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, hashes % _TITLE_EMBEDDING_DIMENSIONS, signs)
     
-    async def generator_agent(
-        self,
-        company_data: Dict[str, Any],
-        news_articles: List[Dict[str, Any]]
-    ) -> Optional[Dict[str, Any]]:
-        """
-        The Generator Agent - performs initial qualitative and quantitative analysis.
-        
-        Args:
-            company_data: Financial data from yfinance
-            news_articles: List of scraped news articles with URLs
-            
-        Returns:
-            Structured JSON with SWOT, News sentiment, DCF assumptions, and sensitivity analysis
-        """
-        if not self.client:
-            return None
-        
-        system_prompt = """You are an expert financial analyst with deep expertise in equity research and valuation. You will analyze company data and recent news to generate comprehensive qualitative and quantitative insights.
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+# Numbered headers and separator for _format_articles_for_analysis (callers cap at 10 articles)
+_ARTICLE_PREFIXES = tuple(f"Article {i+1}:\n" for i in range(32))
+_ARTICLE_SEP = "\n---\n\n"
+
+_NO_NEWS_FALLBACK = sys.intern("NO RECENT NEWS ARTICLES FOUND - Please provide analysis based on historical data and financial fundamentals only. Use placeholder URLs like 'https://example.com/source1' for source attribution in this case.")
+
+# Static agent system prompts, interned so every request sends the same object
+_GENERATOR_SYSTEM_PROMPT = sys.intern("""You are an expert financial analyst with deep expertise in equity research and valuation. You will analyze company data and recent news to generate comprehensive qualitative and quantitative insights.
 
 Your output must be valid JSON in exactly this structure:
 {
@@ -281,114 +318,9 @@ SOURCE ATTRIBUTION RULES:
 - Use exact URLs from the provided articles in the "sources" arrays
 - Each insight must reference at least 1-2 specific news articles
 - Include only insights that can be substantiated by the provided sources
-- Prioritize quality over quantity - fewer well-sourced insights are better than many unsourced ones"""
-
-        # Format the input data
-        if news_articles and len(news_articles) > 0:
-            news_text = "\n\n".join([
-                f"ARTICLE {i+1}:\nURL: {article['url']}\nTitle: {article['title']}\nContent: {article['content'][:1500]}..."
-                for i, article in enumerate(news_articles[:10])
-            ])
-        else:
-            news_text = "NO RECENT NEWS ARTICLES FOUND - Please provide analysis based on historical data and financial fundamentals only. Use placeholder URLs like 'https://example.com/source1' for source attribution in this case."
-        
-        financials_summary = self._format_financial_data(company_data)
-        industry_context = self._get_industry_context(
-            company_data.get('info', {}).get('sector', ''),
-            company_data.get('ticker', '')
-        )
-        
-        prompt = f"""
-Please analyze the following company and generate comprehensive qualitative and quantitative insights:
-
-COMPANY: {company_data.get('ticker', 'Unknown')}
-COMPANY NAME: {company_data.get('info', {}).get('longName', 'Unknown')}
-
-{industry_context}
-
-FINANCIAL DATA:
-{financials_summary}
-
-RECENT NEWS ARTICLES WITH MANDATORY SOURCE URLS:
-{news_text}
-
-CRITICAL INSTRUCTIONS:
-1. Generate a complete analysis following the exact JSON structure specified in your system prompt
-2. MANDATORY: Every SWOT point must include specific article URLs in the "sources" array
-3. MANDATORY: Every news theme must reference specific article URLs as sources
-4. Only include insights that can be substantiated by the provided news articles
-5. Use exact URLs from the RECENT NEWS ARTICLES section above
-6. If you cannot find sufficient sources for a point, do not include that point
-7. Quality over quantity - fewer well-sourced insights are preferred
-8. When making comparisons, reference both the peer companies and news sources
-9. COMPETITIVE FOCUS: Analyze strengths/weaknesses relative to peer companies mentioned above
-10. Include competitive threats from peer actions, market positioning changes, and strategic moves
-11. Consider competitive opportunities from industry gaps or peer company weaknesses
+- Prioritize quality over quantity - fewer well-sourced insights are better than many unsourced ones""")
 
-Remember: NO analysis point should exist without proper source attribution from the provided articles.
-        """
-        
-        try:
-            response = await self.generate_completion(
-                prompt=prompt,
-                system_prompt=system_prompt,
-                max_tokens=6000,
-                temperature=0.2
-            )
-            
-            if response:
-                # Clean response of control characters
-                import re
-                cleaned_response = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', response)
-                
-                # Try to parse as JSON
-                try:
-                    return json.loads(cleaned_response)
-                except json.JSONDecodeError as e:
-                    logger.error(f"JSON decode error: {e}")
-                    
-                    # Try to find and extract the JSON object
-                    start = cleaned_response.find('{')
-                    if start != -1:
-                        # Find the matching closing brace by counting braces
-                        brace_count = 0
-                        end = start
-                        for i, char in enumerate(cleaned_response[start:]):
-                            if char == '{':
-                                brace_count += 1
-                            elif char == '}':
-                                brace_count -= 1
-                                if brace_count == 0:
-                                    end = start + i + 1
-                                    break
-                        
-                        if end > start:
-                            json_str = cleaned_response[start:end]
-                            try:
-                                return json.loads(json_str)
-                            except json.JSONDecodeError as e2:
-                                logger.error(f"JSON extraction failed: {e2}")
-                                logger.error(f"Extracted JSON: {json_str[:500]}...")
-                                return None
-                    
-                    logger.error("Could not extract valid JSON from Generator response")
-                    logger.error(f"Response preview: {cleaned_response[:500]}...")
-                    return None
-            
-            return None
-            
-        except Exception as e:
-            logger.error(f"Error in generator_agent: {e}")
-            return None
-    
-    async def checker_agent(self, generator_output: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """
-        The Checker Agent - validates the Generator's analysis for reasonableness.
-        """
-        if not self.client:
-            return None
-        
-        system_prompt = """You are a meticulous, skeptical financial analyst from a top-tier investment bank. Your job is to validate analysis for factual correctness, insightfulness, and reasonableness.
+_CHECKER_SYSTEM_PROMPT = sys.intern("""You are a meticulous, skeptical financial analyst from a top-tier investment bank. Your job is to validate analysis for factual correctness, insightfulness, and reasonableness.
 
 Your output must be valid JSON in exactly this structure:
 {
@@ -423,50 +355,9 @@ Your output must be valid JSON in exactly this structure:
   }
 }
 
-Be thorough but concise. Focus on factual accuracy and reasonableness."""
-
-        prompt = f"""
-Please validate the following financial analysis for accuracy and reasonableness:
-
-ANALYSIS TO VALIDATE:
-{json.dumps(generator_output, indent=2)}
+Be thorough but concise. Focus on factual accuracy and reasonableness.""")
 
-Provide a thorough validation report following the exact JSON structure specified. Score the overall analysis from 1-10 where 10 is perfectly reasonable and well-supported.
-        """
-        
-        try:
-            response = await self.generate_completion(
-                prompt=prompt,
-                system_prompt=system_prompt,
-                max_tokens=3000,
-                temperature=0.1
-            )
-            
-            if response:
-                try:
-                    return json.loads(response)
-                except json.JSONDecodeError:
-                    start = response.find('{')
-                    end = response.rfind('}') + 1
-                    if start != -1 and end != 0:
-                        return json.loads(response[start:end])
-                    
-            return None
-            
-        except Exception as e:
-            logger.error(f"Error in checker_agent: {e}")
-            return None
-    
-    async def bull_commentator_agent(
-        self,
-        generator_output: Dict[str, Any],
-        checker_output: Dict[str, Any]
-    ) -> Optional[Dict[str, Any]]:
-        """The Bull Commentator Agent - provides optimistic investment thesis."""
-        if not self.client:
-            return None
-        
-        system_prompt = """You are a growth-oriented financial strategist with expertise in identifying upside potential and growth opportunities.
+_BULL_SYSTEM_PROMPT = sys.intern("""You are a growth-oriented financial strategist with expertise in identifying upside potential and growth opportunities.
 
 Your output must be valid JSON in exactly this structure:
 {
@@ -489,85 +380,1039 @@ Your output must be valid JSON in exactly this structure:
   }
 }
 
-Be optimistic but grounded in data and market realities."""
-
-        prompt = f"""
-Given the following analysis and validation report, provide a bullish investment commentary:
-
-ORIGINAL ANALYSIS:
-{json.dumps(generator_output, indent=2)}
+Be optimistic but grounded in data and market realities.""")
 
-VALIDATION REPORT:
-{json.dumps(checker_output, indent=2)}
+_BEAR_SYSTEM_PROMPT = sys.intern("""You are a conservative, value-focused financial strategist with expertise in risk assessment and downside protection.
 
-Provide a growth-oriented bull case following the exact JSON structure specified.
-        """
-        
-        try:
-            response = await self.generate_completion(
-                prompt=prompt,
-                system_prompt=system_prompt,
-                max_tokens=2500,
-                temperature=0.3
-            )
-            
-            if response:
-                try:
-                    return json.loads(response)
-                except json.JSONDecodeError:
-                    start = response.find('{')
-                    end = response.rfind('}') + 1
-                    if start != -1 and end != 0:
-                        return json.loads(response[start:end])
-                    
-            return None
-            
-        except Exception as e:
+Your output must be valid JSON in exactly this structure:
+{
+  "bear_commentary": {
+    "summary_of_assumptions": "Brief summary of key DCF and sensitivity assumptions",
+    "bearish_implications": "Explanation of key risks and pessimistic implications",
+    "recommended_modifications": [
+      {
+        "assumption": "revenue_growth_rate",
+        "current_value": 8.5,
+        "recommended_value": 5.0,
+        "justification": "Specific reasoning citing risks or conservative factors"
+      }
+    ],
+    "downside_risks": [
+      "Risk 1 with specific impact analysis",
+      "Risk 2 with specific impact analysis"
+    ],
+    "conservative_price_scenario": "Conservative price target with reasoning"
+  }
+}
+
+Be cautious and risk-focused but fair in your assessment.""")
+
+_SENTIMENT_ONLY_SYSTEM_PROMPT = sys.intern("""You are a financial news sentiment analyst. Analyze the provided news articles and return ONLY a JSON object with sentiment analysis.
+        
+Your output must be valid JSON in exactly this structure:
+{
+  "overall_sentiment_score": 0.15,
+  "sentiment_label": "slightly_positive",
+  "confidence": 0.8,
+  "key_sentiment_drivers": [
+    "Positive earnings growth outlook",
+    "Regulatory concerns mentioned",
+    "Market expansion plans announced"
+  ]
+}
+        
+Sentiment score range: -1.0 (very negative) to +1.0 (very positive)
+Sentiment labels: strongly_negative, negative, slightly_negative, neutral, slightly_positive, positive, strongly_positive""")
+
+_ADVANCED_SENTIMENT_SYSTEM_PROMPT = sys.intern("""You are an expert financial analyst specializing in news sentiment analysis for investment decisions.
+        
+Your output must be valid JSON in exactly this structure:
+{
+  "sentiment_summary": {
+    "overall_score": 0.25,
+    "label": "cautiously_positive",
+    "confidence": 0.85,
+    "trend": "improving"
+  },
+  "key_themes": [
+    {
+      "theme": "Earnings Performance",
+      "sentiment": "positive",
+      "impact": "high",
+      "description": "Strong quarterly results exceeded expectations",
+      "supporting_articles": 3
+    }
+  ],
+  "investment_implications": {
+    "bullish_factors": [
+      "Revenue growth accelerating in core segments",
+      "Management guidance raised for full year"
+    ],
+    "bearish_factors": [
+      "Regulatory headwinds in key markets",
+      "Rising input cost pressures"
+    ],
+    "neutral_factors": [
+      "Market volatility affecting sector performance"
+    ]
+  },
+  "risk_sentiment": {
+    "regulatory_risk": "moderate",
+    "market_risk": "low", 
+    "operational_risk": "low",
+    "financial_risk": "low"
+  }
+}
+        
+Be specific and quantitative where possible. Focus on investment-relevant insights.""")
+
+_INVESTMENT_INSIGHTS_SYSTEM_PROMPT = sys.intern("""You are a senior equity research analyst providing actionable investment insights based on news analysis.
+        
+Your output must be valid JSON in exactly this structure:
+{
+  "investment_thesis": {
+    "summary": "Brief 2-sentence investment case based on recent news",
+    "conviction_level": "high",
+    "time_horizon": "medium_term",
+    "price_catalyst_timeline": "3-6 months"
+  },
+  "key_catalysts": [
+    {
+      "catalyst": "Q3 Earnings Release",
+      "timing": "Next 4-6 weeks", 
+      "impact": "high",
+      "sentiment": "positive",
+      "description": "Expected to show continued margin expansion"
+    }
+  ],
+  "risk_factors": [
+    {
+      "risk": "Regulatory Changes",
+      "probability": "medium",
+      "impact": "high",
+      "timeline": "6-12 months",
+      "mitigation": "Company has strong compliance track record"
+    }
+  ],
+  "sentiment_trajectory": {
+    "current": "positive",
+    "recent_change": "improving",
+    "momentum": "accelerating",
+    "sustainability": "likely"
+  },
+  "actionable_insights": [
+    "Monitor Q3 earnings for margin expansion trends",
+    "Watch for management commentary on expansion plans",
+    "Track regulatory developments in core markets"
+  ]
+}
+        
+Focus on actionable, time-bound insights for investment decisions.""")
+
+# Agentic batch prompts: static JSON schema (prompt-cached) followed by role instructions
+_CORE_BATCH_SCHEMA = sys.intern("""You will receive one or more companies, each introduced by a "=== TICKER: <ticker> ===" line.
+Your output must be valid JSON in exactly this structure, with one entry per ticker:
+{
+  "results": [
+    {
+      "ticker": "Ticker exactly as given",
+      "investment_thesis": "1-2 sentence investment case summary (max 80 words)",
+      "dcf_commentary": [
+        "Key Growth Driver: [40 words max]",
+        "Valuation Gap: [40 words max]", 
+        "Main Risk: [40 words max]"
+      ],
+      "financial_health": [
+        "Revenue Trend: [35 words max]",
+        "Margin Analysis: [35 words max]",
+        "Balance Sheet: [35 words max]"
+      ],
+      "technical_outlook": [
+        "Trend Direction: [30 words max]",
+        "Entry Signal: [30 words max]"
+      ]
+    }
+  ]
+}""")
+_CORE_BATCH_INSTRUCTIONS = "You are a financial analyst for Indian retail investors. Be precise, avoid repetition, and use structured output."
+
+_SENTIMENT_BATCH_SCHEMA = sys.intern("""Your output must be valid JSON in exactly this structure:
+{
+  "news_sentiment": {
+    "overall_tone": "Positive/Mixed/Negative",
+    "key_themes": [
+      "Theme 1: [35 words max]",
+      "Theme 2: [35 words max]"
+    ],
+    "insider_activity": "Brief summary if significant [30 words max]"
+  },
+  "peer_context": [
+    "Relative Valuation: [40 words max]",
+    "Competitive Position: [40 words max]"
+  ]
+}""")
+_SENTIMENT_BATCH_INSTRUCTIONS = "You are a financial analyst specializing in sentiment and competitive analysis."
+
+def _schema_system_blocks(schema: str, instructions: str) -> List[Dict[str, Any]]:
+    """System prompt blocks with the static schema marked for Anthropic prompt caching."""
+    return [
+        {"type": "text", "text": schema, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": instructions}
+    ]
+
+_CORE_BATCH_SYSTEM_BLOCKS = _schema_system_blocks(_CORE_BATCH_SCHEMA, _CORE_BATCH_INSTRUCTIONS)
+_SENTIMENT_BATCH_SYSTEM_BLOCKS = _schema_system_blocks(_SENTIMENT_BATCH_SCHEMA, _SENTIMENT_BATCH_INSTRUCTIONS)
+
+# Forced tool call for core analysis, so Claude returns schema-shaped JSON with no preamble
+_CORE_ANALYSIS_TOOL = {
+    "name": "emit_core_analysis",
+    "description": "Record the core investment analysis for every ticker provided.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "results": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "ticker": {"type": "string"},
+                        "investment_thesis": {"type": "string"},
+                        "dcf_commentary": {"type": "array", "items": {"type": "string"}},
+                        "financial_health": {"type": "array", "items": {"type": "string"}},
+                        "technical_outlook": {"type": "array", "items": {"type": "string"}}
+                    },
+                    "required": [
+                        "ticker", "investment_thesis", "dcf_commentary", "financial_health", "technical_outlook"
+                    ]
+                }
+            }
+        },
+        "required": ["results"]
+    }
+}
+
+# Prompt templates for the financial, DCF and technical data sections
+_FINANCIAL_DATA_TEMPLATE = """
+Company: {longName}
+Sector: {sector}
+Industry: {industry}
+Market Cap: {marketCap}
+Revenue (TTM): {totalRevenue}
+EBITDA: {ebitda}
+Profit Margin: {profitMargins}
+ROE: {returnOnEquity}
+Debt/Equity: {debtToEquity}
+Current Ratio: {currentRatio}
+P/E Ratio: {trailingPE}
+Forward P/E: {forwardPE}
+PEG Ratio: {pegRatio}
+Price/Book: {priceToBook}
+52-Week High: {fiftyTwoWeekHigh}
+52-Week Low: {fiftyTwoWeekLow}
+Beta: {beta}
+            """
+_FINANCIAL_TEXT_FIELDS = ('longName', 'sector', 'industry')
+_FINANCIAL_METRIC_FIELDS = (
+    ('marketCap', 'currency'), ('totalRevenue', 'currency'), ('ebitda', 'currency'),
+    ('profitMargins', 'percentage'), ('returnOnEquity', 'percentage'),
+    ('debtToEquity', 'number'), ('currentRatio', 'number'), ('trailingPE', 'number'),
+    ('forwardPE', 'number'), ('pegRatio', 'number'), ('priceToBook', 'number'),
+    ('fiftyTwoWeekHigh', 'currency'), ('fiftyTwoWeekLow', 'currency'), ('beta', 'number')
+)
+_METRIC_FORMATS = {'currency': "${:,.0f}", 'percentage': "{:.2%}", 'number': "{:.2f}"}
+
+def _format_metric(value: Any, kind: str) -> str:
+    """Format a metric for a prompt, rendering None/NaN/inf as N/A."""
+    if value is None or (isinstance(value, float) and not math.isfinite(value)):
+        return "N/A"
+    return _METRIC_FORMATS[kind].format(value)
+
+_DCF_DATA_TEMPLATE = """
+Fair Value: ₹{fair_value:.2f}
+Current Price: ₹{current_price:.2f}
+Upside/Downside: {upside_percent:.1f}%
+Growth Rate Assumption: {growth_rate:.1f}%
+WACC: {wacc:.1f}%
+Terminal Growth: {terminal_growth:.1f}%
+            """
+_DCF_DATA_FIELDS = ('fair_value', 'current_price', 'upside_percent', 'growth_rate', 'wacc', 'terminal_growth')
+
+_TECHNICAL_DATA_TEMPLATE = """
+RSI: {rsi:.1f}
+MACD Signal: {macd_signal}
+Price vs 50-day MA: {sma_50_signal}
+Volume Trend: {volume_trend}
+Support/Resistance: {support_resistance}
+            """
+_TECHNICAL_DATA_DEFAULTS = {
+    'rsi': 50,
+    'macd_signal': 'Neutral',
+    'sma_50_signal': 'Neutral',
+    'volume_trend': 'Normal',
+    'support_resistance': 'Neutral'
+}
+
+# Rule-based fallbacks for the agentic batch analyzers; copied per use since results are mutable
+_FALLBACK_CORE_ANALYSIS = MappingProxyType({
+    "investment_thesis": "Analysis based on quantitative metrics and historical performance",
+    "dcf_commentary": [
+        "Growth assumptions based on historical CAGR analysis",
+        "Fair value calculated using sector-appropriate DCF methodology", 
+        "Key risks include market volatility and sector-specific challenges"
+    ],
+    "financial_health": [
+        "Revenue trends analyzed over 3-5 year period",
+        "Profitability metrics compared to sector averages",
+        "Balance sheet strength assessed using debt and liquidity ratios"
+    ],
+    "technical_outlook": [
+        "Technical indicators suggest current market positioning",
+        "Entry timing considerations based on momentum signals"
+    ],
+    "token_usage": 0
+})
+
+_FALLBACK_SENTIMENT_ANALYSIS = MappingProxyType({
+    "news_sentiment": {
+        "overall_tone": "Mixed",
+        "key_themes": [
+            "Limited recent news analysis available",
+            "Sentiment assessment based on market performance"
+        ],
+        "insider_activity": "No significant insider activity detected"
+    },
+    "peer_context": [
+        "Peer comparison based on quantitative metrics",
+        "Competitive positioning assessed using financial ratios"
+    ],
+    "token_usage": 0
+})
+
+# Large static prompts worth marking for Anthropic prompt caching
+_CACHEABLE_SYSTEM_PROMPTS = frozenset({
+    _GENERATOR_SYSTEM_PROMPT,
+    _CHECKER_SYSTEM_PROMPT,
+    _BULL_SYSTEM_PROMPT,
+    _BEAR_SYSTEM_PROMPT,
+    _ADVANCED_SENTIMENT_SYSTEM_PROMPT,
+    _INVESTMENT_INSIGHTS_SYSTEM_PROMPT,
+})
+
+_TECHNICAL_SYSTEM_PROMPT_TEMPLATE = "You are an expert technical analyst providing educational commentary for a fintech dashboard. Be objective, educational, and clear in your explanations. Use {currency_symbol} for all price references (Indian stocks use ₹, US stocks use $)."
+_TECHNICAL_SYSTEM_PROMPT_INR = sys.intern(_TECHNICAL_SYSTEM_PROMPT_TEMPLATE.format(currency_symbol="₹"))
+_TECHNICAL_SYSTEM_PROMPT_USD = sys.intern(_TECHNICAL_SYSTEM_PROMPT_TEMPLATE.format(currency_symbol="$"))
+
+@lru_cache(maxsize=1024)
+def _render_industry_context(sector: str, is_indian: bool, peers: Tuple[str, ...]) -> str:
+    """Render the industry/peer benchmarking block; memoized since inputs come from static tables."""
+    return f"""
+INDUSTRY CONTEXT & PEER BENCHMARKING:
+Sector: {sector}
+Geographic Focus: {'Indian Market' if is_indian else 'Global Market'}
+Key Peer Companies: {', '.join(peers) if peers else 'N/A'}
+
+When analyzing this company, consider:
+1. How it compares to these industry leaders in terms of scale, efficiency, and growth
+2. Industry-specific challenges and opportunities
+3. Competitive positioning relative to top {'domestic' if is_indian else 'global'} peers
+4. Market dynamics and competitive landscape trends
+        """
+
+class ClaudeBatchQueue:
+    """
+    Coalesces non-interactive Claude requests into Message Batches submissions.
+    
+    Requests are queued until ``max_batch_size`` is reached or ``flush_delay``
+    seconds pass, then submitted as a single batch (billed at 50% of standard
+    pricing). Each caller awaits the text for its own request.
+    """
+    
+    def __init__(
+        self,
+        service: "ClaudeService",
+        max_batch_size: int = 100,
+        flush_delay: float = 5.0,
+        poll_interval: float = 20.0
+    ):
+        self.service = service
+        self.max_batch_size = max_batch_size
+        self.flush_delay = flush_delay
+        self.poll_interval = poll_interval
+        self._pending: List[tuple] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._running_flushes = set()
+    
+    async def enqueue(self, params: Dict[str, Any]) -> Optional[str]:
+        """Queue one Messages API request and wait for its batched result."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((uuid.uuid4().hex, params, future))
+        
+        if len(self._pending) >= self.max_batch_size:
+            task = asyncio.create_task(self.flush())
+            self._running_flushes.add(task)
+            task.add_done_callback(self._running_flushes.discard)
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+        
+        return await future
+    
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.flush_delay)
+        await self.flush()
+    
+    async def flush(self):
+        """Submit all pending requests as one batch and resolve their futures."""
+        if self._flush_task is not None and self._flush_task is not asyncio.current_task():
+            self._flush_task.cancel()
+        self._flush_task = None
+        
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        
+        results = {}
+        try:
+            batch_id = await self.service.submit_batch([
+                {"custom_id": custom_id, "params": params}
+                for custom_id, params, _ in pending
+            ])
+            if batch_id:
+                results = await self.service.wait_for_batch(batch_id, self.poll_interval)
+        except Exception as e:
+            logger.error(f"Error processing Claude batch of {len(pending)} requests: {e}")
+        
+        for custom_id, _, future in pending:
+            if not future.done():
+                future.set_result(results.get(custom_id))
+
+class ClaudeService:
+    """Service for interacting with Claude AI for agentic workflow."""
+    
+    # Output-token budget for a Generator analysis; one company's SWOT, peer comparison
+    # and sensitivity grid fill most of Haiku's 4096-token ceiling, so companies aren't batched
+    generator_max_tokens = 4000
+    
+    # Title similarity above which news articles are treated as the same story
+    article_similarity_threshold = 0.88
+    
+    def __init__(self):
+        self.client = None
+        self.batch_queue = ClaudeBatchQueue(self)
+        self._initialize_client()
+        self._setup_company_references()
+    
+    def _initialize_client(self):
+        """Initialize Claude client with API key from user settings only."""
+        try:
+            # Get API keys from user settings only (no environment fallback)
+            api_keys = get_user_api_keys()
+            claude_api_key = api_keys.get('claude_api_key')
+            
+            logger.info(f"🔍 Claude initialization - API keys retrieved: {list(api_keys.keys())}")
+            logger.info(f"🔍 Claude initialization - Claude key present: {bool(claude_api_key)}")
+            if claude_api_key:
+                logger.info(f"🔍 Claude initialization - Key length: {len(claude_api_key)}")
+            
+            if claude_api_key:
+                self.client = AsyncAnthropic(api_key=claude_api_key, http_client=_get_http_client())
+                logger.info("✅ Claude client initialized successfully with user-provided key")
+            else:
+                logger.warning("❌ Claude API key not configured in settings panel - AI features disabled")
+                self.client = None
+                
+        except Exception as e:
+            logger.error(f"❌ Failed to initialize Claude client: {e}")
+            self.client = None
+    
+    def _setup_company_references(self):
+        """Set up reference companies for benchmarking and context."""
+        # Top 30 Global Companies by Market Cap (for benchmarking context)
+        self.top_global_companies = self._intern_reference_table({
+            'Technology': ['AAPL', 'MSFT', 'GOOGL', 'AMZN', 'TSLA', 'META', 'NVDA', 'ADBE', 'CRM', 'ORCL'],
+            'Financial': ['BRK-A', 'JPM', 'V', 'MA', 'BAC', 'WFC', 'GS', 'MS', 'AXP', 'C'],
+            'Healthcare': ['JNJ', 'UNH', 'PFE', 'ABBV', 'TMO', 'ABT', 'LLY', 'MRK', 'DHR', 'BMY'],
+            'Consumer': ['PG', 'HD', 'KO', 'PEP', 'WMT', 'MCD', 'NKE', 'SBUX', 'TGT', 'LOW'],
+            'Industrial': ['HON', 'UPS', 'CAT', 'BA', 'GE', 'MMM', 'LMT', 'RTX', 'DE', 'EMR'],
+            'Energy': ['XOM', 'CVX', 'COP', 'EOG', 'SLB', 'PSX', 'VLO', 'MPC', 'OXY', 'HAL']
+        })
+        
+        # Top 30 Indian Companies by Market Cap (for domestic benchmarking)
+        self.top_indian_companies = self._intern_reference_table({
+            'Technology': ['TCS.NS', 'INFY.NS', 'HCLTECH.NS', 'WIPRO.NS', 'TECHM.NS', 'LTI.NS'],
+            'Financial': ['HDFCBANK.NS', 'ICICIBANK.NS', 'KOTAKBANK.NS', 'SBIN.NS', 'AXISBANK.NS', 'INDUSINDBK.NS'],
+            'Energy': ['RELIANCE.NS', 'ONGC.NS', 'IOC.NS', 'BPCL.NS', 'HINDPETRO.NS', 'GAIL.NS', 'NTPC.NS'],
+            'Consumer': ['HINDUNILVR.NS', 'ITC.NS', 'NESTLEIND.NS', 'BRITANNIA.NS', 'DABUR.NS', 'GODREJCP.NS'],
+            'Automotive': ['MARUTI.NS', 'TATAMOTORS.NS', 'M&M.NS', 'BAJAJ-AUTO.NS', 'EICHERMOT.NS', 'HEROMOTOCO.NS'],
+            'Pharma': ['SUNPHARMA.NS', 'DRREDDY.NS', 'CIPLA.NS', 'DIVISLAB.NS', 'BIOCON.NS', 'LUPIN.NS'],
+            'Industrial': ['LT.NS', 'ULTRACEMCO.NS', 'ASIANPAINT.NS', 'TITAN.NS', 'BHARTIARTL.NS', 'ADANIPORTS.NS'],
+            'Materials': ['COALINDIA.NS', 'HINDALCO.NS', 'TATASTEEL.NS', 'JSW.NS', 'VEDL.NS', 'NMDC.NS']
+        })
+        
+        # Flat ticker -> (industry, peers) index so peer lookup is a single dict hit
+        self._ticker_index = {}
+        for table in (self.top_indian_companies, self.top_global_companies):
+            for industry, members in table.items():
+                for member in members:
+                    peers = tuple(m for m in members if m != member)[:5]
+                    self._ticker_index[member] = (industry, peers)
+        
+        # Indian industry peers by yfinance sector, for tickers outside the reference tables
+        self._sector_peers = {
+            sector: tuple(self.top_indian_companies.get(industry, [])[:5])
+            for sector, industry in INDIAN_SECTOR_TO_INDUSTRY.items()
+        }
+        self._default_sector_peers = tuple(self.top_indian_companies['Technology'][:5])
+    
+    @staticmethod
+    def _intern_reference_table(table: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """Intern industry names and tickers so every prompt and index shares one copy."""
+        return {
+            sys.intern(industry): [sys.intern(ticker) for ticker in tickers]
+            for industry, tickers in table.items()
+        }
+    
+    @staticmethod
+    def _intern_article_fields(articles: Optional[List[Dict[str, Any]]]) -> None:
+        """Intern article URLs and titles in place so repeated stories share one copy."""
+        for article in articles or ():
+            for field in ('url', 'title'):
+                value = article.get(field)
+                if isinstance(value, str):
+                    article[field] = sys.intern(value)
+    
+    def _get_industry_context(self, sector: str, ticker: str) -> str:
+        """Get industry context and peer companies for benchmarking."""
+        is_indian = ticker.endswith('.NS')
+        
+        # Find relevant peer companies
+        entry = self._ticker_index.get(ticker)
+        peers = entry[1] if entry else ()
+        
+        if is_indian and not peers and sector:
+            # Try to match by sector name
+            peers = self._sector_peers.get(sector, self._default_sector_peers)
+        
+        return _render_industry_context(sector, is_indian, peers)
+    
+    def reinitialize_client(self):
+        """Reinitialize Claude client with updated API keys."""
+        self._initialize_client()
+    
+    def is_available(self) -> bool:
+        """Check if Claude service is available."""
+        return self.client is not None
+    
+    def _agent_cache_key(self, agent_name: str, *inputs: Any) -> str:
+        """Content hash of an agent request (prompts, model, sampling params)."""
+        key_string = json.dumps([agent_name, *inputs], sort_keys=True, default=str)
+        return hashlib.sha256(key_string.encode()).hexdigest()
+    
+    def _build_message_params(
+        self,
+        prompt: str,
+        system_prompt: Optional[Union[str, List[Dict[str, Any]]]],
+        max_tokens: int,
+        temperature: float,
+        model: str
+    ) -> Dict[str, Any]:
+        """Build Messages API parameters, shared by direct and batched requests."""
+        system = system_prompt or "You are a helpful AI assistant specialized in financial analysis."
+        if isinstance(system, str) and system in _CACHEABLE_SYSTEM_PROMPTS:
+            # Static agent prompts are byte-identical across calls; let Anthropic reuse them
+            system = [{"type": "text", "text": system, "cache_control": {"type": "ephemeral"}}]
+        
+        return {
+            "model": model,
+            "max_tokens": min(max_tokens, _max_output_tokens(model)),
+            "temperature": temperature,
+            "system": system,
+            "messages": [{"role": "user", "content": prompt}]
+        }
+    
+    async def submit_batch(self, requests: List[Dict[str, Any]]) -> Optional[str]:
+        """
+        Submit requests through the Message Batches API.
+        
+        Args:
+            requests: List of {"custom_id": ..., "params": <Messages API params>}
+            
+        Returns:
+            Batch ID, or None if the client is unavailable or submission failed
+        """
+        if not self.client:
+            logger.error("Claude client not initialized")
+            return None
+        
+        try:
+            batch = await self.client.messages.batches.create(requests=requests)
+            logger.info(f"Submitted Claude batch {batch.id} with {len(requests)} requests")
+            return batch.id
+        except Exception as e:
+            logger.error(f"Error submitting Claude batch: {e}")
+            return None
+    
+    async def wait_for_batch(
+        self,
+        batch_id: str,
+        poll_interval: float = 20.0
+    ) -> Dict[str, Optional[str]]:
+        """
+        Poll a batch until it ends and collect its results.
+        
+        Returns:
+            Mapping of custom_id to response text (None for errored/expired requests)
+        """
+        while True:
+            batch = await self.client.messages.batches.retrieve(batch_id)
+            if batch.processing_status == "ended":
+                break
+            await asyncio.sleep(poll_interval)
+        
+        results = {}
+        async for entry in await self.client.messages.batches.results(batch_id):
+            text = None
+            if entry.result.type == "succeeded" and entry.result.message.content:
+                text = entry.result.message.content[0].text
+            else:
+                logger.warning(f"Claude batch {batch_id} request {entry.custom_id} {entry.result.type}")
+            results[entry.custom_id] = text
+        
+        return results
+    
+    async def generate_completion(
+        self,
+        prompt: str,
+        system_prompt: Optional[Union[str, List[Dict[str, Any]]]] = None,
+        max_tokens: int = 4000,
+        temperature: float = 0.3,
+        model: str = DEFAULT_CLAUDE_MODEL,
+        cache_agent: Optional[str] = None,
+        force_refresh: bool = False,
+        use_batch: bool = False
+    ) -> Optional[str]:
+        """Generate a completion using Claude. See generate_completion_with_usage."""
+        text, _ = await self.generate_completion_with_usage(
+            prompt, system_prompt, max_tokens, temperature, model, cache_agent, force_refresh, use_batch
+        )
+        return text
+    
+    async def generate_completion_with_usage(
+        self,
+        prompt: str,
+        system_prompt: Optional[Union[str, List[Dict[str, Any]]]] = None,
+        max_tokens: int = 4000,
+        temperature: float = 0.3,
+        model: str = DEFAULT_CLAUDE_MODEL,
+        cache_agent: Optional[str] = None,
+        force_refresh: bool = False,
+        use_batch: bool = False
+    ) -> Tuple[Optional[str], Dict[str, int]]:
+        """
+        Generate a completion using Claude, with the token usage reported by the API.
+        
+        When ``cache_agent`` is set, the response is cached on disk keyed by a
+        hash of the full request, with the TTL from AGENT_CACHE_TTLS.
+        
+        ``system_prompt`` may also be a list of Messages API text blocks, e.g.
+        a static schema carrying ``cache_control`` followed by instructions.
+        
+        With ``use_batch`` the request is coalesced with other queued requests
+        into a Message Batches submission; only use this for non-interactive
+        workloads since results can take minutes to arrive.
+        
+        Usage is empty when no direct API call was made (cache hits, batches).
+        """
+        if not self.client:
+            logger.error("Claude client not initialized")
+            return None, {}
+        
+        cache_key = None
+        if cache_agent:
+            cache_key = self._agent_cache_key(
+                cache_agent, system_prompt, prompt, model, temperature, max_tokens
+            )
+            if not force_refresh:
+                cached_text = await self._get_cached_completion(cache_agent, cache_key)
+                if cached_text:
+                    return cached_text, {}
+        
+        try:
+            params = self._build_message_params(prompt, system_prompt, max_tokens, temperature, model)
+            
+            usage = {}
+            if use_batch:
+                text = await self.batch_queue.enqueue(params)
+            else:
+                async with _request_semaphore:
+                    response = await self.client.messages.create(**params)
+                text = response.content[0].text if response.content else None
+                usage = self._usage_dict(response)
+            
+            if text:
+                if cache_key:
+                    await self._cache_completion(cache_agent, cache_key, text)
+                return text, usage
+            else:
+                logger.error("Empty response from Claude")
+                return None, usage
+                
+        except Exception as e:
+            logger.error(f"Error generating Claude completion: {e}")
+            return None, {}
+    
+    @staticmethod
+    def _usage_dict(response: Any) -> Dict[str, int]:
+        """Token counts from a Messages API response."""
+        usage = getattr(response, "usage", None)
+        return {field: getattr(usage, field, None) or 0 for field in _USAGE_FIELDS}
+    
+    async def generate_completion_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[Union[str, List[Dict[str, Any]]]] = None,
+        max_tokens: int = 4000,
+        temperature: float = 0.3,
+        model: str = DEFAULT_CLAUDE_MODEL,
+        cache_agent: Optional[str] = None,
+        force_refresh: bool = False
+    ) -> AsyncIterator[str]:
+        """
+        Stream a completion from Claude as text deltas.
+        
+        Lets callers forward output (e.g. over an HTTP stream) before the full
+        response has arrived. A cached response is yielded as a single chunk;
+        a completed stream is written back to the cache.
+        """
+        if not self.client:
+            logger.error("Claude client not initialized")
+            return
+        
+        cache_key = None
+        if cache_agent:
+            cache_key = self._agent_cache_key(
+                cache_agent, system_prompt, prompt, model, temperature, max_tokens
+            )
+            if not force_refresh:
+                cached_text = await self._get_cached_completion(cache_agent, cache_key)
+                if cached_text:
+                    yield cached_text
+                    return
+        
+        chunks = []
+        params = self._build_message_params(prompt, system_prompt, max_tokens, temperature, model)
+        
+        # The upstream request holds a concurrency slot only while Anthropic is sending;
+        # a slow reader consumes the buffered deltas without blocking other Claude calls
+        queue: asyncio.Queue = asyncio.Queue()
+        upstream = asyncio.create_task(self._drain_stream(params, queue))
+        try:
+            while (delta := await queue.get()) is not None:
+                if isinstance(delta, Exception):
+                    logger.error(f"Error streaming Claude completion: {delta}")
+                    return
+                chunks.append(delta)
+                yield delta
+        finally:
+            # Stop paying for tokens nobody will read when the consumer goes away
+            upstream.cancel()
+        
+        if cache_key and chunks:
+            await self._cache_completion(cache_agent, cache_key, "".join(chunks))
+    
+    async def _drain_stream(self, params: Dict[str, Any], queue: asyncio.Queue) -> None:
+        """Feed a Messages stream's text deltas into queue, ending with None or the raised exception."""
+        try:
+            async with _request_semaphore:
+                async with self.client.messages.stream(**params) as stream:
+                    async for delta in stream.text_stream:
+                        queue.put_nowait(delta)
+        except Exception as e:
+            queue.put_nowait(e)
+            return
+        queue.put_nowait(None)
+    
+    async def generate_json_completion(
+        self,
+        prompt: str,
+        system_prompt: Optional[Union[str, List[Dict[str, Any]]]] = None,
+        max_tokens: int = 4000,
+        temperature: float = 0.3,
+        model: str = DEFAULT_CLAUDE_MODEL,
+        tool: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Optional[Dict[str, Any]], Dict[str, int]]:
+        """
+        Stream a completion and parse its first JSON object as soon as the
+        braces balance, closing the stream instead of waiting for trailing output.
+        
+        With ``tool`` the model is forced to call it, and the streamed tool
+        input (schema-validated JSON, no prose) is parsed instead of text.
+        
+        Returns:
+            (parsed object or None, token usage); output tokens are estimated
+            locally when the stream is closed before Claude reports them
+        """
+        if not self.client:
+            logger.error("Claude client not initialized")
+            return None, {}
+        
+        usage = dict.fromkeys(_USAGE_FIELDS, 0)
+        output_reported = False
+        scanner = _JsonObjectScanner()
+        try:
+            params = self._build_message_params(prompt, system_prompt, max_tokens, temperature, model)
+            delta_type, delta_field = "text_delta", "text"
+            if tool:
+                params["tools"] = [tool]
+                params["tool_choice"] = {"type": "tool", "name": tool["name"]}
+                delta_type, delta_field = "input_json_delta", "partial_json"
+            
+            async with _request_semaphore:
+                async with self.client.messages.stream(**params) as stream:
+                    async for event in stream:
+                        if event.type == "message_start":
+                            usage.update(self._usage_dict(event.message))
+                        elif event.type == "message_delta":
+                            usage["output_tokens"] = event.usage.output_tokens
+                            output_reported = True
+                        elif event.type == "content_block_delta" and event.delta.type == delta_type:
+                            if scanner.feed(getattr(event.delta, delta_field)):
+                                break
+                                
+        except Exception as e:
+            logger.error(f"Error streaming Claude JSON completion: {e}")
+            return None, usage
+        
+        text = scanner.text
+        if not output_reported:
+            usage["output_tokens"] = _estimate_tokens(text)
+        
+        if not text:
+            logger.error("Empty response from Claude")
+            return None, usage
+        return self._parse_json_response(text), usage
+    
+    async def _get_cached_completion(self, cache_agent: str, cache_key: str) -> Optional[str]:
+        """Look up a cached agent response by request hash."""
+        cached = await intelligent_cache.get(
+            CacheType.AGENT_OUTPUTS, cache_agent, content_hash=cache_key
+        )
+        return cached["text"] if cached else None
+    
+    async def _cache_completion(self, cache_agent: str, cache_key: str, text: str) -> bool:
+        """Store an agent response under its request hash with the agent's TTL."""
+        return await intelligent_cache.set(
+            CacheType.AGENT_OUTPUTS,
+            cache_agent,
+            {"text": text},
+            ttl=AGENT_CACHE_TTLS.get(cache_agent),
+            content_hash=cache_key
+        )
+    
+    def _format_generator_company_block(
+        self,
+        company_data: Dict[str, Any],
+        news_articles: Optional[List[Dict[str, Any]]]
+    ) -> str:
+        """Company, peer, financial and news sections of a Generator prompt."""
+        self._intern_article_fields(news_articles)
+        top_articles = news_articles[:10] if news_articles else None
+        if top_articles:
+            news_text = _pack_news_articles(top_articles)
+        else:
+            news_text = _NO_NEWS_FALLBACK
+        
+        financials_summary = self._format_financial_data(company_data)
+        industry_context = self._get_industry_context(
+            company_data.get('info', {}).get('sector', ''),
+            company_data.get('ticker', '')
+        )
+        
+        return f"""COMPANY: {company_data.get('ticker', 'Unknown')}
+COMPANY NAME: {company_data.get('info', {}).get('longName', 'Unknown')}
+
+{industry_context}
+
+FINANCIAL DATA:
+{financials_summary}
+
+RECENT NEWS ARTICLES WITH MANDATORY SOURCE URLS:
+{news_text}"""
+    
+    async def generator_agent(
+        self,
+        company_data: Dict[str, Any],
+        news_articles: List[Dict[str, Any]],
+        force_refresh: bool = False,
+        use_batch: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The Generator Agent - performs initial qualitative and quantitative analysis.
+        
+        Args:
+            company_data: Financial data from yfinance
+            news_articles: List of scraped news articles with URLs
+            force_refresh: Bypass the persistent agent response cache
+            use_batch: Route through the Message Batches API (bulk/overnight runs)
+            
+        Returns:
+            Structured JSON with SWOT, News sentiment, DCF assumptions, and sensitivity analysis
+        """
+        if not self.client:
+            return None
+        
+        system_prompt = _GENERATOR_SYSTEM_PROMPT
+        
+        prompt = f"""
+Please analyze the following company and generate comprehensive qualitative and quantitative insights:
+
+{self._format_generator_company_block(company_data, news_articles)}
+
+CRITICAL INSTRUCTIONS:
+1. Generate a complete analysis following the exact JSON structure specified in your system prompt
+2. MANDATORY: Every SWOT point must include specific article URLs in the "sources" array
+3. MANDATORY: Every news theme must reference specific article URLs as sources
+4. Only include insights that can be substantiated by the provided news articles
+5. Use exact URLs from the RECENT NEWS ARTICLES section above
+6. If you cannot find sufficient sources for a point, do not include that point
+7. Quality over quantity - fewer well-sourced insights are preferred
+8. When making comparisons, reference both the peer companies and news sources
+9. COMPETITIVE FOCUS: Analyze strengths/weaknesses relative to peer companies mentioned above
+10. Include competitive threats from peer actions, market positioning changes, and strategic moves
+11. Consider competitive opportunities from industry gaps or peer company weaknesses
+
+Remember: NO analysis point should exist without proper source attribution from the provided articles.
+        """
+        
+        try:
+            response = await self.generate_completion(
+                prompt=prompt,
+                system_prompt=system_prompt,
+                max_tokens=self.generator_max_tokens,
+                temperature=0.2,
+                cache_agent="generator",
+                force_refresh=force_refresh,
+                use_batch=use_batch
+            )
+            
+            if response:
+                result = self._parse_json_response(response)
+                if result is None:
+                    logger.error("Could not extract valid JSON from Generator response")
+                    logger.error(f"Response preview: {response[:500]}...")
+                return result
+            
+            return None
+            
+        except Exception as e:
+            logger.error(f"Error in generator_agent: {e}")
+            return None
+    
+    async def checker_agent(
+        self,
+        generator_output: Dict[str, Any],
+        force_refresh: bool = False,
+        use_batch: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The Checker Agent - validates the Generator's analysis for reasonableness.
+        """
+        if not self.client:
+            return None
+        
+        system_prompt = _CHECKER_SYSTEM_PROMPT
+
+        prompt = f"""
+Please validate the following financial analysis for accuracy and reasonableness:
+
+ANALYSIS TO VALIDATE:
+{_dumps_for_prompt(generator_output)}
+
+Provide a thorough validation report following the exact JSON structure specified. Score the overall analysis from 1-10 where 10 is perfectly reasonable and well-supported.
+        """
+        
+        try:
+            response = await self.generate_completion(
+                prompt=prompt,
+                system_prompt=system_prompt,
+                max_tokens=3000,
+                temperature=0.1,
+                cache_agent="checker",
+                force_refresh=force_refresh,
+                use_batch=use_batch
+            )
+            
+            if response:
+                return self._parse_json_response(response)
+            
+            return None
+            
+        except Exception as e:
+            logger.error(f"Error in checker_agent: {e}")
+            return None
+    
+    async def bull_commentator_agent(
+        self,
+        generator_output: Dict[str, Any],
+        checker_output: Dict[str, Any],
+        force_refresh: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """The Bull Commentator Agent - provides optimistic investment thesis."""
+        if not self.client:
+            return None
+        
+        system_prompt = _BULL_SYSTEM_PROMPT
+
+        prompt = f"""
+Given the following analysis and validation report, provide a bullish investment commentary:
+
+ORIGINAL ANALYSIS:
+{_dumps_for_prompt(generator_output)}
+
+VALIDATION REPORT:
+{_dumps_for_prompt(checker_output)}
+
+Provide a growth-oriented bull case following the exact JSON structure specified.
+        """
+        
+        try:
+            response = await self.generate_completion(
+                prompt=prompt,
+                system_prompt=system_prompt,
+                max_tokens=2500,
+                temperature=0.3,
+                cache_agent="bull_commentator",
+                force_refresh=force_refresh
+            )
+            
+            if response:
+                return self._parse_json_response(response)
+            
+            return None
+            
+        except Exception as e:
             logger.error(f"Error in bull_commentator_agent: {e}")
             return None
     
     async def bear_commentator_agent(
         self,
         generator_output: Dict[str, Any],
-        checker_output: Dict[str, Any]
+        checker_output: Dict[str, Any],
+        force_refresh: bool = False
     ) -> Optional[Dict[str, Any]]:
         """The Bear Commentator Agent - provides conservative/risk-focused thesis."""
         if not self.client:
             return None
         
-        system_prompt = """You are a conservative, value-focused financial strategist with expertise in risk assessment and downside protection.
-
-Your output must be valid JSON in exactly this structure:
-{
-  "bear_commentary": {
-    "summary_of_assumptions": "Brief summary of key DCF and sensitivity assumptions",
-    "bearish_implications": "Explanation of key risks and pessimistic implications",
-    "recommended_modifications": [
-      {
-        "assumption": "revenue_growth_rate",
-        "current_value": 8.5,
-        "recommended_value": 5.0,
-        "justification": "Specific reasoning citing risks or conservative factors"
-      }
-    ],
-    "downside_risks": [
-      "Risk 1 with specific impact analysis",
-      "Risk 2 with specific impact analysis"
-    ],
-    "conservative_price_scenario": "Conservative price target with reasoning"
-  }
-}
-
-Be cautious and risk-focused but fair in your assessment."""
+        system_prompt = _BEAR_SYSTEM_PROMPT
 
         prompt = f"""
 Given the following analysis and validation report, provide a bearish investment commentary:
 
 ORIGINAL ANALYSIS:
-{json.dumps(generator_output, indent=2)}
+{_dumps_for_prompt(generator_output)}
 
 VALIDATION REPORT:
-{json.dumps(checker_output, indent=2)}
+{_dumps_for_prompt(checker_output)}
 
 Provide a conservative bear case following the exact JSON structure specified.
         """
@@ -577,31 +1422,73 @@ Provide a conservative bear case following the exact JSON structure specified.
                 prompt=prompt,
                 system_prompt=system_prompt,
                 max_tokens=2500,
-                temperature=0.3
+                temperature=0.3,
+                cache_agent="bear_commentator",
+                force_refresh=force_refresh
             )
             
             if response:
-                try:
-                    return json.loads(response)
-                except json.JSONDecodeError:
-                    start = response.find('{')
-                    end = response.rfind('}') + 1
-                    if start != -1 and end != 0:
-                        return json.loads(response[start:end])
-                    
+                return self._parse_json_response(response)
+            
             return None
             
         except Exception as e:
             logger.error(f"Error in bear_commentator_agent: {e}")
             return None
     
-    async def technical_analyst_agent(self, indicator_values: Dict[str, Any], ticker: str = "") -> Optional[str]:
+    async def run_full_pipeline(
+        self,
+        company_data: Dict[str, Any],
+        news_articles: List[Dict[str, Any]],
+        force_refresh: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Run Generator -> Checker -> Bull/Bear with maximum overlap.
+        
+        The Bull and Bear commentators only depend on the Generator and Checker
+        outputs, so they are issued concurrently.
+        
+        Returns:
+            Dict with generator, checker, bull and bear outputs, or None if any stage fails
+        """
+        generator_output = await self.generator_agent(company_data, news_articles, force_refresh)
+        if not generator_output:
+            logger.error("Generator agent failed")
+            return None
+        
+        checker_output = await self.checker_agent(generator_output, force_refresh)
+        if not checker_output:
+            logger.error("Checker agent failed")
+            return None
+        
+        bull_output, bear_output = await asyncio.gather(
+            self.bull_commentator_agent(generator_output, checker_output, force_refresh),
+            self.bear_commentator_agent(generator_output, checker_output, force_refresh)
+        )
+        if not bull_output or not bear_output:
+            logger.error("Commentator agents failed")
+            return None
+        
+        return {
+            "generator": generator_output,
+            "checker": checker_output,
+            "bull": bull_output,
+            "bear": bear_output
+        }
+    
+    async def technical_analyst_agent(
+        self,
+        indicator_values: Dict[str, Any],
+        ticker: str = "",
+        force_refresh: bool = False
+    ) -> Optional[str]:
         """
         Technical Analyst Agent: Provides commentary on technical indicators
         
         Args:
             indicator_values: Dictionary containing calculated technical indicator values
             ticker: Stock ticker symbol for currency formatting
+            force_refresh: Bypass the persistent agent response cache
             
         Returns:
             Technical analysis summary as a string
@@ -613,46 +1500,20 @@ Provide a conservative bear case following the exact JSON structure specified.
         try:
             logger.info("Running Technical Analyst Agent")
             
-            # Format indicator values for the prompt
-            indicators_text = []
-            for key, value in indicator_values.items():
-                if key == 'signals':
-                    indicators_text.append(f"Detected Signals: {', '.join(value)}")
-                else:
-                    indicators_text.append(f"{key}: {value}")
-            
-            indicators_summary = "\n".join(indicators_text)
-            
-            prompt = f"""
-Based on the following calculated technical indicator values, provide a concise summary (one paragraph) interpreting the current technical picture of the stock. Your tone should be objective and educational. Explain the meaning of the key signals (e.g., crossovers, overbought/oversold levels, proximity to support/resistance, and Bollinger Band position) in plain, accessible English.
-
-TECHNICAL INDICATORS:
-{indicators_summary}
-
-Provide a single paragraph that:
-1. Summarizes the overall technical health of the stock
-2. Explains what the key indicators are telling us
-3. Mentions any significant signals or patterns
-4. Uses educational language accessible to both novice and experienced investors
-5. Remains objective and avoids strong buy/sell recommendations
-
-Focus on interpreting the data rather than making investment recommendations.
-            """
-            
-            # Determine currency based on ticker
-            currency_symbol = "₹" if ticker.endswith('.NS') else "$"
+            prompt, system_prompt = self._build_technical_prompts(indicator_values, ticker)
             
             response = await self.generate_completion(
                 prompt=prompt,
-                system_prompt=f"You are an expert technical analyst providing educational commentary for a fintech dashboard. Be objective, educational, and clear in your explanations. Use {currency_symbol} for all price references (Indian stocks use ₹, US stocks use $).",
+                system_prompt=system_prompt,
                 max_tokens=500,
-                temperature=0.3
+                temperature=0.3,
+                cache_agent="technical_analyst",
+                force_refresh=force_refresh
             )
             
             if response:
                 # Clean the response
-                import re
-                cleaned_response = re.sub(r'[\x00-\x1f\x7f-\x9f]', '', response).strip()
+                cleaned_response = response.translate(_CONTROL_CHARS).strip()
                 logger.info("Technical Analyst Agent completed successfully")
                 return cleaned_response
             else:
@@ -663,11 +1524,71 @@ Focus on interpreting the data rather than making investment recommendations.
             logger.error(f"Error in technical_analyst_agent: {e}")
             return None
     
+    async def technical_analyst_agent_stream(
+        self,
+        indicator_values: Dict[str, Any],
+        ticker: str = "",
+        force_refresh: bool = False
+    ) -> AsyncIterator[str]:
+        """
+        Streaming variant of technical_analyst_agent.
+        
+        Yields the commentary paragraph as it is generated so the dashboard can
+        render it progressively.
+        """
+        if not self.is_available():
+            logger.warning("Claude service not available for technical_analyst_agent_stream")
+            return
+        
+        prompt, system_prompt = self._build_technical_prompts(indicator_values, ticker)
+        
+        async for delta in self.generate_completion_stream(
+            prompt=prompt,
+            system_prompt=system_prompt,
+            max_tokens=500,
+            temperature=0.3,
+            cache_agent="technical_analyst",
+            force_refresh=force_refresh
+        ):
+            cleaned_delta = delta.translate(_CONTROL_CHARS)
+            if cleaned_delta:
+                yield cleaned_delta
+    
+    def _build_technical_prompts(self, indicator_values: Dict[str, Any], ticker: str) -> Tuple[str, str]:
+        """Build the (prompt, system_prompt) pair for the Technical Analyst Agent."""
+        # Format indicator values for the prompt
+        indicators_summary = "\n".join(
+            f"Detected Signals: {', '.join(value)}" if key == 'signals' else f"{key}: {value}"
+            for key, value in indicator_values.items()
+        )
+        
+        prompt = f"""
+Based on the following calculated technical indicator values, provide a concise summary (one paragraph) interpreting the current technical picture of the stock. Your tone should be objective and educational. Explain the meaning of the key signals (e.g., crossovers, overbought/oversold levels, proximity to support/resistance, and Bollinger Band position) in plain, accessible English.
+
+TECHNICAL INDICATORS:
+{indicators_summary}
+
+Provide a single paragraph that:
+1. Summarizes the overall technical health of the stock
+2. Explains what the key indicators are telling us
+3. Mentions any significant signals or patterns
+4. Uses educational language accessible to both novice and experienced investors
+5. Remains objective and avoids strong buy/sell recommendations
+
+Focus on interpreting the data rather than making investment recommendations.
+        """
+        
+        # Currency-specific system prompt based on ticker
+        system_prompt = _TECHNICAL_SYSTEM_PROMPT_INR if ticker.endswith('.NS') else _TECHNICAL_SYSTEM_PROMPT_USD
+        
+        return prompt, system_prompt
+    
     async def analyze_news_sentiment(
         self,
         ticker: str,
         articles: List[Dict[str, Any]],
-        analysis_depth: str = "advanced"
+        analysis_depth: str = "advanced",
+        force_refresh: bool = False
     ) -> Dict[str, Any]:
         """
         Analyze news articles sentiment and provide investment insights.
@@ -676,6 +1597,7 @@ Focus on interpreting the data rather than making investment recommendations.
             ticker: Stock ticker symbol
             articles: List of news articles with title, content, url
             analysis_depth: "sentiment_only", "advanced", or "investment_insights"
+            force_refresh: Bypass the persistent agent response cache
             
         Returns:
             Dictionary with sentiment analysis, themes, and investment implications
@@ -684,40 +1606,32 @@ Focus on interpreting the data rather than making investment recommendations.
             logger.warning("Claude client not available for news sentiment analysis")
             return self._get_fallback_news_insights(ticker, articles)
         
+        if not articles:
+            # Nothing for Claude to analyze; don't pay for a "no news" answer
+            fallback = self._get_fallback_news_insights(ticker, [])
+            fallback["skipped_reason"] = "no_input_data"
+            return fallback
+        
         try:
+            self._intern_article_fields(articles)
             logger.info(f"🤖 Analyzing {len(articles)} articles with Claude for {ticker} (depth: {analysis_depth})")
             
             if analysis_depth == "sentiment_only":
-                return await self._analyze_sentiment_only(ticker, articles)
+                return await self._analyze_sentiment_only(ticker, articles, force_refresh)
             elif analysis_depth == "advanced":
-                return await self._analyze_advanced_sentiment(ticker, articles)
+                return await self._analyze_advanced_sentiment(ticker, articles, force_refresh)
             elif analysis_depth == "investment_insights":
-                return await self._analyze_investment_insights(ticker, articles)
+                return await self._analyze_investment_insights(ticker, articles, force_refresh)
             else:
-                return await self._analyze_advanced_sentiment(ticker, articles)
+                return await self._analyze_advanced_sentiment(ticker, articles, force_refresh)
                 
         except Exception as e:
             logger.error(f"❌ Error in Claude news sentiment analysis for {ticker}: {str(e)}")
             return self._get_fallback_news_insights(ticker, articles)
     
-    async def _analyze_sentiment_only(self, ticker: str, articles: List[Dict]) -> Dict[str, Any]:
+    async def _analyze_sentiment_only(self, ticker: str, articles: List[Dict], force_refresh: bool = False) -> Dict[str, Any]:
         """Basic sentiment analysis only"""
-        system_prompt = """You are a financial news sentiment analyst. Analyze the provided news articles and return ONLY a JSON object with sentiment analysis.
-        
-Your output must be valid JSON in exactly this structure:
-{
-  "overall_sentiment_score": 0.15,
-  "sentiment_label": "slightly_positive",
-  "confidence": 0.8,
-  "key_sentiment_drivers": [
-    "Positive earnings growth outlook",
-    "Regulatory concerns mentioned",
-    "Market expansion plans announced"
-  ]
-}
-        
-Sentiment score range: -1.0 (very negative) to +1.0 (very positive)
-Sentiment labels: strongly_negative, negative, slightly_negative, neutral, slightly_positive, positive, strongly_positive"""
+        system_prompt = _SENTIMENT_ONLY_SYSTEM_PROMPT
         
         articles_text = self._format_articles_for_analysis(articles, max_articles=10)
         
@@ -733,7 +1647,9 @@ Provide sentiment analysis in the exact JSON format specified. Focus on investme
             prompt=prompt,
             system_prompt=system_prompt,
             max_tokens=1000,
-            temperature=0.2
+            temperature=0.2,
+            cache_agent="news_sentiment",
+            force_refresh=force_refresh
         )
         
         if response:
@@ -747,49 +1663,9 @@ Provide sentiment analysis in the exact JSON format specified. Focus on investme
         
         return self._get_fallback_news_insights(ticker, articles)
     
-    async def _analyze_advanced_sentiment(self, ticker: str, articles: List[Dict]) -> Dict[str, Any]:
+    async def _analyze_advanced_sentiment(self, ticker: str, articles: List[Dict], force_refresh: bool = False) -> Dict[str, Any]:
         """Advanced sentiment analysis with themes and investment context"""
-        system_prompt = """You are an expert financial analyst specializing in news sentiment analysis for investment decisions.
-        
-Your output must be valid JSON in exactly this structure:
-{
-  "sentiment_summary": {
-    "overall_score": 0.25,
-    "label": "cautiously_positive",
-    "confidence": 0.85,
-    "trend": "improving"
-  },
-  "key_themes": [
-    {
-      "theme": "Earnings Performance",
-      "sentiment": "positive",
-      "impact": "high",
-      "description": "Strong quarterly results exceeded expectations",
-      "supporting_articles": 3
-    }
-  ],
-  "investment_implications": {
-    "bullish_factors": [
-      "Revenue growth accelerating in core segments",
-      "Management guidance raised for full year"
-    ],
-    "bearish_factors": [
-      "Regulatory headwinds in key markets",
-      "Rising input cost pressures"
-    ],
-    "neutral_factors": [
-      "Market volatility affecting sector performance"
-    ]
-  },
-  "risk_sentiment": {
-    "regulatory_risk": "moderate",
-    "market_risk": "low", 
-    "operational_risk": "low",
-    "financial_risk": "low"
-  }
-}
-        
-Be specific and quantitative where possible. Focus on investment-relevant insights."""
+        system_prompt = _ADVANCED_SENTIMENT_SYSTEM_PROMPT
         
         articles_text = self._format_articles_for_analysis(articles, max_articles=10)
         company_name = self._get_company_name_from_ticker(ticker)
@@ -812,7 +1688,9 @@ Be concise but thorough in your analysis.
             prompt=prompt,
             system_prompt=system_prompt,
             max_tokens=2500,
-            temperature=0.3
+            temperature=0.3,
+            cache_agent="news_sentiment",
+            force_refresh=force_refresh
         )
         
         if response:
@@ -827,50 +1705,9 @@ Be concise but thorough in your analysis.
         
         return self._get_fallback_news_insights(ticker, articles)
     
-    async def _analyze_investment_insights(self, ticker: str, articles: List[Dict]) -> Dict[str, Any]:
+    async def _analyze_investment_insights(self, ticker: str, articles: List[Dict], force_refresh: bool = False) -> Dict[str, Any]:
         """Investment-focused insights and recommendations"""
-        system_prompt = """You are a senior equity research analyst providing actionable investment insights based on news analysis.
-        
-Your output must be valid JSON in exactly this structure:
-{
-  "investment_thesis": {
-    "summary": "Brief 2-sentence investment case based on recent news",
-    "conviction_level": "high",
-    "time_horizon": "medium_term",
-    "price_catalyst_timeline": "3-6 months"
-  },
-  "key_catalysts": [
-    {
-      "catalyst": "Q3 Earnings Release",
-      "timing": "Next 4-6 weeks", 
-      "impact": "high",
-      "sentiment": "positive",
-      "description": "Expected to show continued margin expansion"
-    }
-  ],
-  "risk_factors": [
-    {
-      "risk": "Regulatory Changes",
-      "probability": "medium",
-      "impact": "high",
-      "timeline": "6-12 months",
-      "mitigation": "Company has strong compliance track record"
-    }
-  ],
-  "sentiment_trajectory": {
-    "current": "positive",
-    "recent_change": "improving",
-    "momentum": "accelerating",
-    "sustainability": "likely"
-  },
-  "actionable_insights": [
-    "Monitor Q3 earnings for margin expansion trends",
-    "Watch for management commentary on expansion plans",
-    "Track regulatory developments in core markets"
-  ]
-}
-        
-Focus on actionable, time-bound insights for investment decisions."""
+        system_prompt = _INVESTMENT_INSIGHTS_SYSTEM_PROMPT
         
         articles_text = self._format_articles_for_analysis(articles, max_articles=8)
         company_name = self._get_company_name_from_ticker(ticker)
@@ -893,7 +1730,9 @@ Be specific about timing, probability, and impact levels.
             prompt=prompt,
             system_prompt=system_prompt,
             max_tokens=2000,
-            temperature=0.3
+            temperature=0.3,
+            cache_agent="news_sentiment",
+            force_refresh=force_refresh
         )
         
         if response:
@@ -908,44 +1747,65 @@ Be specific about timing, probability, and impact levels.
         
         return self._get_fallback_news_insights(ticker, articles)
     
+    def _parse_json_response(self, response: str) -> Optional[Dict[str, Any]]:
+        """Parse the first JSON object in a Claude response, ignoring surrounding text and control characters."""
+        cleaned_response = response.translate(_CONTROL_CHARS)
+        start = cleaned_response.find('{')
+        if start != -1:
+            # Common case: one object, possibly inside a markdown fence or a prose preamble
+            end = cleaned_response.rfind('}')
+            try:
+                return orjson.loads(cleaned_response[start:end + 1])
+            except orjson.JSONDecodeError:
+                pass
+            
+            # Trailing prose containing braces: decode just the first complete object
+            try:
+                parsed, _ = _JSON_DECODER.raw_decode(cleaned_response, start)
+                return parsed
+            except json.JSONDecodeError:
+                pass
+        
+        logger.warning("Failed to parse JSON response, using fallback")
+        return None
+    
     def _format_articles_for_analysis(self, articles: List[Dict], max_articles: int = 10) -> str:
         """Format articles for Claude analysis"""
         if not articles:
             return "No recent articles available for analysis."
         
-        formatted_articles = []
-        for i, article in enumerate(articles[:max_articles]):
-            title = article.get('title', 'No title')[:200]
-            summary = article.get('summary', article.get('content', ''))[:400]
-            date = article.get('published_date', 'Date unknown')
-            source = article.get('source', {}).get('name', 'Unknown source')
-            
-            formatted_articles.append(
-                f"Article {i+1}:\n"
-                f"Source: {source}\n"
-                f"Date: {date}\n"
-                f"Title: {title}\n"
-                f"Summary: {summary}\n"
-            )
-        
-        return "\n---\n\n".join(formatted_articles)
-    
-    def _get_company_name_from_ticker(self, ticker: str) -> str:
-        """Get company name from ticker"""
-        ticker_to_name = {
-            'RELIANCE.NS': 'Reliance Industries Limited',
-            'TCS.NS': 'Tata Consultancy Services',
-            'HDFCBANK.NS': 'HDFC Bank Limited',
-            'INFY.NS': 'Infosys Limited',
-            'ICICIBANK.NS': 'ICICI Bank Limited',
-            'HINDUNILVR.NS': 'Hindustan Unilever Limited',
-            'ITC.NS': 'ITC Limited',
-            'SBIN.NS': 'State Bank of India',
-            'BHARTIARTL.NS': 'Bharti Airtel Limited',
-            'KOTAKBANK.NS': 'Kotak Mahindra Bank Limited'
-        }
-        
-        return ticker_to_name.get(ticker, ticker.replace('.NS', ' Limited'))
+        max_articles = min(max_articles, len(_ARTICLE_PREFIXES))
+        return _ARTICLE_SEP.join([
+            f"{_ARTICLE_PREFIXES[i]}"
+            f"Source: {(article.get('source') or {}).get('name', 'Unknown source')}\n"
+            f"Date: {article.get('published_date', 'Date unknown')}\n"
+            f"Title: {article.get('title', 'No title')[:200]}\n"
+            f"Summary: {(article.get('summary') or article.get('content') or '')[:400]}\n"
+            for i, article in enumerate(self._select_distinct_articles(articles, max_articles))
+        ])
+    
+    def _select_distinct_articles(self, articles: List[Dict], max_articles: int) -> List[Dict]:
+        """Greedily keep articles whose titles aren't near-duplicates of one already kept."""
+        titles = np.stack([_embed_title(article.get('title') or '') for article in articles])
+        kept: List[int] = []
+        for i in range(len(articles)):
+            if kept and float(np.max(titles[kept] @ titles[i])) >= self.article_similarity_threshold:
+                continue
+            kept.append(i)
+            if len(kept) == max_articles:
+                break
+        return [articles[i] for i in kept]
+    
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _get_company_name_from_ticker(ticker: str) -> str:
+        """Get company name from ticker (memoized, so fallback names are built once)"""
+        name = _TICKER_TO_NAME.get(ticker)
+        if name:
+            return name
+        if ticker.endswith('.NS'):
+            return f"{ticker.removesuffix('.NS')} Limited"
+        return ticker
     
     def _get_fallback_news_insights(self, ticker: str, articles: List[Dict]) -> Dict[str, Any]:
         """Fallback insights when Claude analysis fails"""
@@ -983,39 +1843,11 @@ Be specific about timing, probability, and impact levels.
     def _format_financial_data(self, company_data: Dict[str, Any]) -> str:
         """Format financial data for AI consumption."""
         try:
-            import math
             info = company_data.get('info', {})
-            
-            def safe_format(value, default=0, is_percentage=False, is_currency=False):
-                """Safely format a value, handling NaN and None"""
-                if value is None or (isinstance(value, float) and (math.isnan(value) or math.isinf(value))):
-                    return "N/A"
-                if is_percentage:
-                    return f"{value:.2%}"
-                elif is_currency:
-                    return f"${value:,.0f}"
-                else:
-                    return f"{value:.2f}"
-            
-            return f"""
-Company: {info.get('longName', 'N/A')}
-Sector: {info.get('sector', 'N/A')}
-Industry: {info.get('industry', 'N/A')}
-Market Cap: {safe_format(info.get('marketCap'), is_currency=True)}
-Revenue (TTM): {safe_format(info.get('totalRevenue'), is_currency=True)}
-EBITDA: {safe_format(info.get('ebitda'), is_currency=True)}
-Profit Margin: {safe_format(info.get('profitMargins'), is_percentage=True)}
-ROE: {safe_format(info.get('returnOnEquity'), is_percentage=True)}
-Debt/Equity: {safe_format(info.get('debtToEquity'))}
-Current Ratio: {safe_format(info.get('currentRatio'))}
-P/E Ratio: {safe_format(info.get('trailingPE'))}
-Forward P/E: {safe_format(info.get('forwardPE'))}
-PEG Ratio: {safe_format(info.get('pegRatio'))}
-Price/Book: {safe_format(info.get('priceToBook'))}
-52-Week High: {safe_format(info.get('fiftyTwoWeekHigh'), is_currency=True)}
-52-Week Low: {safe_format(info.get('fiftyTwoWeekLow'), is_currency=True)}
-Beta: {safe_format(info.get('beta'))}
-            """
+            values = {key: info.get(key, 'N/A') for key in _FINANCIAL_TEXT_FIELDS}
+            for key, kind in _FINANCIAL_METRIC_FIELDS:
+                values[key] = _format_metric(info.get(key), kind)
+            return _FINANCIAL_DATA_TEMPLATE.format_map(values)
         except Exception as e:
             logger.error(f"Error formatting financial data: {e}")
             return "Financial data formatting error"
@@ -1034,14 +1866,25 @@ class AgenticAnalysisService(ClaudeService):
     def __init__(self):
         super().__init__()
         # Memory cache for session-level caching
-        self.core_analysis_cache = {}
-        self.sentiment_cache = {}
         self.cache_ttl = timedelta(hours=6)  # 6-hour cache for AI responses
+        self.core_analysis_cache = TTLCache(maxsize=512, ttl=self.cache_ttl.total_seconds())
+        self.sentiment_cache = TTLCache(maxsize=512, ttl=self.cache_ttl.total_seconds())
         
         # Cost optimization settings
         self.use_cost_optimized_model = True  # Use cheaper models when possible
-        self.max_tokens_core = 3000  # Reduced from 4000
+        # Per ticker: the core schema caps its fields at ~365 words (~600 tokens of JSON)
+        self.max_tokens_core = 1000  # Reduced from 3000 so several tickers share one call
         self.max_tokens_sentiment = 2000  # Reduced from 3000
+        
+        # Tickers per core-analysis call, so the combined output budget fits the model's ceiling
+        model_max_tokens = _max_output_tokens(DEFAULT_CLAUDE_MODEL)
+        self.core_batch_size = model_max_tokens // self.max_tokens_core
+        assert self.core_batch_size >= 2, "max_tokens_core leaves no room to batch tickers"
+    
+    def _compute_cache_key(self, ticker: str, *payloads: Any) -> str:
+        """Deterministic key over the full analysis inputs and prompt version."""
+        key_string = json.dumps([PROMPT_VERSION, ticker, *payloads], sort_keys=True, default=str)
+        return f"{ticker}_{hashlib.blake2b(key_string.encode(), digest_size=16).hexdigest()}"
     
     async def generate_comprehensive_agentic_analysis(
         self, 
@@ -1061,9 +1904,11 @@ class AgenticAnalysisService(ClaudeService):
             logger.info(f"Starting comprehensive agentic analysis for {ticker}")
             
             # Check persistent cache first
-            cache_key = f"{ticker}_agentic_comprehensive"
+            cache_key = self._compute_cache_key(
+                ticker, "comprehensive", company_data, dcf_results, technical_data, news_data, peer_data
+            )
             cached_result = await intelligent_cache.get(
-                CacheType.AI_ANALYSIS, cache_key
+                CacheType.AI_ANALYSIS, ticker, content_hash=cache_key
             )
             
             if cached_result:
@@ -1079,21 +1924,22 @@ class AgenticAnalysisService(ClaudeService):
                 ticker, news_data or [], peer_data or {}
             )
             
-            # Run both calls concurrently to save time
-            import asyncio
-            core_analysis, sentiment_analysis = await asyncio.gather(
-                core_analysis_task, 
-                sentiment_analysis_task,
-                return_exceptions=True
-            )
+            # Run both calls concurrently to save time; a terminal error cancels the sibling
+            try:
+                async with asyncio.TaskGroup() as tg:
+                    core_task = tg.create_task(core_analysis_task)
+                    sentiment_task = tg.create_task(sentiment_analysis_task)
+            except* Exception as eg:
+                for error in eg.exceptions:
+                    logger.error(f"Agentic analysis call failed for {ticker}: {error}")
             
-            # Handle exceptions gracefully
-            if isinstance(core_analysis, Exception):
-                logger.error(f"Core analysis failed for {ticker}: {core_analysis}")
+            # Handle failed or cancelled calls gracefully
+            core_analysis = self._task_result(core_task)
+            if core_analysis is None:
                 core_analysis = self._get_fallback_core_analysis()
             
-            if isinstance(sentiment_analysis, Exception):
-                logger.error(f"Sentiment analysis failed for {ticker}: {sentiment_analysis}")
+            sentiment_analysis = self._task_result(sentiment_task)
+            if sentiment_analysis is None:
                 sentiment_analysis = self._get_fallback_sentiment_analysis()
             
             # Combine results
@@ -1124,9 +1970,9 @@ class AgenticAnalysisService(ClaudeService):
             # Cache the result
             await intelligent_cache.set(
                 CacheType.AI_ANALYSIS,
-                cache_key,
+                ticker,
                 comprehensive_result,
-                ttl_hours=6
+                content_hash=cache_key
             )
             
             logger.info(f"Completed comprehensive analysis for {ticker}, estimated cost: ${comprehensive_result['cost_breakdown']['estimated_cost']:.3f}")
@@ -1144,82 +1990,126 @@ class AgenticAnalysisService(ClaudeService):
         technical_data: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Batched core analysis: Investment Thesis + DCF + Financial + Technical"""
+        results = await self.generate_batched_core_analysis(
+            [ticker],
+            [{"company_data": company_data, "dcf_results": dcf_results, "technical_data": technical_data}]
+        )
+        return results[ticker]
+    
+    async def generate_batched_core_analysis(
+        self,
+        tickers: List[str],
+        payloads: List[Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Core analysis for several tickers, packing core_batch_size of them into each
+        Claude call so the shared system prompt and schema are paid once per call
+        while the combined output stays within the model's output-token limit.
         
-        # Check memory cache
-        cache_key = f"{ticker}_core_batch"
-        if cache_key in self.core_analysis_cache:
-            cached_entry = self.core_analysis_cache[cache_key]
-            if datetime.now() - cached_entry["timestamp"] < self.cache_ttl:
-                return cached_entry["data"]
-        
-        system_prompt = """You are a financial analyst for Indian retail investors. Be precise, avoid repetition, and use structured output.
-
-Your output must be valid JSON in exactly this structure:
-{
-  "investment_thesis": "1-2 sentence investment case summary (max 80 words)",
-  "dcf_commentary": [
-    "Key Growth Driver: [40 words max]",
-    "Valuation Gap: [40 words max]", 
-    "Main Risk: [40 words max]"
-  ],
-  "financial_health": [
-    "Revenue Trend: [35 words max]",
-    "Margin Analysis: [35 words max]",
-    "Balance Sheet: [35 words max]"
-  ],
-  "technical_outlook": [
-    "Trend Direction: [30 words max]",
-    "Entry Signal: [30 words max]"
-  ]
-}"""
-
-        # Format data for prompt
-        financial_summary = self._format_financial_data(company_data)
-        dcf_summary = self._format_dcf_data(dcf_results)
-        technical_summary = self._format_technical_data(technical_data)
+        Args:
+            tickers: Ticker symbols, aligned with payloads
+            payloads: Dicts with company_data, dcf_results and technical_data
+            
+        Returns:
+            Core analysis keyed by ticker (fallback analysis for any ticker that fails)
+        """
+        system_prompt = _CORE_BATCH_SYSTEM_BLOCKS
         
-        prompt = f"""
-Analyze {company_data.get('info', {}).get('longName', ticker)} ({ticker}) and provide structured output:
+        results = {}
+        pending = []
+        for ticker, payload in zip(tickers, payloads):
+            company_data = payload.get("company_data") or {}
+            dcf_results = payload.get("dcf_results") or {}
+            technical_data = payload.get("technical_data") or {}
+            
+            # Check memory cache
+            cache_key = self._compute_cache_key(ticker, "core_batch", company_data, dcf_results, technical_data)
+            cached_result = self.core_analysis_cache.get(cache_key)
+            if cached_result is not None:
+                results[ticker] = cached_result
+                continue
+            
+            # Format data for prompt
+            block = f"""
+=== TICKER: {ticker} ===
+Company: {company_data.get('info', {}).get('longName', ticker)}
 
 FINANCIAL DATA:
-{financial_summary}
+{self._format_financial_data(company_data)}
 
 DCF RESULTS:
-{dcf_summary}
+{self._format_dcf_data(dcf_results)}
 
 TECHNICAL INDICATORS:
-{technical_summary}
-
-Provide analysis in the exact JSON structure specified. Focus on key insights for Indian retail investors.
+{self._format_technical_data(technical_data)}
+"""
+            pending.append((ticker, cache_key, block))
+        
+        if not pending:
+            return results
+        
+        chunks = [
+            pending[i:i + self.core_batch_size]
+            for i in range(0, len(pending), self.core_batch_size)
+        ]
+        chunk_results = await asyncio.gather(*(
+            self._core_analysis_chunk(chunk, system_prompt) for chunk in chunks
+        ))
+        for chunk_result in chunk_results:
+            results.update(chunk_result)
+        
+        return results
+    
+    async def _core_analysis_chunk(
+        self,
+        pending: List[Tuple[str, str, str]],
+        system_prompt: List[Dict[str, Any]]
+    ) -> Dict[str, Dict[str, Any]]:
+        """One core-analysis Claude call for up to core_batch_size uncached tickers."""
+        results = {}
+        prompt = f"""
+Analyze the following companies and provide structured output:
+{"".join(block for _, _, block in pending)}
+Provide analysis in the exact JSON structure specified, with one "results" entry per ticker. Focus on key insights for Indian retail investors.
         """
         
+        entries = {}
+        usage = {}
         try:
-            response = await self.generate_completion(
+            parsed, usage = await self.generate_json_completion(
                 prompt=prompt,
                 system_prompt=system_prompt,
-                max_tokens=self.max_tokens_core,
-                temperature=0.2
+                max_tokens=self.max_tokens_core * len(pending),
+                temperature=0.2,
+                tool=_CORE_ANALYSIS_TOOL
             )
             
-            if response:
-                # Parse JSON response
-                result = self._parse_json_response(response)
-                if result:
-                    result["token_usage"] = len(prompt.split()) + len(response.split())
-                    
-                    # Cache in memory
-                    self.core_analysis_cache[cache_key] = {
-                        "data": result,
-                        "timestamp": datetime.now()
-                    }
-                    
-                    return result
+            if parsed and isinstance(parsed.get("results"), list):
+                entries = {
+                    entry.get("ticker"): entry
+                    for entry in parsed["results"]
+                    if isinstance(entry, dict)
+                }
                     
-            return self._get_fallback_core_analysis()
-            
         except Exception as e:
-            logger.error(f"Error in core analysis batch for {ticker}: {e}")
-            return self._get_fallback_core_analysis()
+            logger.error(f"Error in core analysis batch for {[t for t, _, _ in pending]}: {e}")
+        
+        # Split the call's usage across the tickers it actually produced results for
+        usage_share = max(sum(1 for ticker, _, _ in pending if entries.get(ticker)), 1)
+        for ticker, cache_key, _ in pending:
+            result = entries.get(ticker)
+            if not result:
+                results[ticker] = self._get_fallback_core_analysis()
+                continue
+            
+            result.pop("ticker", None)
+            self._record_token_usage(result, usage, share=usage_share)
+            
+            # Cache in memory
+            self.core_analysis_cache[cache_key] = result
+            results[ticker] = result
+        
+        return results
     
     async def generate_sentiment_context_batch(
         self,
@@ -1229,35 +2119,26 @@ Provide analysis in the exact JSON structure specified. Focus on key insights fo
     ) -> Dict[str, Any]:
         """Batched sentiment: News + Peer context analysis"""
         
-        # Check memory cache
-        cache_key = f"{ticker}_sentiment_batch"
-        if cache_key in self.sentiment_cache:
-            cached_entry = self.sentiment_cache[cache_key]
-            if datetime.now() - cached_entry["timestamp"] < self.cache_ttl:
-                return cached_entry["data"]
+        if not news_data and not (peer_data or {}).get('peers'):
+            # Nothing for Claude to analyze; don't pay for a "no news" answer
+            fallback = self._get_fallback_sentiment_analysis()
+            fallback["skipped_reason"] = "no_input_data"
+            return fallback
         
-        system_prompt = """You are a financial analyst specializing in sentiment and competitive analysis.
-
-Your output must be valid JSON in exactly this structure:
-{
-  "news_sentiment": {
-    "overall_tone": "Positive/Mixed/Negative",
-    "key_themes": [
-      "Theme 1: [35 words max]",
-      "Theme 2: [35 words max]"
-    ],
-    "insider_activity": "Brief summary if significant [30 words max]"
-  },
-  "peer_context": [
-    "Relative Valuation: [40 words max]",
-    "Competitive Position: [40 words max]"
-  ]
-}"""
-
         # Format data
         news_summary = self._format_news_data(news_data)
         peer_summary = self._format_peer_data(peer_data)
         
+        # Check memory cache, keyed on the headlines the prompt actually contains (case and
+        # whitespace normalized) so refetched articles with new URLs or timestamps still hit
+        headlines = " ".join(news_summary.casefold().split())
+        cache_key = self._compute_cache_key(ticker, "sentiment_batch", headlines, peer_data)
+        cached_result = self.sentiment_cache.get(cache_key)
+        if cached_result is not None:
+            return cached_result
+        
+        system_prompt = _SENTIMENT_BATCH_SYSTEM_BLOCKS
+        
         prompt = f"""
 Analyze sentiment and market context for {ticker}:
 
@@ -1271,25 +2152,20 @@ Provide analysis in the exact JSON structure specified.
         """
         
         try:
-            response = await self.generate_completion(
+            result, usage = await self.generate_json_completion(
                 prompt=prompt,
                 system_prompt=system_prompt,
                 max_tokens=self.max_tokens_sentiment,
                 temperature=0.2
             )
             
-            if response:
-                result = self._parse_json_response(response)
-                if result:
-                    result["token_usage"] = len(prompt.split()) + len(response.split())
-                    
-                    # Cache in memory
-                    self.sentiment_cache[cache_key] = {
-                        "data": result,
-                        "timestamp": datetime.now()
-                    }
-                    
-                    return result
+            if result:
+                self._record_token_usage(result, usage)
+                
+                # Cache in memory
+                self.sentiment_cache[cache_key] = result
+                
+                return result
                     
             return self._get_fallback_sentiment_analysis()
             
@@ -1303,14 +2179,7 @@ Provide analysis in the exact JSON structure specified.
             return "DCF analysis unavailable"
         
         try:
-            return f"""
-Fair Value: ₹{dcf_results.get('fair_value', 0):.2f}
-Current Price: ₹{dcf_results.get('current_price', 0):.2f}
-Upside/Downside: {dcf_results.get('upside_percent', 0):.1f}%
-Growth Rate Assumption: {dcf_results.get('growth_rate', 0):.1f}%
-WACC: {dcf_results.get('wacc', 0):.1f}%
-Terminal Growth: {dcf_results.get('terminal_growth', 0):.1f}%
-            """
+            return _DCF_DATA_TEMPLATE.format_map({key: dcf_results.get(key, 0) for key in _DCF_DATA_FIELDS})
         except:
             return "DCF data formatting error"
     
@@ -1320,13 +2189,9 @@ Terminal Growth: {dcf_results.get('terminal_growth', 0):.1f}%
             return "Technical analysis unavailable"
         
         try:
-            return f"""
-RSI: {technical_data.get('rsi', 50):.1f}
-MACD Signal: {technical_data.get('macd_signal', 'Neutral')}
-Price vs 50-day MA: {technical_data.get('sma_50_signal', 'Neutral')}
-Volume Trend: {technical_data.get('volume_trend', 'Normal')}
-Support/Resistance: {technical_data.get('support_resistance', 'Neutral')}
-            """
+            return _TECHNICAL_DATA_TEMPLATE.format_map({
+                key: technical_data.get(key, default) for key, default in _TECHNICAL_DATA_DEFAULTS.items()
+            })
         except:
             return "Technical data formatting error"
     
@@ -1363,35 +2228,34 @@ Support/Resistance: {technical_data.get('support_resistance', 'Neutral')}
         except:
             return "Peer data formatting error"
     
-    def _parse_json_response(self, response: str) -> Optional[Dict[str, Any]]:
-        """Parse JSON response with fallback handling"""
-        try:
-            return json.loads(response)
-        except json.JSONDecodeError:
-            # Try to extract JSON from response
-            start = response.find('{')
-            end = response.rfind('}') + 1
-            if start != -1 and end != 0:
-                try:
-                    return json.loads(response[start:end])
-                except json.JSONDecodeError:
-                    pass
-        except Exception:
-            pass
-        
-        logger.warning("Failed to parse JSON response, using fallback")
-        return None
+    @staticmethod
+    def _task_result(task: "asyncio.Task") -> Optional[Dict[str, Any]]:
+        """Result of a finished task, or None if it failed or was cancelled."""
+        if task.cancelled() or task.exception() is not None:
+            return None
+        return task.result()
+    
+    @staticmethod
+    def _record_token_usage(result: Dict[str, Any], usage: Dict[str, int], share: int = 1) -> None:
+        """Attach API-reported token usage (this result's share of a shared call) to a result."""
+        for field in _USAGE_FIELDS:
+            result[field] = usage.get(field, 0) // share
+        result["token_usage"] = sum(result[field] for field in _USAGE_FIELDS)
     
     def _calculate_estimated_cost(self, core_analysis: Dict, sentiment_analysis: Dict) -> float:
-        """Calculate estimated API cost"""
-        total_tokens = core_analysis.get("token_usage", 1000) + sentiment_analysis.get("token_usage", 1000)
-        
-        # Claude-3-Haiku pricing: ~$0.25 per 1M input tokens, ~$1.25 per 1M output tokens
-        # Rough estimate assuming 60% input, 40% output
-        input_cost = (total_tokens * 0.6) * (0.25 / 1000000)
-        output_cost = (total_tokens * 0.4) * (1.25 / 1000000)
-        
-        return input_cost + output_cost
+        """Calculate API cost from the token usage reported by Claude"""
+        return self._aggregate_costs([core_analysis, sentiment_analysis])
+    
+    @staticmethod
+    def _aggregate_costs(results: List[Dict[str, Any]]) -> float:
+        """Total API cost of many results' token usage, priced in one vectorized pass"""
+        if not results:
+            return 0.0
+        usage = np.array(
+            [[result.get(field, 0) for field in _USAGE_FIELDS] for result in results],
+            dtype=np.int64
+        )
+        return float(usage.sum(axis=0) @ _USAGE_PRICES)
     
     def _assess_analysis_quality(self, core_analysis: Dict, sentiment_analysis: Dict) -> str:
         """Assess the quality of the analysis"""
@@ -1406,42 +2270,11 @@ Support/Resistance: {technical_data.get('support_resistance', 'Neutral')}
     
     def _get_fallback_core_analysis(self) -> Dict[str, Any]:
         """Fallback core analysis when AI fails"""
-        return {
-            "investment_thesis": "Analysis based on quantitative metrics and historical performance",
-            "dcf_commentary": [
-                "Growth assumptions based on historical CAGR analysis",
-                "Fair value calculated using sector-appropriate DCF methodology", 
-                "Key risks include market volatility and sector-specific challenges"
-            ],
-            "financial_health": [
-                "Revenue trends analyzed over 3-5 year period",
-                "Profitability metrics compared to sector averages",
-                "Balance sheet strength assessed using debt and liquidity ratios"
-            ],
-            "technical_outlook": [
-                "Technical indicators suggest current market positioning",
-                "Entry timing considerations based on momentum signals"
-            ],
-            "token_usage": 0
-        }
+        return copy.deepcopy(dict(_FALLBACK_CORE_ANALYSIS))
     
     def _get_fallback_sentiment_analysis(self) -> Dict[str, Any]:
         """Fallback sentiment analysis when AI fails"""
-        return {
-            "news_sentiment": {
-                "overall_tone": "Mixed",
-                "key_themes": [
-                    "Limited recent news analysis available",
-                    "Sentiment assessment based on market performance"
-                ],
-                "insider_activity": "No significant insider activity detected"
-            },
-            "peer_context": [
-                "Peer comparison based on quantitative metrics",
-                "Competitive positioning assessed using financial ratios"
-            ],
-            "token_usage": 0
-        }
+        return copy.deepcopy(dict(_FALLBACK_SENTIMENT_ANALYSIS))
     
     def _get_emergency_fallback_analysis(self, ticker: str) -> Dict[str, Any]:
         """Emergency fallback when entire analysis fails"""
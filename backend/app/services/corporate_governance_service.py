@@ -4,20 +4,82 @@
 
 import logging
 import asyncio
-from typing import Dict, List, Optional, Any, Tuple
-from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Any, Tuple, Union, Callable
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from functools import lru_cache
 import yfinance as yf
 import pandas as pd
 import numpy as np
-import requests
-from bs4 import BeautifulSoup
 
 from .intelligent_cache import intelligent_cache, CacheType
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+def _parse_dt(value: Any, default: Optional[datetime] = None) -> datetime:
+    """Parse a cached ISO datetime (including 'Z' offsets, which fromisoformat accepts from Python 3.11)"""
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    elif value:
+        return value
+    return default or datetime.now()
+
+@lru_cache(maxsize=1024)
+def _build_simple_mode_summary(
+    promoter_pct: Optional[float],
+    pledged_pct: Optional[float],
+    recent_years: Optional[int],
+    governance_tier: int,
+    high_pledging: float,
+    moderate_pledging: float
+) -> str:
+    """Simple Mode summary text; memoized because repeat analyses feed identical inputs"""
+    
+    summary_parts = []
+    
+    # Shareholding analysis
+    if promoter_pct is not None:
+        if promoter_pct > 50:
+            summary_parts.append(f"Promoter holding at {promoter_pct:.1f}% indicates strong management control.")
+        elif promoter_pct > 25:
+            summary_parts.append(f"Moderate promoter holding at {promoter_pct:.1f}%.")
+        else:
+            summary_parts.append(f"Low promoter holding at {promoter_pct:.1f}% may indicate dispersed ownership.")
+        
+        # Pledging risk
+        if pledged_pct > high_pledging:
+            summary_parts.append(f"High pledging risk with {pledged_pct:.1f}% of promoter shares pledged.")
+        elif pledged_pct > moderate_pledging:
+            summary_parts.append(f"Moderate pledging at {pledged_pct:.1f}% requires monitoring.")
+        elif pledged_pct > 0:
+            summary_parts.append(f"Low pledging at {pledged_pct:.1f}% is manageable.")
+        else:
+            summary_parts.append("No promoter pledging indicates strong financial position.")
+    
+    # Dividend analysis
+    if recent_years is None:
+        summary_parts.append("No dividend history available.")
+    elif recent_years >= 3:
+        summary_parts.append(f"Consistent dividend payments over {recent_years} years demonstrates shareholder-friendly policy.")
+    elif recent_years >= 1:
+        summary_parts.append(f"Limited dividend history with payments in {recent_years} recent year(s).")
+    else:
+        summary_parts.append("No recent dividend payments.")
+    
+    # Overall governance assessment (tier 2: >75, tier 1: >50)
+    if governance_tier == 2:
+        summary_parts.append("Strong corporate governance practices.")
+    elif governance_tier == 1:
+        summary_parts.append("Adequate corporate governance standards.")
+    else:
+        summary_parts.append("Corporate governance practices need improvement.")
+    
+    return " ".join(summary_parts)
+
+@dataclass(slots=True)
 class ShareholdingPattern:
     """Shareholding pattern breakdown"""
     date: datetime
@@ -27,7 +89,7 @@ class ShareholdingPattern:
     public_percentage: float
     pledged_percentage: float = 0.0  # % of promoter shares pledged
     
-@dataclass
+@dataclass(slots=True)
 class DividendRecord:
     """Historical dividend record"""
     ex_date: datetime
@@ -36,7 +98,7 @@ class DividendRecord:
     dividend_type: str  # 'interim', 'final', 'special'
     announcement_date: Optional[datetime] = None
     
-@dataclass
+@dataclass(slots=True)
 class GovernanceMetrics:
     """Corporate governance quality metrics"""
     promoter_stability_score: float  # 0-100 based on holding consistency
@@ -45,7 +107,7 @@ class GovernanceMetrics:
     transparency_score: float  # 0-100 based on disclosure quality
     overall_governance_score: float  # Weighted average
     
-@dataclass
+@dataclass(slots=True)
 class CorporateGovernanceAnalysis:
     """Complete corporate governance analysis"""
     ticker: str
@@ -57,7 +119,8 @@ class CorporateGovernanceAnalysis:
     shareholding_history: List[ShareholdingPattern]  # Last 8 quarters
     
     # Dividend analysis
-    dividend_history: List[DividendRecord]  # Last 5 years
+    dividend_history: List[DividendRecord]  # Last 8 payments
+    yearly_dividend_sums: List[float]  # Per-year totals, last 5 years (oldest first)
     dividend_yield_ttm: float
     dividend_payout_ratio: float
     
@@ -87,8 +150,14 @@ class CorporateGovernanceService:
     - Intelligent caching with 6-hour refresh
     """
     
+    # Concurrent yfinance requests allowed per service, and retries when Yahoo rate limits
+    yfinance_concurrency = 4
+    max_rate_limit_retries = 3
+    
     def __init__(self, use_cache: bool = True):
         self.use_cache = use_cache
+        self._yfinance_semaphore = asyncio.Semaphore(self.yfinance_concurrency)
+        self._rng = np.random.default_rng()  # Shared generator for synthetic shareholding history
         self.cache_manager = intelligent_cache
         self.cache_duration = timedelta(hours=6)  # 6-hour cache for governance data
         
@@ -103,26 +172,35 @@ class CorporateGovernanceService:
     async def get_corporate_governance_analysis(
         self,
         ticker: str,
-        force_refresh: bool = False
-    ) -> CorporateGovernanceAnalysis:
+        force_refresh: bool = False,
+        raw: bool = False
+    ) -> Union[CorporateGovernanceAnalysis, Dict[str, Any]]:
         """
         Get comprehensive corporate governance analysis
         
         Args:
             ticker: Stock ticker symbol (e.g., 'RELIANCE.NS')
             force_refresh: Skip cache and fetch fresh data
+            raw: Return the JSON-ready cache dict instead of dataclasses, so cache
+                hits skip object reconstruction for callers that serialize anyway
             
         Returns:
             CorporateGovernanceAnalysis with shareholding, dividends, and governance metrics
+            (or its cached dict form when raw=True)
         """
         try:
             logger.info(f"Fetching corporate governance analysis for {ticker}")
             
-            # Check cache first
+            # Check cache first; entries held in memory are served without awaiting disk I/O
             if self.use_cache and not force_refresh:
-                cached_result = await self.cache_manager.get(
+                cached_result = self.cache_manager.peek(
+                    CacheType.FINANCIAL_DATA, f"{ticker}_governance"
+                ) or await self.cache_manager.get(
                     CacheType.FINANCIAL_DATA, f"{ticker}_governance"
                 )
+                if cached_result and raw:
+                    logger.info(f"Cache hit for {ticker} corporate governance - returning cached dict")
+                    return cached_result
                 if cached_result:
                     logger.info(f"Cache hit for {ticker} corporate governance - reconstructing objects")
                     # Reconstruct objects from cached dict
@@ -131,47 +209,39 @@ class CorporateGovernanceService:
                     except Exception as e:
                         logger.warning(f"Failed to reconstruct from cache for {ticker}: {e}, proceeding with fresh calculation")
             
-            # Fetch company info
+            # Fetch company info and dividends concurrently; yfinance blocks on
+            # HTTP, so both run in worker threads to keep the event loop free
             stock = yf.Ticker(ticker)
-            info = stock.info
+            info, dividends = await asyncio.gather(
+                self._get_info(ticker, force_refresh),
+                self._run_yfinance(lambda: stock.dividends),
+                return_exceptions=True
+            )
+            if isinstance(info, Exception):
+                raise info
             company_name = info.get('longName', ticker)
             
-            # Fetch governance data concurrently
-            tasks = [
-                self._fetch_shareholding_data(ticker, stock),
-                self._fetch_dividend_history(ticker, stock),
-                self._fetch_governance_metrics(ticker, info)
-            ]
+            dividends_failed = isinstance(dividends, Exception)
+            if dividends_failed:
+                logger.warning(f"Dividend data fetch failed: {dividends}")
+                dividends = pd.Series(dtype=float)
             
-            shareholding_data, dividend_data, basic_metrics = await asyncio.gather(
-                *tasks, return_exceptions=True
+            # Derive governance data from the fetched payloads, stamped with one timestamp
+            now = datetime.now()
+            latest_shareholding, shareholding_history = self._fetch_shareholding_data(ticker, info, now)
+            dividend_history, yearly_dividend_sums, dividend_yield, payout_ratio = self._fetch_dividend_history(
+                ticker, dividends, info
             )
-            
-            # Handle any exceptions in data fetching
-            if isinstance(shareholding_data, Exception):
-                logger.warning(f"Shareholding data fetch failed: {shareholding_data}")
-                shareholding_data = (None, [])
-            
-            if isinstance(dividend_data, Exception):
-                logger.warning(f"Dividend data fetch failed: {dividend_data}")
-                dividend_data = ([], 0.0, 0.0)
-            
-            if isinstance(basic_metrics, Exception):
-                logger.warning(f"Basic metrics fetch failed: {basic_metrics}")
-                basic_metrics = {}
-            
-            # Unpack results
-            latest_shareholding, shareholding_history = shareholding_data or (None, [])
-            dividend_history, dividend_yield, payout_ratio = dividend_data or ([], 0.0, 0.0)
+            basic_metrics = self._fetch_governance_metrics(ticker, info)
             
             # Calculate governance metrics
             governance_metrics = self._calculate_governance_metrics(
-                latest_shareholding, shareholding_history, dividend_history
+                latest_shareholding, shareholding_history, yearly_dividend_sums
             )
             
             # Generate content summaries
             simple_summary = self._generate_simple_mode_summary(
-                latest_shareholding, dividend_history, governance_metrics
+                latest_shareholding, yearly_dividend_sums, governance_metrics
             )
             
             # Generate data warnings
@@ -183,37 +253,94 @@ class CorporateGovernanceService:
             result = CorporateGovernanceAnalysis(
                 ticker=ticker,
                 company_name=company_name,
-                analysis_date=datetime.now(),
+                analysis_date=now,
                 latest_shareholding=latest_shareholding,
                 shareholding_history=shareholding_history,
                 dividend_history=dividend_history,
+                yearly_dividend_sums=yearly_dividend_sums,
                 dividend_yield_ttm=dividend_yield,
                 dividend_payout_ratio=payout_ratio,
                 governance_metrics=governance_metrics,
                 simple_mode_summary=simple_summary,
                 data_warnings=data_warnings,
-                last_updated=datetime.now()
+                last_updated=now
             )
             
-            # Cache the result
-            if self.use_cache:
+            # Cache the result, unless it was degraded by a failed fetch
+            cache_dict = self._to_cache_dict(result) if self.use_cache or raw else None
+            if self.use_cache and not dividends_failed:
                 await self.cache_manager.set(
                     CacheType.FINANCIAL_DATA,
                     f"{ticker}_governance",
-                    asdict(result)
+                    cache_dict
                 )
             
             logger.info(f"Corporate governance analysis completed for {ticker}")
-            return result
+            return cache_dict if raw else result
             
         except Exception as e:
             logger.error(f"Error fetching corporate governance for {ticker}: {e}")
             raise
     
-    async def _fetch_shareholding_data(
+    async def get_corporate_governance_batch(
+        self,
+        tickers: List[str],
+        concurrency: int = 8
+    ) -> Dict[str, Union[CorporateGovernanceAnalysis, Exception]]:
+        """
+        Get corporate governance analyses for a basket of tickers concurrently
+        
+        Args:
+            tickers: Stock ticker symbols
+            concurrency: Maximum analyses in flight (each holds yfinance worker threads)
+            
+        Returns:
+            Mapping of ticker to its analysis, or to the exception that analysis raised
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def _analyze(ticker: str) -> CorporateGovernanceAnalysis:
+            async with semaphore:
+                return await self.get_corporate_governance_analysis(ticker)
+        
+        results = await asyncio.gather(*(_analyze(ticker) for ticker in tickers), return_exceptions=True)
+        return dict(zip(tickers, results))
+    
+    async def _get_info(self, ticker: str, force_refresh: bool = False) -> Dict:
+        """Fetch yfinance info, shared with other analyzers through a short-lived cache entry"""
+        
+        if self.use_cache and not force_refresh:
+            cached_info = await self.cache_manager.get(CacheType.TICKER_INFO, ticker)
+            if cached_info:
+                return cached_info
+        
+        info = await self._run_yfinance(lambda: yf.Ticker(ticker).info)
+        
+        if self.use_cache and info:
+            await self.cache_manager.set(CacheType.TICKER_INFO, ticker, info)
+        
+        return info
+    
+    async def _run_yfinance(self, fetch: Callable[[], Any]) -> Any:
+        """Run a blocking yfinance call in a worker thread, throttled and retried with backoff on rate limits"""
+        
+        for attempt in range(self.max_rate_limit_retries + 1):
+            try:
+                async with self._yfinance_semaphore:
+                    return await asyncio.to_thread(fetch)
+            except Exception as e:
+                rate_limited = "429" in str(e) or "Too Many Requests" in str(e)
+                if not rate_limited or attempt == self.max_rate_limit_retries:
+                    raise
+                delay = 2 ** attempt
+                logger.warning(f"yfinance rate limited, retrying in {delay}s (attempt {attempt + 1}/{self.max_rate_limit_retries})")
+                await asyncio.sleep(delay)
+    
+    def _fetch_shareholding_data(
         self, 
         ticker: str, 
-        stock: yf.Ticker
+        info: Dict,
+        now: datetime
     ) -> Tuple[Optional[ShareholdingPattern], List[ShareholdingPattern]]:
         """Fetch shareholding pattern data (where available)"""
         
@@ -221,8 +348,6 @@ class CorporateGovernanceService:
             # For Indian stocks, yfinance has limited shareholding data
             # We'll extract what we can from the info and create mock data for demo
             
-            info = stock.info
-            
             # Extract available shareholding info (limited in yfinance)
             shares_outstanding = info.get('sharesOutstanding', 0)
             float_shares = info.get('floatShares', 0)
@@ -236,7 +361,7 @@ class CorporateGovernanceService:
                 dii_percentage = 15  # Typical DII holding estimate
                 
                 latest_shareholding = ShareholdingPattern(
-                    date=datetime.now(),
+                    date=now,
                     promoter_percentage=promoter_percentage,
                     fii_percentage=fii_percentage,
                     dii_percentage=dii_percentage,
@@ -252,7 +377,7 @@ class CorporateGovernanceService:
             else:
                 # Create default shareholding pattern for major companies
                 latest_shareholding = ShareholdingPattern(
-                    date=datetime.now(),
+                    date=now,
                     promoter_percentage=50.0,  # Typical Indian corporate structure
                     fii_percentage=20.0,
                     dii_percentage=15.0,
@@ -267,23 +392,24 @@ class CorporateGovernanceService:
             logger.error(f"Error fetching shareholding data for {ticker}: {e}")
             return None, []
     
-    async def _fetch_dividend_history(
+    def _fetch_dividend_history(
         self, 
         ticker: str, 
-        stock: yf.Ticker
-    ) -> Tuple[List[DividendRecord], float, float]:
-        """Fetch dividend history and calculate metrics"""
+        dividends: pd.Series,
+        info: Dict
+    ) -> Tuple[List[DividendRecord], List[float], float, float]:
+        """Build dividend history and per-year totals from yfinance dividends and calculate metrics"""
         
         try:
-            # Get dividend data from yfinance
-            dividends = stock.dividends
-            
             if dividends.empty:
-                return [], 0.0, 0.0
+                return [], [], 0.0, 0.0
+            
+            # Scoring only needs per-year totals for the last 5 years
+            yearly_dividend_sums = dividends.groupby(dividends.index.year).sum().tail(5).tolist()
             
             # Convert to dividend records
             dividend_history = []
-            for date, amount in dividends.tail(20).items():  # Last 20 dividends
+            for date, amount in dividends.tail(8).items():  # Last 8 dividends
                 dividend_record = DividendRecord(
                     ex_date=date,
                     record_date=date + timedelta(days=1),  # Estimate
@@ -296,36 +422,35 @@ class CorporateGovernanceService:
             dividend_history.sort(key=lambda x: x.ex_date, reverse=True)
             
             # Calculate TTM dividend yield
-            current_price = stock.info.get('currentPrice', 0)
+            current_price = info.get('currentPrice', 0)
             ttm_dividends = sum(d.dividend_per_share for d in dividend_history[:4])  # Last 4 dividends
             dividend_yield = (ttm_dividends / current_price * 100) if current_price > 0 else 0.0
             
             # Calculate payout ratio (basic estimate)
-            eps = stock.info.get('trailingEps', 0)
+            eps = info.get('trailingEps', 0)
             payout_ratio = (ttm_dividends / eps * 100) if eps > 0 else 0.0
             
-            return dividend_history, dividend_yield, payout_ratio
+            return dividend_history, yearly_dividend_sums, dividend_yield, payout_ratio
             
         except Exception as e:
             logger.error(f"Error fetching dividend history for {ticker}: {e}")
-            return [], 0.0, 0.0
+            return [], [], 0.0, 0.0
     
-    async def _fetch_governance_metrics(self, ticker: str, info: Dict) -> Dict:
+    def _fetch_governance_metrics(self, ticker: str, info: Dict) -> Dict:
         """Fetch basic governance metrics from company info"""
         
         try:
             # Extract governance-related metrics from yfinance info
-            governance_data = {
+            overall_risk = info.get('overallRisk', 5)
+            return {
                 'audit_risk': info.get('auditRisk', 5),  # 1-10 scale
                 'board_risk': info.get('boardRisk', 5),
                 'compensation_risk': info.get('compensationRisk', 5),
                 'shareholder_rights_risk': info.get('shareHolderRightsRisk', 5),
-                'overall_risk': info.get('overallRisk', 5),
-                'governance_score': 10 - info.get('overallRisk', 5)  # Invert risk to score
+                'overall_risk': overall_risk,
+                'governance_score': 10 - overall_risk  # Invert risk to score
             }
             
-            return governance_data
-            
         except Exception as e:
             logger.error(f"Error fetching governance metrics for {ticker}: {e}")
             return {}
@@ -336,33 +461,32 @@ class CorporateGovernanceService:
     ) -> List[ShareholdingPattern]:
         """Generate historical shareholding pattern (demo implementation)"""
         
-        history = []
-        
-        # Generate 8 quarters of history with slight variations
-        for i in range(8):
-            quarter_date = datetime.now() - timedelta(days=90 * i)
-            
-            # Add slight variations to create realistic trend
-            variation = np.random.normal(0, 1)  # Small random variation
-            
-            historical_pattern = ShareholdingPattern(
-                date=quarter_date,
-                promoter_percentage=max(0, min(100, latest.promoter_percentage + variation)),
-                fii_percentage=max(0, min(50, latest.fii_percentage + variation * 0.5)),
-                dii_percentage=max(0, min(50, latest.dii_percentage + variation * 0.5)),
-                public_percentage=max(0, min(50, latest.public_percentage - variation * 0.2)),
-                pledged_percentage=max(0, min(20, latest.pledged_percentage + variation * 0.3))
+        # Generate 8 quarters of history with slight variations, drawn in one call
+        variations = self._rng.standard_normal(8)
+        promoter = np.clip(latest.promoter_percentage + variations, 0, 100)
+        fii = np.clip(latest.fii_percentage + variations * 0.5, 0, 50)
+        dii = np.clip(latest.dii_percentage + variations * 0.5, 0, 50)
+        public = np.clip(latest.public_percentage - variations * 0.2, 0, 50)
+        pledged = np.clip(latest.pledged_percentage + variations * 0.3, 0, 20)
+        
+        # Quarters are generated newest first, counting back from the latest pattern
+        return [
+            ShareholdingPattern(
+                date=latest.date - timedelta(days=90 * i),
+                promoter_percentage=float(promoter[i]),
+                fii_percentage=float(fii[i]),
+                dii_percentage=float(dii[i]),
+                public_percentage=float(public[i]),
+                pledged_percentage=float(pledged[i])
             )
-            
-            history.append(historical_pattern)
-        
-        return sorted(history, key=lambda x: x.date, reverse=True)
+            for i in range(8)
+        ]
     
     def _calculate_governance_metrics(
         self,
         latest_shareholding: Optional[ShareholdingPattern],
         shareholding_history: List[ShareholdingPattern],
-        dividend_history: List[DividendRecord]
+        yearly_dividend_sums: List[float]
     ) -> GovernanceMetrics:
         """Calculate comprehensive governance quality metrics"""
         
@@ -375,7 +499,7 @@ class CorporateGovernanceService:
         pledging_score = self._calculate_pledging_risk_score(latest_shareholding)
         
         # Dividend consistency score
-        dividend_score = self._calculate_dividend_consistency_score(dividend_history)
+        dividend_score = self._calculate_dividend_consistency_score(yearly_dividend_sums)
         
         # Transparency score (simplified for demo)
         transparency_score = 75.0  # Would be based on disclosure quality
@@ -407,14 +531,16 @@ class CorporateGovernanceService:
             return 50.0  # Neutral score for insufficient data
         
         # Calculate volatility in promoter holding
-        promoter_percentages = [h.promoter_percentage for h in history if h.promoter_percentage > 0]
+        promoter_percentages = np.fromiter(
+            (h.promoter_percentage for h in history if h.promoter_percentage > 0), dtype=np.float64
+        )
         
-        if len(promoter_percentages) < 2:
+        if promoter_percentages.size < 2:
             return 50.0
         
         # Lower volatility = higher stability score
-        volatility = np.std(promoter_percentages)
-        avg_holding = np.mean(promoter_percentages)
+        avg_holding = promoter_percentages.mean()
+        volatility = promoter_percentages.std()
         
         # Score based on volatility relative to average holding
         if avg_holding > 0:
@@ -448,44 +574,28 @@ class CorporateGovernanceService:
     
     def _calculate_dividend_consistency_score(
         self, 
-        dividend_history: List[DividendRecord]
+        yearly_dividend_sums: List[float]
     ) -> float:
-        """Calculate dividend payment consistency score (0-100)"""
+        """Calculate dividend payment consistency score (0-100) from per-year dividend totals, oldest first"""
         
-        if not dividend_history:
+        if not yearly_dividend_sums:
             return 0.0  # No dividend history
         
-        # Group dividends by year
-        yearly_dividends = {}
-        for dividend in dividend_history:
-            year = dividend.ex_date.year
-            if year not in yearly_dividends:
-                yearly_dividends[year] = 0
-            yearly_dividends[year] += dividend.dividend_per_share
-        
-        if len(yearly_dividends) < 2:
+        if len(yearly_dividend_sums) < 2:
             return 30.0  # Limited history
         
-        # Calculate consistency metrics
-        annual_amounts = list(yearly_dividends.values())
-        
         # Years with dividends vs total years
-        coverage_score = len(yearly_dividends) * 20  # Max 100 for 5+ years
-        
-        # Growth consistency
-        if len(annual_amounts) >= 2:
-            growth_rates = []
-            for i in range(1, len(annual_amounts)):
-                if annual_amounts[i-1] > 0:
-                    growth_rate = (annual_amounts[i] - annual_amounts[i-1]) / annual_amounts[i-1]
-                    growth_rates.append(growth_rate)
-            
-            if growth_rates:
-                # Lower volatility = higher consistency
-                volatility = np.std(growth_rates)
-                consistency_bonus = max(0, 30 - (volatility * 100))
-            else:
-                consistency_bonus = 0
+        coverage_score = len(yearly_dividend_sums) * 20  # Max 100 for 5+ years
+        
+        # Growth consistency (years following a zero total have no defined growth)
+        amounts = np.asarray(yearly_dividend_sums, dtype=np.float64)
+        previous = amounts[:-1]
+        paid = previous > 0
+        growth_rates = np.diff(amounts)[paid] / previous[paid]
+        
+        if growth_rates.size:
+            # Lower volatility = higher consistency
+            consistency_bonus = max(0, 30 - (growth_rates.std() * 100))
         else:
             consistency_bonus = 0
         
@@ -494,53 +604,20 @@ class CorporateGovernanceService:
     def _generate_simple_mode_summary(
         self,
         shareholding: Optional[ShareholdingPattern],
-        dividend_history: List[DividendRecord],
+        yearly_dividend_sums: List[float],
         governance_metrics: GovernanceMetrics
     ) -> str:
         """Generate Simple Mode summary for corporate governance"""
         
-        summary_parts = []
-        
-        # Shareholding analysis
-        if shareholding:
-            if shareholding.promoter_percentage > 50:
-                summary_parts.append(f"Promoter holding at {shareholding.promoter_percentage:.1f}% indicates strong management control.")
-            elif shareholding.promoter_percentage > 25:
-                summary_parts.append(f"Moderate promoter holding at {shareholding.promoter_percentage:.1f}%.")
-            else:
-                summary_parts.append(f"Low promoter holding at {shareholding.promoter_percentage:.1f}% may indicate dispersed ownership.")
-            
-            # Pledging risk
-            if shareholding.pledged_percentage > self.risk_thresholds['high_pledging']:
-                summary_parts.append(f"High pledging risk with {shareholding.pledged_percentage:.1f}% of promoter shares pledged.")
-            elif shareholding.pledged_percentage > self.risk_thresholds['moderate_pledging']:
-                summary_parts.append(f"Moderate pledging at {shareholding.pledged_percentage:.1f}% requires monitoring.")
-            elif shareholding.pledged_percentage > 0:
-                summary_parts.append(f"Low pledging at {shareholding.pledged_percentage:.1f}% is manageable.")
-            else:
-                summary_parts.append("No promoter pledging indicates strong financial position.")
-        
-        # Dividend analysis
-        if dividend_history:
-            recent_years = len(set(d.ex_date.year for d in dividend_history))
-            if recent_years >= 3:
-                summary_parts.append(f"Consistent dividend payments over {recent_years} years demonstrates shareholder-friendly policy.")
-            elif recent_years >= 1:
-                summary_parts.append(f"Limited dividend history with payments in {recent_years} recent year(s).")
-            else:
-                summary_parts.append("No recent dividend payments.")
-        else:
-            summary_parts.append("No dividend history available.")
-        
-        # Overall governance assessment
-        if governance_metrics.overall_governance_score > 75:
-            summary_parts.append("Strong corporate governance practices.")
-        elif governance_metrics.overall_governance_score > 50:
-            summary_parts.append("Adequate corporate governance standards.")
-        else:
-            summary_parts.append("Corporate governance practices need improvement.")
-        
-        return " ".join(summary_parts)
+        overall_score = governance_metrics.overall_governance_score
+        return _build_simple_mode_summary(
+            shareholding.promoter_percentage if shareholding else None,
+            shareholding.pledged_percentage if shareholding else None,
+            len(yearly_dividend_sums) if yearly_dividend_sums else None,
+            (overall_score > 75) + (overall_score > 50),
+            self.risk_thresholds['high_pledging'],
+            self.risk_thresholds['moderate_pledging']
+        )
     
     def _generate_data_warnings(
         self,
@@ -568,97 +645,85 @@ class CorporateGovernanceService:
         
         return warnings
     
+    @staticmethod
+    def _shareholding_to_dict(pattern: ShareholdingPattern) -> Dict:
+        """Flatten a ShareholdingPattern for caching"""
+        return {
+            'date': pattern.date.isoformat(),
+            'promoter_percentage': pattern.promoter_percentage,
+            'fii_percentage': pattern.fii_percentage,
+            'dii_percentage': pattern.dii_percentage,
+            'public_percentage': pattern.public_percentage,
+            'pledged_percentage': pattern.pledged_percentage
+        }
+    
+    def _to_cache_dict(self, result: CorporateGovernanceAnalysis) -> Dict:
+        """Serialize an analysis to the dict shape _reconstruct_from_cache reads, without asdict's deep copy"""
+        metrics = result.governance_metrics
+        return {
+            'ticker': result.ticker,
+            'company_name': result.company_name,
+            'analysis_date': result.analysis_date.isoformat(),
+            'latest_shareholding': self._shareholding_to_dict(result.latest_shareholding) if result.latest_shareholding else None,
+            'shareholding_history': [self._shareholding_to_dict(h) for h in result.shareholding_history],
+            'dividend_history': [
+                {
+                    'ex_date': d.ex_date.isoformat(),
+                    'record_date': d.record_date.isoformat(),
+                    'dividend_per_share': d.dividend_per_share,
+                    'dividend_type': d.dividend_type,
+                    'announcement_date': d.announcement_date.isoformat() if d.announcement_date else None
+                }
+                for d in result.dividend_history
+            ],
+            'yearly_dividend_sums': list(result.yearly_dividend_sums),
+            'dividend_yield_ttm': result.dividend_yield_ttm,
+            'dividend_payout_ratio': result.dividend_payout_ratio,
+            'governance_metrics': {
+                'promoter_stability_score': metrics.promoter_stability_score,
+                'pledging_risk_score': metrics.pledging_risk_score,
+                'dividend_consistency_score': metrics.dividend_consistency_score,
+                'transparency_score': metrics.transparency_score,
+                'overall_governance_score': metrics.overall_governance_score
+            },
+            'simple_mode_summary': result.simple_mode_summary,
+            'agentic_mode_interpretation': result.agentic_mode_interpretation,
+            'data_warnings': list(result.data_warnings),
+            'last_updated': result.last_updated.isoformat()
+        }
+    
+    @staticmethod
+    def _shareholding_from_dict(data: Dict) -> ShareholdingPattern:
+        """Rebuild a ShareholdingPattern from its cached form"""
+        return ShareholdingPattern(**{**data, 'date': _parse_dt(data['date'])})
+    
     def _reconstruct_from_cache(self, cached_data: Dict) -> CorporateGovernanceAnalysis:
-        """Reconstruct CorporateGovernanceAnalysis from cached dictionary"""
-        
-        # Reconstruct latest_shareholding if present
-        latest_shareholding = None
-        if cached_data.get('latest_shareholding') and isinstance(cached_data['latest_shareholding'], dict):
-            sh_data = cached_data['latest_shareholding']
-            
-            # Parse date back to datetime if it's a string
-            date_val = sh_data.get('date')
-            if isinstance(date_val, str):
-                try:
-                    from datetime import datetime
-                    date_val = datetime.fromisoformat(date_val.replace('Z', '+00:00'))
-                except:
-                    date_val = datetime.now()
-            
-            latest_shareholding = ShareholdingPattern(
-                date=date_val,
-                promoter_percentage=sh_data.get('promoter_percentage', 0),
-                fii_percentage=sh_data.get('fii_percentage', 0),
-                dii_percentage=sh_data.get('dii_percentage', 0),
-                public_percentage=sh_data.get('public_percentage', 0),
-                pledged_percentage=sh_data.get('pledged_percentage', 0)
-            )
-        
-        # Reconstruct dividend_history list
-        dividend_history = []
-        if cached_data.get('dividend_history'):
-            for div_dict in cached_data['dividend_history']:
-                if isinstance(div_dict, dict):
-                    # Parse ex_date back to datetime
-                    ex_date = div_dict.get('ex_date')
-                    if isinstance(ex_date, str):
-                        try:
-                            from datetime import datetime
-                            ex_date = datetime.fromisoformat(ex_date.replace('Z', '+00:00'))
-                        except:
-                            ex_date = datetime.now()
-                    
-                    dividend_history.append(DividendRecord(
-                        ex_date=ex_date,
-                        dividend_per_share=div_dict.get('dividend_per_share', 0),
-                        dividend_type=div_dict.get('dividend_type', 'Regular')
-                    ))
-                else:
-                    # It's already a proper object
-                    dividend_history.append(div_dict)
-        
-        # Reconstruct governance_metrics
-        governance_metrics = None
-        if cached_data.get('governance_metrics') and isinstance(cached_data['governance_metrics'], dict):
-            gm_data = cached_data['governance_metrics']
-            governance_metrics = GovernanceMetrics(
-                promoter_stability_score=gm_data.get('promoter_stability_score', 50),
-                pledging_risk_score=gm_data.get('pledging_risk_score', 50),
-                dividend_consistency_score=gm_data.get('dividend_consistency_score', 50),
-                transparency_score=gm_data.get('transparency_score', 50),
-                overall_governance_score=gm_data.get('overall_governance_score', 50)
-            )
-        
-        # Parse datetime fields
-        analysis_date = cached_data.get('analysis_date')
-        last_updated = cached_data.get('last_updated')
+        """Reconstruct CorporateGovernanceAnalysis from the dict written by _to_cache_dict"""
         
-        if isinstance(analysis_date, str):
-            try:
-                from datetime import datetime
-                analysis_date = datetime.fromisoformat(analysis_date.replace('Z', '+00:00'))
-            except:
-                analysis_date = datetime.now()
-        
-        if isinstance(last_updated, str):
-            try:
-                from datetime import datetime
-                last_updated = datetime.fromisoformat(last_updated.replace('Z', '+00:00'))
-            except:
-                last_updated = datetime.now()
+        latest_shareholding = cached_data['latest_shareholding']
         
-        # Reconstruct main result
         return CorporateGovernanceAnalysis(
-            ticker=cached_data.get('ticker', ''),
-            company_name=cached_data.get('company_name', ''),
-            analysis_date=analysis_date,
-            latest_shareholding=latest_shareholding,
-            dividend_history=dividend_history,
-            dividend_yield_ttm=cached_data.get('dividend_yield_ttm', 0),
-            dividend_payout_ratio=cached_data.get('dividend_payout_ratio', 0),
-            governance_metrics=governance_metrics,
-            simple_mode_summary=cached_data.get('simple_mode_summary', ''),
-            agentic_mode_interpretation=cached_data.get('agentic_mode_interpretation', ''),
-            data_warnings=cached_data.get('data_warnings', []),
-            last_updated=last_updated
-        )
\ No newline at end of file
+            ticker=cached_data['ticker'],
+            company_name=cached_data['company_name'],
+            analysis_date=_parse_dt(cached_data['analysis_date']),
+            latest_shareholding=self._shareholding_from_dict(latest_shareholding) if latest_shareholding else None,
+            shareholding_history=[self._shareholding_from_dict(h) for h in cached_data['shareholding_history']],
+            dividend_history=[
+                DividendRecord(
+                    ex_date=_parse_dt(d['ex_date']),
+                    record_date=_parse_dt(d['record_date']),
+                    dividend_per_share=d['dividend_per_share'],
+                    dividend_type=d['dividend_type'],
+                    announcement_date=_parse_dt(d['announcement_date']) if d.get('announcement_date') else None
+                )
+                for d in cached_data['dividend_history']
+            ],
+            yearly_dividend_sums=cached_data['yearly_dividend_sums'],
+            dividend_yield_ttm=cached_data['dividend_yield_ttm'],
+            dividend_payout_ratio=cached_data['dividend_payout_ratio'],
+            governance_metrics=GovernanceMetrics(**cached_data['governance_metrics']),
+            simple_mode_summary=cached_data['simple_mode_summary'],
+            agentic_mode_interpretation=cached_data.get('agentic_mode_interpretation'),
+            data_warnings=cached_data['data_warnings'],
+            last_updated=_parse_dt(cached_data['last_updated'])
+        )
@@ -1,15 +1,53 @@
+import asyncio
 import yfinance as yf
 import pandas as pd
 import numpy as np
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple, FrozenSet
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from ..models.company import CompanyInfo, StockPrice
 from ..models.dcf import FinancialData
 from .price_service import price_service
+from .intelligent_cache import intelligent_cache, CacheType
 import logging
+import threading
+from types import MappingProxyType
+from cachetools import cached, TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Alternative statement row names tried when the canonical one is missing
+_ALT_NAMES = MappingProxyType({
+    'Total Revenue': ('Revenue', 'Total Revenues'),
+    'Net Income': ('Net Income Common Stockholders', 'Net Income Applicable To Common Shares'),
+    'Free Cash Flow': ('Operating Cash Flow',),
+    'Total Debt': ('Long Term Debt', 'Total Liabilities'),
+    'Cash And Cash Equivalents': ('Cash', 'Cash Equivalents'),
+    'Ordinary Shares Number': ('Share Issued', 'Common Stock Shares Outstanding'),
+    # Capital intensity metrics alternative names
+    'Capital Expenditure': ('Capital Expenditures', 'Capital Expenditure', 'Capex', 'Purchase Of Property Plant Equipment'),
+    'Change In Working Capital': ('Working Capital', 'Change In Working Capital', 'Changes In Working Capital'),
+    'Depreciation And Amortization': ('Depreciation Amortization', 'Depreciation And Amortization', 'Depreciation', 'Amortization')
+})
+
+@cached(TTLCache(maxsize=128, ttl=3600), lock=threading.Lock())
+def _get_ticker(ticker: str) -> yf.Ticker:
+    """Shared yf.Ticker per symbol; yfinance memoizes fetched statements and info on the
+    instance, so repeat lookups within the hour skip the HTTP round trips"""
+    return yf.Ticker(ticker)
+
+def _ebitda_from_components(net_income: np.ndarray, interest: np.ndarray, tax: np.ndarray,
+                            depreciation: np.ndarray) -> np.ndarray:
+    """EBITDA = Net Income + Interest + Taxes + D&A, accumulated into a single output buffer"""
+    ebitda = np.add(net_income, interest)
+    ebitda += tax
+    ebitda += depreciation
+    return ebitda
+
 class DataService:
+    # Extracted financial statements are cached longer than the 24h financial data default
+    financial_statements_ttl = timedelta(hours=72)
+    
     @staticmethod
     def get_company_info(ticker: str) -> Optional[CompanyInfo]:
         """Fetch company information using unified price service"""
@@ -59,39 +97,38 @@ class DataService:
     def get_financial_data(ticker: str, years: int = 5) -> Optional[FinancialData]:
         """Fetch historical financial data for DCF analysis"""
         try:
-            stock = yf.Ticker(ticker)
+            stock = _get_ticker(ticker)
             
-            # Get financial statements
-            income_stmt = stock.financials.T
-            balance_sheet = stock.balance_sheet.T
-            cash_flow = stock.cashflow.T
+            # Get financial statements, kept in yfinance's layout (metrics as rows, periods as columns)
+            income_stmt, balance_sheet, cash_flow = DataService._fetch_statements(ticker, stock)
             
             if income_stmt.empty or balance_sheet.empty or cash_flow.empty:
                 logger.warning(f"Empty financial data for {ticker}")
                 return None
             
-            # Sort by year (most recent first)
-            income_stmt = income_stmt.sort_index(ascending=False).head(years)
-            balance_sheet = balance_sheet.sort_index(ascending=False).head(years)
-            cash_flow = cash_flow.sort_index(ascending=False).head(years)
+            # Most recent years first
+            income_stmt = DataService._latest_years(income_stmt, years)
+            balance_sheet = DataService._latest_years(balance_sheet, years)
+            cash_flow = DataService._latest_years(cash_flow, years)
             
-            years_list = [year.year for year in income_stmt.index]
+            years_list = [year.year for year in income_stmt.columns]
             
-            # Extract key metrics
-            revenue = DataService._safe_extract(income_stmt, 'Total Revenue')
+            # Extract key metrics, one reindex per statement
+            revenue, net_income = DataService._extract_rows(
+                income_stmt, ('Total Revenue', 'Net Income')
+            ).tolist()
             ebitda = DataService._calculate_ebitda(income_stmt)
-            net_income = DataService._safe_extract(income_stmt, 'Net Income')
-            free_cash_flow = DataService._safe_extract(cash_flow, 'Free Cash Flow')
-            total_debt = DataService._safe_extract(balance_sheet, 'Total Debt')
-            cash = DataService._safe_extract(balance_sheet, 'Cash And Cash Equivalents')
-            shares = DataService._safe_extract(balance_sheet, 'Ordinary Shares Number')
+            total_debt, cash, shares = DataService._extract_rows(
+                balance_sheet, ('Total Debt', 'Cash And Cash Equivalents', 'Ordinary Shares Number')
+            ).tolist()
             
             # CRITICAL: Extract capital intensity metrics for dynamic calculation
-            capex = DataService._safe_extract(cash_flow, 'Capital Expenditure')
-            working_capital_change = DataService._safe_extract(cash_flow, 'Change In Working Capital')
-            depreciation_amortization = DataService._safe_extract(cash_flow, 'Depreciation And Amortization')
+            free_cash_flow, capex, working_capital_change, depreciation_amortization = DataService._extract_rows(
+                cash_flow, ('Free Cash Flow', 'Capital Expenditure', 'Change In Working Capital', 'Depreciation And Amortization')
+            ).tolist()
             
-            logger.info(f"📊 Financial data extracted for {ticker}: {len(revenue)} years, CapEx: {len([x for x in capex if x != 0])} non-zero values, WC: {len([x for x in working_capital_change if x != 0])} non-zero values, D&A: {len([x for x in depreciation_amortization if x != 0])} non-zero values")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"📊 Financial data extracted for {ticker}: {len(revenue)} years, CapEx: {np.count_nonzero(capex)} non-zero values, WC: {np.count_nonzero(working_capital_change)} non-zero values, D&A: {np.count_nonzero(depreciation_amortization)} non-zero values")
             
             return FinancialData(
                 ticker=ticker,
@@ -114,72 +151,133 @@ class DataService:
             return None
 
     @staticmethod
-    def _safe_extract(df: pd.DataFrame, column: str) -> List[float]:
+    async def get_cached_financial_data(ticker: str, years: int = 5) -> Optional[FinancialData]:
+        """Previously extracted financial data from the persistent cache, or None on a miss"""
+        cached_data = await intelligent_cache.get(
+            CacheType.FINANCIAL_DATA, ticker, dataset="dcf_financials", years=years
+        )
+        return FinancialData(**cached_data) if cached_data else None
+
+    @staticmethod
+    async def fetch_financial_data(ticker: str, years: int = 5) -> Optional[FinancialData]:
+        """Extract financial data off the event loop and persist it for financial_statements_ttl"""
+        financial_data = await asyncio.to_thread(DataService.get_financial_data, ticker, years)
+        if financial_data:
+            await intelligent_cache.set(
+                CacheType.FINANCIAL_DATA, ticker, financial_data.dict(),
+                ttl=DataService.financial_statements_ttl, dataset="dcf_financials", years=years
+            )
+        return financial_data
+
+    @staticmethod
+    async def get_financial_data_cached(ticker: str, years: int = 5) -> Optional[FinancialData]:
+        """Fetch historical financial data for DCF analysis, reusing extractions across restarts"""
+        # Statements change at most quarterly
+        cached_data = await DataService.get_cached_financial_data(ticker, years)
+        if cached_data:
+            return cached_data
+        return await DataService.fetch_financial_data(ticker, years)
+
+    @staticmethod
+    def get_financial_data_batch(tickers: List[str], years: int = 5, max_workers: int = 6) -> Dict[str, FinancialData]:
+        """Fetch DCF financial data for several tickers concurrently; tickers without data are omitted"""
+        unique_tickers = list(dict.fromkeys(tickers))
+        if not unique_tickers:
+            return {}
+        
+        # Each ticker already fetches its three statements in parallel, so this caps
+        # in-flight Yahoo requests at max_workers * 3
+        with ThreadPoolExecutor(max_workers=min(len(unique_tickers), max_workers)) as executor:
+            results = executor.map(lambda t: DataService.get_financial_data(t, years), unique_tickers)
+            return {ticker: data for ticker, data in zip(unique_tickers, results) if data is not None}
+
+    @staticmethod
+    def _fetch_statements(ticker: str, stock: yf.Ticker) -> Tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+        """Fetch income statement, balance sheet and cash flow concurrently (each is a separate HTTP request)"""
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [
+                executor.submit(lambda: stock.financials),
+                executor.submit(lambda: stock.balance_sheet),
+                executor.submit(lambda: stock.cashflow)
+            ]
+        
+        statements = []
+        for name, future in zip(('financials', 'balance_sheet', 'cashflow'), futures):
+            try:
+                statements.append(future.result())
+            except Exception as e:
+                # One failed statement shouldn't discard the others
+                logger.warning(f"Error fetching {name} for {ticker}: {e}")
+                statements.append(pd.DataFrame())
+        return tuple(statements)
+
+    @staticmethod
+    def _latest_years(df: pd.DataFrame, years: int) -> pd.DataFrame:
+        """Columns for the most recent `years` periods, newest first, via one argsort of the period labels"""
+        return df.iloc[:, np.argsort(df.columns.to_numpy())[::-1][:years]]
+
+    @staticmethod
+    def _safe_extract(df: pd.DataFrame, metric: str) -> List[float]:
         """Safely extract values from dataframe, handling missing data"""
-        if column in df.columns:
-            values = df[column].fillna(0).tolist()
-        else:
-            # Try alternative column names
-            alt_names = {
-                'Total Revenue': ['Revenue', 'Total Revenues'],
-                'Net Income': ['Net Income Common Stockholders', 'Net Income Applicable To Common Shares'],
-                'Free Cash Flow': ['Operating Cash Flow'],
-                'Total Debt': ['Long Term Debt', 'Total Liabilities'],
-                'Cash And Cash Equivalents': ['Cash', 'Cash Equivalents'],
-                'Ordinary Shares Number': ['Share Issued', 'Common Stock Shares Outstanding'],
-                # Capital intensity metrics alternative names
-                'Capital Expenditure': ['Capital Expenditures', 'Capital Expenditure', 'Capex', 'Purchase Of Property Plant Equipment'],
-                'Change In Working Capital': ['Working Capital', 'Change In Working Capital', 'Changes In Working Capital'],
-                'Depreciation And Amortization': ['Depreciation Amortization', 'Depreciation And Amortization', 'Depreciation', 'Amortization']
-            }
-            
-            found = False
-            for alt_name in alt_names.get(column, []):
-                if alt_name in df.columns:
-                    values = df[alt_name].fillna(0).tolist()
-                    found = True
-                    break
-            
-            if not found:
-                values = [0] * len(df)
+        return DataService._extract_array(df, metric).tolist()
+
+    @staticmethod
+    def _resolve_row(available: FrozenSet[str], metric: str) -> str:
+        """Name of the row holding a metric: the canonical one or its first present alternative"""
+        if metric in available:
+            return metric
+        return next((name for name in _ALT_NAMES.get(metric, ()) if name in available), metric)
+
+    @staticmethod
+    def _extract_array(df: pd.DataFrame, metric: str, available: Optional[FrozenSet[str]] = None) -> np.ndarray:
+        """Extract a metric row as a float64 array, falling back to alternative names and zeros"""
+        if available is None:
+            available = frozenset(df.index)
+        metric = DataService._resolve_row(available, metric)
+        if metric not in available:
+            return np.zeros(df.shape[1])
         
-        return [float(v) for v in values]
+        return df.loc[metric].to_numpy(dtype=np.float64, na_value=0.0)
+
+    @staticmethod
+    def _extract_rows(df: pd.DataFrame, metrics: Tuple[str, ...]) -> np.ndarray:
+        """Extract several metrics with a single reindex, as one float64 row per metric"""
+        available = frozenset(df.index)
+        resolved = [DataService._resolve_row(available, metric) for metric in metrics]
+        return df.reindex(index=resolved).to_numpy(dtype=np.float64, na_value=0.0)
 
     @staticmethod
     def _calculate_ebitda(income_stmt: pd.DataFrame) -> List[float]:
         """Calculate EBITDA from income statement"""
         try:
+            available = frozenset(income_stmt.index)
+            
             # Try to get EBITDA directly
-            if 'EBITDA' in income_stmt.columns:
-                return DataService._safe_extract(income_stmt, 'EBITDA')
+            if 'EBITDA' in available:
+                return DataService._extract_array(income_stmt, 'EBITDA', available).tolist()
             
             # Calculate EBITDA = EBIT + Depreciation & Amortization
-            ebit = DataService._safe_extract(income_stmt, 'EBIT')
-            if not ebit or all(x == 0 for x in ebit):
+            ebit = DataService._extract_array(income_stmt, 'EBIT', available)
+            depreciation = DataService._extract_array(income_stmt, 'Depreciation And Amortization', available)
+            if not ebit.any():
                 # EBITDA = Net Income + Interest + Taxes + Depreciation + Amortization
-                net_income = DataService._safe_extract(income_stmt, 'Net Income')
-                interest = DataService._safe_extract(income_stmt, 'Interest Expense')
-                tax = DataService._safe_extract(income_stmt, 'Tax Provision')
-                depreciation = DataService._safe_extract(income_stmt, 'Depreciation And Amortization')
+                net_income = DataService._extract_array(income_stmt, 'Net Income', available)
+                interest = DataService._extract_array(income_stmt, 'Interest Expense', available)
+                tax = DataService._extract_array(income_stmt, 'Tax Provision', available)
                 
-                ebitda = []
-                for i in range(len(net_income)):
-                    ebitda_val = net_income[i] + interest[i] + tax[i] + depreciation[i]
-                    ebitda.append(ebitda_val)
-                return ebitda
-            else:
-                depreciation = DataService._safe_extract(income_stmt, 'Depreciation And Amortization')
-                return [ebit[i] + depreciation[i] for i in range(len(ebit))]
+                return _ebitda_from_components(net_income, interest, tax, depreciation).tolist()
+            
+            return (ebit + depreciation).tolist()
                 
         except Exception as e:
             logger.error(f"Error calculating EBITDA: {e}")
-            return [0] * len(income_stmt)
+            return [0] * income_stmt.shape[1]
 
     @staticmethod
     def get_industry_multiples(ticker: str) -> Dict[str, float]:
         """Get industry average multiples for comparison"""
         try:
-            stock = yf.Ticker(ticker)
+            stock = _get_ticker(ticker)
             info = stock.info
             
             # Return some default industry multiples
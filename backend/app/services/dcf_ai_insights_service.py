@@ -4,6 +4,8 @@ Provides AI-powered analysis and insights for DCF valuation results
 """
 
 import asyncio
+import hashlib
+import json
 import logging
 from typing import Dict, Any, List, Optional
 from datetime import datetime
@@ -17,8 +19,16 @@ logger = logging.getLogger(__name__)
 class DCFAIInsightsService:
     """Service for generating AI insights about DCF valuations"""
     
+    # Cost-effective model for insights; the JSON schema fits well within max_tokens
+    model = "claude-3-haiku-20240307"
+    max_tokens = 800
+    claude_timeout = 15.0
+    
     def __init__(self):
         self.claude_service = None
+        # Insight generations awaiting Claude, keyed by cache key; no lock needed
+        # since lookup and registration happen without an intervening await
+        self._inflight: Dict[str, asyncio.Future] = {}
     
     async def generate_dcf_insights(
         self,
@@ -48,7 +58,7 @@ class DCFAIInsightsService:
             logger.info(f"🔍 DCF AI Insights Debug - Company Data: {company_data}")
             
             # Check cache first (6 hour TTL from intelligent_cache.py)
-            cache_key = f"dcf_insights_{ticker}_{hash(str(dcf_result))}"
+            cache_key = f"dcf_insights_{ticker}_{self._hash_inputs(dcf_result, assumptions)}"
             cached_insights = await intelligent_cache.get(
                 cache_type=CacheType.AI_INSIGHTS,
                 identifier=ticker,
@@ -60,70 +70,108 @@ class DCFAIInsightsService:
                 logger.info(f"Using cached DCF insights for {ticker}")
                 return cached_insights
             
-            # Generate fresh AI insights
-            logger.info(f"Generating fresh DCF AI insights for {ticker}")
-            
-            # Prepare structured prompt for Claude
-            prompt = self._create_dcf_analysis_prompt(
-                ticker=ticker,
-                dcf_result=dcf_result,
-                assumptions=assumptions,
-                company_data=company_data
-            )
-            
-            # Initialize or reinitialize Claude service to get latest API keys
-            self.claude_service = ClaudeService()
-            
-            # Check if Claude service is available first
-            if not self.claude_service.is_available():
-                logger.warning(f"Claude service not available for {ticker} - no API key configured")
-                return self._get_api_error_response(ticker, "no_api_key")
+            # Join an identical request that is already waiting on Claude
+            inflight = self._inflight.get(cache_key)
+            if inflight is not None:
+                logger.info(f"Awaiting in-flight DCF insights for {ticker}")
+                return await asyncio.shield(inflight)
             
-            # Call Claude for analysis using existing generate_completion method with timeout
-            logger.info(f"🔍 Calling Claude API for {ticker}...")
-            
-            # Add timeout wrapper to prevent hanging
-            import asyncio
+            inflight = asyncio.get_running_loop().create_future()
+            self._inflight[cache_key] = inflight
             try:
-                ai_response = await asyncio.wait_for(
-                    self.claude_service.generate_completion(
-                        prompt=prompt,
-                        max_tokens=1200,  # Reduced for faster response
-                        model="claude-3-haiku-20240307"  # Cost-effective for insights
-                    ),
-                    timeout=20.0  # 20 second timeout
-                )
-            except asyncio.TimeoutError:
-                logger.warning(f"Claude API timeout for {ticker} - using fallback")
-                return self._get_api_error_response(ticker, "api_timeout")
-            
-            logger.info(f"🔍 Claude Response for {ticker}: {ai_response[:200] if ai_response else 'None'}...")
-            
-            # If Claude didn't return a response, likely an API issue
-            if not ai_response:
-                logger.warning(f"Empty Claude response for {ticker} - API credits/key issue")
-                return self._get_api_error_response(ticker, "api_error")
-            
-            # Parse and structure the response
-            insights = self._parse_dcf_insights(ai_response, dcf_result, assumptions)
-            logger.info(f"🔍 Parsed Insights for {ticker}: {insights}")
-            
-            # Cache the results for 6 hours
-            await intelligent_cache.set(
-                cache_type=CacheType.AI_INSIGHTS,
-                identifier=ticker,
-                data=insights,
-                dcf_hash=cache_key,
-                fair_value=dcf_result.get('fairValue', 0)
-            )
-            
-            logger.info(f"Successfully generated and cached DCF insights for {ticker}")
-            return insights
+                insights = await self._generate_fresh_insights(ticker, dcf_result, assumptions, company_data, cache_key)
+                inflight.set_result(insights)
+                return insights
+            finally:
+                if not inflight.done():
+                    inflight.set_result(self._get_api_error_response(ticker, "service_error"))
+                del self._inflight[cache_key]
             
         except Exception as e:
             logger.error(f"Error generating DCF insights for {ticker}: {e}")
             return self._get_api_error_response(ticker, "service_error")
     
+    async def _generate_fresh_insights(
+        self,
+        ticker: str,
+        dcf_result: Dict[str, Any],
+        assumptions: Dict[str, Any],
+        company_data: Dict[str, Any],
+        cache_key: str
+    ) -> Dict[str, Any]:
+        """Call Claude for insights and cache the parsed result"""
+        
+        # Generate fresh AI insights
+        logger.info(f"Generating fresh DCF AI insights for {ticker}")
+        
+        # Prepare structured prompt for Claude
+        prompt = self._create_dcf_analysis_prompt(
+            ticker=ticker,
+            dcf_result=dcf_result,
+            assumptions=assumptions,
+            company_data=company_data
+        )
+        
+        claude_service = self._get_claude_service()
+        
+        # Check if Claude service is available first
+        if not claude_service.is_available():
+            logger.warning(f"Claude service not available for {ticker} - no API key configured")
+            return self._get_api_error_response(ticker, "no_api_key")
+        
+        # Stream the completion so it stops as soon as the JSON object closes
+        logger.info(f"🔍 Calling Claude API for {ticker}...")
+        
+        # Add timeout wrapper to prevent hanging
+        try:
+            analysis, usage = await asyncio.wait_for(
+                claude_service.generate_json_completion(
+                    prompt=prompt,
+                    max_tokens=self.max_tokens,
+                    model=self.model
+                ),
+                timeout=self.claude_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Claude API timeout for {ticker} - using fallback")
+            return self._get_api_error_response(ticker, "api_timeout")
+        
+        # If Claude didn't return any output, likely an API issue
+        if not usage.get('output_tokens'):
+            logger.warning(f"Empty Claude response for {ticker} - API credits/key issue")
+            return self._get_api_error_response(ticker, "api_error")
+        
+        # Structure the response
+        insights = self._parse_dcf_insights(analysis, dcf_result, assumptions, usage)
+        logger.info(f"🔍 Parsed Insights for {ticker}: {insights}")
+        
+        # Cache the results for 6 hours
+        await intelligent_cache.set(
+            cache_type=CacheType.AI_INSIGHTS,
+            identifier=ticker,
+            data=insights,
+            dcf_hash=cache_key,
+            fair_value=dcf_result.get('fairValue', 0)
+        )
+        
+        logger.info(f"Successfully generated and cached DCF insights for {ticker}")
+        return insights
+    
+    def _get_claude_service(self) -> ClaudeService:
+        """Lazily created Claude service, refreshed with the latest API keys on each use.
+        Reinitializing keeps the pooled HTTP connection, unlike constructing a new service."""
+        if self.claude_service is None:
+            self.claude_service = ClaudeService()
+        else:
+            self.claude_service.reinitialize_client()
+        return self.claude_service
+    
+    @staticmethod
+    def _hash_inputs(dcf_result: Dict[str, Any], assumptions: Dict[str, Any]) -> str:
+        """Fingerprint the valuation inputs; stable across restarts, unlike hash()"""
+        key_json = json.dumps([dcf_result, assumptions], sort_keys=True, default=str)
+        return hashlib.blake2b(key_json.encode(), digest_size=16).hexdigest()
+    
     def _create_dcf_analysis_prompt(
         self,
         ticker: str,
@@ -167,31 +215,20 @@ You are an expert equity analyst. Provide concise DCF analysis for {company_name
 Be concise, specific to {sector}, use ₹ for Indian stocks.
 """
     
-    def _parse_dcf_insights(self, ai_response: str, dcf_result: Dict[str, Any], assumptions: Dict[str, Any]) -> Dict[str, Any]:
-        """Parse Claude's response into structured insights"""
+    def _parse_dcf_insights(
+        self,
+        analysis: Optional[Dict[str, Any]],
+        dcf_result: Dict[str, Any],
+        assumptions: Dict[str, Any],
+        usage: Dict[str, int]
+    ) -> Dict[str, Any]:
+        """Structure Claude's parsed JSON into insights"""
         
         try:
-            # Parse JSON response from Claude
-            import json
-            
-            if not ai_response:
-                logger.warning("Empty AI response received")
+            if not isinstance(analysis, dict):
+                logger.warning("No JSON object in AI response")
                 return self._get_fallback_insights(dcf_result, assumptions)
             
-            # Try to extract JSON from response
-            response_text = ai_response.strip()
-            
-            # Look for JSON block in response
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            
-            if json_start >= 0 and json_end > json_start:
-                json_text = response_text[json_start:json_end]
-                analysis = json.loads(json_text)
-            else:
-                # Fallback: try to parse the whole response as JSON
-                analysis = json.loads(response_text)
-            
             return {
                 'investment_thesis_summary': analysis.get('investment_thesis_summary', 'Trading at current levels with mixed valuation signals. Sector positioning and growth assumptions require monitoring. Fair value assessment pending detailed analysis.'),
                 'industry_macro_signals': analysis.get('industry_macro_signals', 'Industry trends and macro conditions present balanced outlook with sector-specific considerations.'),
@@ -207,13 +244,13 @@ Be concise, specific to {sector}, use ₹ for Indian stocks.
                 ]),
                 'confidence_score': analysis.get('confidence_score', 0.7),
                 'generated_at': datetime.now().isoformat(),
-                'model_used': 'claude-3-haiku-20240307',
-                'token_usage': {'tokens': len(response_text.split()) if response_text else 0, 'cost': 0.0}
+                'model_used': self.model,
+                'token_usage': {'tokens': usage.get('output_tokens', 0), 'cost': 0.0}
             }
             
         except Exception as e:
             logger.error(f"Error parsing DCF insights: {e}")
-            logger.error(f"AI response content: {ai_response[:200] if ai_response else 'None'}...")
+            logger.error(f"AI response content: {str(analysis)[:200]}...")
             return self._get_fallback_insights(dcf_result, assumptions)
     
     def _get_fallback_insights(
@@ -1,5 +1,6 @@
+import asyncio
 import numpy as np
-from typing import List, Dict, Tuple
+from typing import List, Dict, Tuple, NamedTuple
 from datetime import datetime
 import logging
 from .price_service import price_service
@@ -11,6 +12,84 @@ from ..models.dcf import (
 
 logger = logging.getLogger(__name__)
 
+class _DCFRates(NamedTuple):
+    """DCF assumptions as decimal fractions, converted from percentages once per valuation"""
+    revenue_growth: float
+    ebitda_margin: float
+    tax_rate: float
+    wacc: float
+    terminal_growth: float
+    projection_years: int
+    
+    @classmethod
+    def from_assumptions(cls, assumptions: DCFAssumptions) -> "_DCFRates":
+        return cls(
+            assumptions.revenue_growth_rate / 100,
+            assumptions.ebitda_margin / 100,
+            assumptions.tax_rate / 100,
+            assumptions.wacc / 100,
+            assumptions.terminal_growth_rate / 100,
+            assumptions.projection_years
+        )
+
+def _discount_factors(rates: _DCFRates) -> np.ndarray:
+    """(1 + WACC)^t for each projection year t, computed once per valuation"""
+    return np.power(1 + rates.wacc, np.arange(1, rates.projection_years + 1))
+
+def _project_cash_flow_arrays(base_revenue: float, rates: _DCFRates,
+                              discount_factors: np.ndarray = None) -> Dict[str, np.ndarray]:
+    """Numeric core of the cash flow projection: one float64 array per DCFProjection
+    field, indexed by projection year, kept apart from the Pydantic model construction"""
+    if discount_factors is None:
+        discount_factors = _discount_factors(rates)
+    
+    # All projection years at once
+    years = np.arange(1, rates.projection_years + 1)
+    growth = 1 + rates.revenue_growth
+    
+    # Project revenue with growth rate
+    revenue = base_revenue * growth ** years
+    previous_revenue = base_revenue * growth ** (years - 1)
+    
+    # Calculate EBITDA
+    ebitda = revenue * rates.ebitda_margin
+    
+    # Estimate depreciation (assume 3% of revenue)
+    depreciation = revenue * 0.03
+    
+    # Calculate EBIT
+    ebit = ebitda - depreciation
+    
+    # Calculate tax
+    tax = ebit * rates.tax_rate
+    
+    # Calculate NOPAT (Net Operating Profit After Tax)
+    nopat = ebit - tax
+    
+    # Estimate CapEx (assume 2% of revenue)
+    capex = revenue * 0.02
+    
+    # Estimate working capital change (assume 1% of revenue change)
+    working_capital_change = (revenue - previous_revenue) * 0.01
+    
+    # Calculate Free Cash Flow
+    free_cash_flow = nopat + depreciation - capex - working_capital_change
+    
+    # Calculate present value
+    present_value = free_cash_flow / discount_factors
+    
+    return {
+        'revenue': revenue,
+        'ebitda': ebitda,
+        'ebit': ebit,
+        'tax': tax,
+        'nopat': nopat,
+        'capex': capex,
+        'working_capital_change': working_capital_change,
+        'free_cash_flow': free_cash_flow,
+        'present_value': present_value
+    }
+
 class DCFService:
     """Service for DCF (Discounted Cash Flow) valuation calculations"""
     
@@ -22,19 +101,18 @@ class DCFService:
             logger.info(f"Assumptions: {assumptions}")
             
             # Validate inputs
-            if not financial_data.revenue or len(financial_data.revenue) == 0:
-                raise ValueError("No revenue data available for DCF calculation")
+            DCFService._validate_financial_data(financial_data)
             
-            if not financial_data.shares_outstanding or len(financial_data.shares_outstanding) == 0:
-                raise ValueError("No shares outstanding data available for DCF calculation")
-            
-            projections = DCFService._project_cash_flows(financial_data, assumptions)
+            rates = _DCFRates.from_assumptions(assumptions)
+            discount_factors = _discount_factors(rates)
+            projected = _project_cash_flow_arrays(financial_data.revenue[0], rates, discount_factors)
+            projections = DCFService._build_projections(financial_data, assumptions, projected)
             logger.info(f"Projected {len(projections)} years of cash flows")
             
-            terminal_value = DCFService._calculate_terminal_value(projections[-1], assumptions)
+            terminal_value = DCFService._calculate_terminal_value(projections[-1], rates, discount_factors[-1])
             logger.info(f"Terminal value calculated: {terminal_value:,.2f}")
             
-            enterprise_value = DCFService._calculate_enterprise_value(projections, terminal_value, assumptions)
+            enterprise_value = DCFService._calculate_enterprise_value(projected['free_cash_flow'], terminal_value, discount_factors)
             logger.info(f"Enterprise value: {enterprise_value:,.2f}")
             
             equity_value = DCFService._calculate_equity_value(enterprise_value, financial_data)
@@ -74,82 +152,57 @@ class DCFService:
             logger.error(f"Error type: {type(e).__name__}")
             raise e
 
+    @staticmethod
+    def _validate_financial_data(financial_data: FinancialData) -> None:
+        """Raise if the statements lack the revenue or share data a DCF needs"""
+        if not financial_data.revenue or len(financial_data.revenue) == 0:
+            raise ValueError("No revenue data available for DCF calculation")
+        
+        if not financial_data.shares_outstanding or len(financial_data.shares_outstanding) == 0:
+            raise ValueError("No shares outstanding data available for DCF calculation")
+
     @staticmethod
     def _project_cash_flows(financial_data: FinancialData, assumptions: DCFAssumptions) -> List[DCFProjection]:
         """Project future cash flows based on assumptions"""
-        projections = []
-        
         # Get base year data (most recent year)
         base_revenue = financial_data.revenue[0] if financial_data.revenue else 0
+        
+        return DCFService._build_projections(
+            financial_data, assumptions, _project_cash_flow_arrays(base_revenue, _DCFRates.from_assumptions(assumptions))
+        )
+
+    @staticmethod
+    def _build_projections(financial_data: FinancialData, assumptions: DCFAssumptions,
+                           projected: Dict[str, np.ndarray]) -> List[DCFProjection]:
+        """Materialize projected cash flow arrays as per-year DCFProjection models"""
         base_year = financial_data.years[0] if financial_data.years else datetime.now().year
+        revenue_growth_rate = assumptions.revenue_growth_rate
         
-        for year in range(1, assumptions.projection_years + 1):
-            projection_year = base_year + year
-            
-            # Project revenue with growth rate
-            revenue = base_revenue * ((1 + assumptions.revenue_growth_rate / 100) ** year)
-            
-            # Calculate EBITDA
-            ebitda = revenue * (assumptions.ebitda_margin / 100)
-            
-            # Estimate depreciation (assume 3% of revenue)
-            depreciation = revenue * 0.03
-            
-            # Calculate EBIT
-            ebit = ebitda - depreciation
-            
-            # Calculate tax
-            tax = ebit * (assumptions.tax_rate / 100)
-            
-            # Calculate NOPAT (Net Operating Profit After Tax)
-            nopat = ebit - tax
-            
-            # Estimate CapEx (assume 2% of revenue)
-            capex = revenue * 0.02
-            
-            # Estimate working capital change (assume 1% of revenue change)
-            revenue_change = revenue - (base_revenue * ((1 + assumptions.revenue_growth_rate / 100) ** (year - 1)) if year > 1 else base_revenue)
-            working_capital_change = revenue_change * 0.01
-            
-            # Calculate Free Cash Flow
-            free_cash_flow = nopat + depreciation - capex - working_capital_change
-            
-            # Calculate present value
-            discount_factor = (1 + assumptions.wacc / 100) ** year
-            present_value = free_cash_flow / discount_factor
-            
-            projections.append(DCFProjection(
-                year=projection_year,
-                revenue=revenue,
-                revenue_growth_rate=assumptions.revenue_growth_rate,
-                ebitda=ebitda,
-                ebit=ebit,
-                tax=tax,
-                nopat=nopat,
-                capex=capex,
-                working_capital_change=working_capital_change,
-                free_cash_flow=free_cash_flow,
-                present_value=present_value,
+        return [
+            DCFProjection(
+                year=base_year + year,
+                revenue_growth_rate=revenue_growth_rate,
                 growth_stage="simple",
-                growth_method="constant_growth"
-            ))
-        
-        return projections
+                growth_method="constant_growth",
+                **dict(zip(projected, values))
+            )
+            for year, values in enumerate(zip(*(column.tolist() for column in projected.values())), start=1)
+        ]
 
     @staticmethod
-    def _calculate_terminal_value(final_projection: DCFProjection, assumptions: DCFAssumptions) -> float:
+    def _calculate_terminal_value(final_projection: DCFProjection, rates: _DCFRates,
+                                  terminal_discount_factor: float) -> float:
         """Calculate terminal value using Gordon Growth Model"""
-        terminal_fcf = final_projection.free_cash_flow * (1 + assumptions.terminal_growth_rate / 100)
-        terminal_value = terminal_fcf / (assumptions.wacc / 100 - assumptions.terminal_growth_rate / 100)
+        terminal_fcf = final_projection.free_cash_flow * (1 + rates.terminal_growth)
+        terminal_value = terminal_fcf / (rates.wacc - rates.terminal_growth)
         
-        # Discount terminal value to present value
-        discount_factor = (1 + assumptions.wacc / 100) ** assumptions.projection_years
-        return terminal_value / discount_factor
+        # Discount terminal value to present value with the final year's factor
+        return terminal_value / terminal_discount_factor
 
     @staticmethod
-    def _calculate_enterprise_value(projections: List[DCFProjection], terminal_value: float, assumptions: DCFAssumptions) -> float:
+    def _calculate_enterprise_value(free_cash_flow: np.ndarray, terminal_value: float, discount_factors: np.ndarray) -> float:
         """Calculate enterprise value by summing present values"""
-        pv_cash_flows = sum(projection.present_value for projection in projections)
+        pv_cash_flows = float(np.vdot(free_cash_flow, np.reciprocal(discount_factors)))
         return pv_cash_flows + terminal_value
 
     @staticmethod
@@ -164,14 +217,7 @@ class DCFService:
     @staticmethod
     def _calculate_intrinsic_value_per_share(equity_value: float, financial_data: FinancialData) -> float:
         """Calculate intrinsic value per share"""
-        # Find the most recent non-zero shares outstanding value
-        shares_outstanding = 1  # Default fallback
-        if financial_data.shares_outstanding:
-            # Try to find a valid shares outstanding value, starting from most recent
-            for i in range(len(financial_data.shares_outstanding) - 1, -1, -1):
-                if financial_data.shares_outstanding[i] > 0:
-                    shares_outstanding = financial_data.shares_outstanding[i]
-                    break
+        shares_outstanding = DCFService._latest_shares_outstanding(financial_data)
         
         # Debug logging to identify units issue
         logger.info(f"Equity value: {equity_value:,.2f}")
@@ -192,6 +238,14 @@ class DCFService:
         
         return intrinsic_value
 
+    @staticmethod
+    def _latest_shares_outstanding(financial_data: FinancialData) -> float:
+        """Find the most recent non-zero shares outstanding value"""
+        shares = np.asarray(financial_data.shares_outstanding or [], dtype=np.float64)
+        positive = shares[shares > 0]
+        # Last positive entry, matching the previous backwards scan; 1 as default fallback
+        return float(positive[-1]) if positive.size else 1
+
     @staticmethod
     def generate_sensitivity_analysis(financial_data: FinancialData, base_assumptions: DCFAssumptions) -> SensitivityAnalysis:
         """Generate sensitivity analysis by varying WACC and terminal growth rate"""
@@ -203,27 +257,33 @@ class DCFService:
             wacc_range = [wacc_base - 1, wacc_base - 0.5, wacc_base, wacc_base + 0.5, wacc_base + 1]
             terminal_growth_range = [terminal_growth_base - 1, terminal_growth_base - 0.5, terminal_growth_base, terminal_growth_base + 0.5, terminal_growth_base + 1]
             
-            sensitivity_matrix = []
-            
-            for wacc in wacc_range:
-                row = []
-                for terminal_growth in terminal_growth_range:
-                    # Create modified assumptions
-                    modified_assumptions = DCFAssumptions(
-                        revenue_growth_rate=base_assumptions.revenue_growth_rate,
-                        ebitda_margin=base_assumptions.ebitda_margin,
-                        tax_rate=base_assumptions.tax_rate,
-                        wacc=wacc,
-                        terminal_growth_rate=terminal_growth,
-                        projection_years=base_assumptions.projection_years
-                    )
-                    
-                    # Calculate DCF with modified assumptions
-                    # Note: For sensitivity analysis, we don't need the current price comparison
-                    valuation = DCFService.calculate_dcf(financial_data, modified_assumptions)
-                    row.append(valuation.intrinsic_value_per_share)
-                
-                sensitivity_matrix.append(row)
+            DCFService._validate_financial_data(financial_data)
+            
+            # Cash flow projections don't depend on WACC or terminal growth, so project once
+            free_cash_flow = _project_cash_flow_arrays(
+                financial_data.revenue[0], _DCFRates.from_assumptions(base_assumptions)
+            )['free_cash_flow']
+            years = np.arange(1, len(free_cash_flow) + 1)
+            
+            # Sweep the grid by broadcasting: WACC down the rows, terminal growth across the columns
+            wacc = np.array(wacc_range)[:, np.newaxis] / 100
+            terminal_growth = np.array(terminal_growth_range)[np.newaxis, :] / 100
+            with np.errstate(divide='raise', invalid='raise'):
+                discount_factors = (1 + wacc) ** years
+                pv_cash_flows = (free_cash_flow / discount_factors).sum(axis=1, keepdims=True)
+                terminal_value = free_cash_flow[-1] * (1 + terminal_growth) / (wacc - terminal_growth) / discount_factors[:, -1:]
+            
+            latest_debt = financial_data.total_debt[0] if financial_data.total_debt else 0
+            latest_cash = financial_data.cash[0] if financial_data.cash else 0
+            equity_value = pv_cash_flows + terminal_value - (latest_debt - latest_cash)
+            
+            shares_outstanding = DCFService._latest_shares_outstanding(financial_data)
+            intrinsic_value = equity_value / shares_outstanding
+            if shares_outstanding < 100000:
+                # Same units-mismatch correction as _calculate_intrinsic_value_per_share
+                mismatched = (intrinsic_value < 1) & (equity_value > 1000000)
+                intrinsic_value = np.where(mismatched, equity_value / (shares_outstanding * 1000000), intrinsic_value)
+            sensitivity_matrix = intrinsic_value.tolist()
             
             return SensitivityAnalysis(
                 wacc_range=wacc_range,
@@ -239,6 +299,45 @@ class DCFService:
                 sensitivity_matrix=[]
             )
 
+    @staticmethod
+    async def _fetch_current_price(ticker: str = None) -> float:
+        """Get current stock price using unified price service, off the event loop"""
+        if not ticker:
+            return 0.0
+        try:
+            current_price = await asyncio.to_thread(price_service.get_price_for_dcf, ticker) or 0.0
+            logger.info(f"Using unified price service for {ticker}: ₹{current_price:.2f}")
+            return current_price
+        except Exception as e:
+            logger.warning(f"Could not fetch current price for {ticker}: {e}")
+            return 0.0
+    
+    @staticmethod
+    async def _fetch_sector_assumptions(sector: str = None) -> Tuple[float, float, float]:
+        """Sector-specific (WACC, terminal growth, tax rate) percentages from SectorIntelligenceService"""
+        sector_wacc = 12.0  # Fallback
+        sector_terminal_growth = 4.0  # Fallback  
+        sector_tax_rate = 25.0  # Fallback
+        
+        if sector:
+            try:
+                # Get sector intelligence
+                sector_intel = sector_intelligence_service.get_sector_intelligence(sector)
+                if sector_intel:
+                    sector_terminal_growth = sector_intel.terminal_growth_rate * 100  # Convert to percentage
+                    sector_tax_rate = sector_intel.effective_tax_rate * 100  # Convert to percentage
+                    logger.info(f"Using sector terminal growth: {sector_terminal_growth}% and tax rate: {sector_tax_rate}%")
+                
+                # Calculate sector-specific WACC
+                sector_wacc = await sector_intelligence_service.calculate_wacc(sector) * 100  # Convert to percentage
+                logger.info(f"Calculated sector WACC for {sector}: {sector_wacc}%")
+                
+            except Exception as e:
+                logger.warning(f"Could not get sector intelligence for {sector}: {e}")
+                logger.info("Using fallback sector assumptions")
+        
+        return sector_wacc, sector_terminal_growth, sector_tax_rate
+    
     @staticmethod
     async def calculate_default_assumptions(financial_data: FinancialData, ticker: str = None, sector: str = None) -> DCFDefaults:
         """Calculate intelligent default assumptions combining historical data and sector intelligence"""
@@ -247,37 +346,11 @@ class DCFService:
             revenue_growth_rate = DCFService._calculate_average_growth_rate(financial_data.revenue)
             ebitda_margin = DCFService._calculate_average_margin(financial_data.revenue, financial_data.ebitda)
             
-            # Get current stock price using unified price service
-            current_price = 0.0
-            if ticker:
-                try:
-                    current_price = price_service.get_price_for_dcf(ticker) or 0.0
-                    logger.info(f"Using unified price service for {ticker}: ₹{current_price:.2f}")
-                except Exception as e:
-                    logger.warning(f"Could not fetch current price for {ticker}: {e}")
-                    current_price = 0.0
-            
-            # Sector-specific data from SectorIntelligenceService
-            sector_wacc = 12.0  # Fallback
-            sector_terminal_growth = 4.0  # Fallback  
-            sector_tax_rate = 25.0  # Fallback
-            
-            if sector:
-                try:
-                    # Get sector intelligence
-                    sector_intel = sector_intelligence_service.get_sector_intelligence(sector)
-                    if sector_intel:
-                        sector_terminal_growth = sector_intel.terminal_growth_rate * 100  # Convert to percentage
-                        sector_tax_rate = sector_intel.effective_tax_rate * 100  # Convert to percentage
-                        logger.info(f"Using sector terminal growth: {sector_terminal_growth}% and tax rate: {sector_tax_rate}%")
-                    
-                    # Calculate sector-specific WACC
-                    sector_wacc = await sector_intelligence_service.calculate_wacc(sector) * 100  # Convert to percentage
-                    logger.info(f"Calculated sector WACC for {sector}: {sector_wacc}%")
-                    
-                except Exception as e:
-                    logger.warning(f"Could not get sector intelligence for {sector}: {e}")
-                    logger.info("Using fallback sector assumptions")
+            # Price lookup (blocking yfinance I/O) and sector data are independent, so fetch them concurrently
+            current_price, (sector_wacc, sector_terminal_growth, sector_tax_rate) = await asyncio.gather(
+                DCFService._fetch_current_price(ticker),
+                DCFService._fetch_sector_assumptions(sector)
+            )
             
             rationale = {
                 'revenue_growth_rate': f"Based on {len(financial_data.revenue)} years of historical company data",
@@ -332,13 +405,13 @@ class DCFService:
         if len(values) < 2:
             return 8.0  # Default assumption
         
-        growth_rates = []
-        for i in range(1, len(values)):
-            if values[i] > 0:
-                growth_rate = ((values[i-1] / values[i]) - 1) * 100  # Note: values are in reverse chronological order
-                growth_rates.append(growth_rate)
+        # Note: values are in reverse chronological order, so each year's prior value follows it
+        values = np.asarray(values, dtype=np.float64)
+        current, prior = values[:-1], values[1:]
+        valid = prior > 0
+        growth_rates = (current[valid] / prior[valid] - 1) * 100
         
-        return np.mean(growth_rates) if growth_rates else 8.0
+        return float(growth_rates.mean()) if growth_rates.size else 8.0
 
     @staticmethod
     def _calculate_average_margin(revenue: List[float], ebitda: List[float]) -> float:
@@ -346,16 +419,13 @@ class DCFService:
         if len(revenue) != len(ebitda) or len(revenue) == 0:
             return 15.0  # Default assumption
         
-        margins = []
-        for i in range(len(revenue)):
-            if revenue[i] > 0:
-                margin = (ebitda[i] / revenue[i]) * 100
-                margins.append(margin)
-        
-        if not margins:
+        revenue = np.asarray(revenue, dtype=np.float64)
+        ebitda = np.asarray(ebitda, dtype=np.float64)
+        valid = revenue > 0
+        if not valid.any():
             return 15.0
             
-        calculated_margin = np.mean(margins)
+        calculated_margin = float((ebitda[valid] / revenue[valid]).mean() * 100)
         
         # Handle edge cases for financial companies (banks, insurance, etc.)
         # EBITDA margins > 100% often indicate accounting/calculation issues for financial services
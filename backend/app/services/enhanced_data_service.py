@@ -121,9 +121,14 @@ class EnhancedDataService:
         
         kite_symbol, yf_symbol = self._normalize_ticker(ticker)
         
+        # Statements change at most quarterly, so reuse extracted data across restarts
+        cached_data = await self.fallback_service.get_cached_financial_data(yf_symbol, years)
+        if cached_data:
+            return cached_data
+        
         try:
             # Get fundamental data from yfinance (better for financial statements)
-            yf_financial_data = self.fallback_service.get_financial_data(yf_symbol, years)
+            yf_financial_data = await self.fallback_service.fetch_financial_data(yf_symbol, years)
             
             # Get price history from Kite for better accuracy
             try:
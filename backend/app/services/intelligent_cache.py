@@ -1,15 +1,24 @@
 import asyncio
-import json
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional, List, Tuple
 from enum import Enum
 import hashlib
 import os
+import uuid
+import aiofiles
+import orjson
+from cachetools import LRUCache
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Cache files stay indented for inspection; non-string keys (e.g. year-indexed
+# dicts) become strings as with the stdlib encoder, and numpy values stay numeric
+_ORJSON_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+# Cache keys hash compact, key-sorted JSON so parameter order never changes the key
+_KEY_ORJSON_OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
 class CacheType(Enum):
     """Different types of data with different TTL requirements."""
     FINANCIAL_DATA = "financial_data"      # 24 hour TTL
@@ -19,6 +28,8 @@ class CacheType(Enum):
     MODEL_RECOMMENDATIONS = "model_recs"   # 12 hour TTL
     COMPANY_PROFILES = "company_profiles"  # 7 days TTL
     MARKET_DATA = "market_data"            # 4 hour TTL for risk-free rates, indices
+    AGENT_OUTPUTS = "agent_outputs"        # 24 hour TTL (per-entry override) for Claude agent responses
+    TICKER_INFO = "ticker_info"            # 1 hour TTL for raw yfinance info shared across analyzers
 
 class IntelligentCacheManager:
     """
@@ -50,9 +61,15 @@ class IntelligentCacheManager:
             CacheType.AI_ANALYSIS: timedelta(hours=6),          # Comprehensive AI analysis cached for 6 hours
             CacheType.MODEL_RECOMMENDATIONS: timedelta(hours=24), # Model recs stable for 24hr
             CacheType.COMPANY_PROFILES: timedelta(days=7),      # Basic company info rarely changes
-            CacheType.MARKET_DATA: timedelta(hours=4)           # Market data like risk-free rates
+            CacheType.MARKET_DATA: timedelta(hours=4),          # Market data like risk-free rates
+            CacheType.AGENT_OUTPUTS: timedelta(hours=24),       # Default for agent responses; entries may override
+            CacheType.TICKER_INFO: timedelta(hours=1)           # Raw yfinance info, refreshed with intraday prices
         }
         
+        # Serialized entries this process recently read or wrote, for peek():
+        # cache_key -> (expires_at, serialized entry)
+        self._memory: LRUCache = LRUCache(maxsize=128)
+        
         # Cache statistics
         self.stats = {
             'hits': 0,
@@ -95,8 +112,8 @@ class IntelligentCacheManager:
         }
         
         # Sort keys for consistency
-        key_string = json.dumps(key_data, sort_keys=True)
-        key_hash = hashlib.md5(key_string.encode()).hexdigest()
+        key_bytes = orjson.dumps(key_data, option=_KEY_ORJSON_OPTIONS)
+        key_hash = hashlib.md5(key_bytes).hexdigest()
         
         return f"{cache_type.value}_{identifier}_{key_hash[:8]}"
     
@@ -104,6 +121,13 @@ class IntelligentCacheManager:
         """Get file path for cache key."""
         return self.cache_dir / f"{cache_key}.json"
     
+    def _get_entry_ttl(self, cache_data: Dict[str, Any], cache_type: CacheType) -> timedelta:
+        """TTL for a stored entry: per-entry override if present, else the type default."""
+        ttl_seconds = cache_data.get('ttl_seconds')
+        if ttl_seconds is not None:
+            return timedelta(seconds=ttl_seconds)
+        return self.ttl_config[cache_type]
+    
     async def get(
         self, 
         cache_type: CacheType, 
@@ -131,17 +155,19 @@ class IntelligentCacheManager:
                 logger.debug(f"Cache miss: {cache_key}")
                 return None
             
-            # Read cache file
-            with open(cache_path, 'r', encoding='utf-8') as f:
-                cache_data = json.load(f)
+            # Read cache file without blocking the event loop
+            async with aiofiles.open(cache_path, 'rb') as f:
+                serialized = await f.read()
+            cache_data = orjson.loads(serialized)
             
             # Check expiration
             cached_time = datetime.fromisoformat(cache_data['timestamp'])
-            ttl = self.ttl_config[cache_type]
+            ttl = self._get_entry_ttl(cache_data, cache_type)
             
             if datetime.now() - cached_time > ttl:
                 # Expired, remove file
                 cache_path.unlink()
+                self._memory.pop(cache_key, None)
                 self.stats['misses'] += 1
                 self.stats['evictions'] += 1
                 logger.debug(f"Cache expired: {cache_key}")
@@ -149,6 +175,7 @@ class IntelligentCacheManager:
             
             # Valid cache hit
             self.stats['hits'] += 1
+            self._memory[cache_key] = (cached_time + ttl, serialized)
             
             # Calculate cost savings
             cost_savings = self._calculate_cost_savings(cache_type)
@@ -162,11 +189,41 @@ class IntelligentCacheManager:
             self.stats['misses'] += 1
             return None
     
+    def peek(
+        self,
+        cache_type: CacheType,
+        identifier: str,
+        **kwargs
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Synchronously retrieve an entry this process recently read or wrote.
+        
+        Never touches disk, so callers can try it before awaiting get().
+        
+        Returns:
+            Cached data if held in memory and not expired, None otherwise
+        """
+        
+        cache_key = self._generate_cache_key(cache_type, identifier, **kwargs)
+        held = self._memory.get(cache_key)
+        if held is None:
+            return None
+        
+        expires_at, serialized = held
+        if datetime.now() > expires_at:
+            self._memory.pop(cache_key, None)
+            return None
+        
+        self.stats['hits'] += 1
+        self.stats['total_saved_cost'] += self._calculate_cost_savings(cache_type)
+        return orjson.loads(serialized)['data']
+    
     async def set(
         self,
         cache_type: CacheType,
         identifier: str,
         data: Dict[str, Any],
+        ttl: Optional[timedelta] = None,
         **kwargs
     ) -> bool:
         """
@@ -176,6 +233,7 @@ class IntelligentCacheManager:
             cache_type: Type of data being cached
             identifier: Primary identifier
             data: Data to cache
+            ttl: Optional per-entry TTL overriding the cache type default
             **kwargs: Additional parameters for cache key generation
             
         Returns:
@@ -186,24 +244,30 @@ class IntelligentCacheManager:
             cache_key = self._generate_cache_key(cache_type, identifier, **kwargs)
             cache_path = self._get_cache_path(cache_key)
             
+            entry_ttl = ttl or self.ttl_config[cache_type]
             cache_entry = {
                 'timestamp': datetime.now().isoformat(),
                 'cache_type': cache_type.value,
                 'identifier': identifier,
                 'data': data,
                 'metadata': {
-                    'ttl_hours': self.ttl_config[cache_type].total_seconds() / 3600,
+                    'ttl_hours': entry_ttl.total_seconds() / 3600,
                     'cache_key': cache_key,
                     **kwargs
                 }
             }
+            if ttl is not None:
+                cache_entry['ttl_seconds'] = ttl.total_seconds()
             
-            # Write to temporary file first, then rename for atomic operation
-            temp_path = cache_path.with_suffix('.tmp')
-            with open(temp_path, 'w', encoding='utf-8') as f:
-                json.dump(cache_entry, f, indent=2, default=str)
+            # Write to a unique temporary file first (writes to the same key may
+            # now interleave), then rename for atomic operation
+            temp_path = cache_path.with_name(f"{cache_path.stem}.{uuid.uuid4().hex}.tmp")
+            serialized = orjson.dumps(cache_entry, default=str, option=_ORJSON_OPTIONS)
+            async with aiofiles.open(temp_path, 'wb') as f:
+                await f.write(serialized)
             
             temp_path.rename(cache_path)
+            self._memory[cache_key] = (datetime.fromisoformat(cache_entry['timestamp']) + entry_ttl, serialized)
             
             logger.debug(f"Cached: {cache_key}")
             return True
@@ -234,6 +298,7 @@ class IntelligentCacheManager:
             cache_key = self._generate_cache_key(cache_type, identifier, **kwargs)
             cache_path = self._get_cache_path(cache_key)
             
+            self._memory.pop(cache_key, None)
             if cache_path.exists():
                 cache_path.unlink()
                 logger.info(f"Cache invalidated: {cache_key}")
@@ -259,12 +324,12 @@ class IntelligentCacheManager:
         try:
             for cache_file in self.cache_dir.glob("*.json"):
                 try:
-                    with open(cache_file, 'r', encoding='utf-8') as f:
-                        cache_data = json.load(f)
+                    with open(cache_file, 'rb') as f:
+                        cache_data = orjson.loads(f.read())
                     
                     cache_type = CacheType(cache_data['cache_type'])
                     cached_time = datetime.fromisoformat(cache_data['timestamp'])
-                    ttl = self.ttl_config[cache_type]
+                    ttl = self._get_entry_ttl(cache_data, cache_type)
                     
                     if datetime.now() - cached_time > ttl:
                         cache_file.unlink()
@@ -300,7 +365,9 @@ class IntelligentCacheManager:
             CacheType.AI_ANALYSIS: 0.25,         # Comprehensive AI analysis (highest cost savings)
             CacheType.MODEL_RECOMMENDATIONS: 0.04, # Classification logic (24hr cache)
             CacheType.COMPANY_PROFILES: 0.02,    # Basic info lookup
-            CacheType.MARKET_DATA: 0.03          # Market data API calls avoided
+            CacheType.MARKET_DATA: 0.03,         # Market data API calls avoided
+            CacheType.AGENT_OUTPUTS: 0.15,       # Single Claude agent call avoided
+            CacheType.TICKER_INFO: 0.01          # Single yfinance info call avoided
         }
         
         return cost_savings_map.get(cache_type, 0.0)
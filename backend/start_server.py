@@ -13,9 +13,9 @@ def main():
         print("Usage: cd backend && python start_server.py")
         sys.exit(1)
     
-    # Check Python version
-    if sys.version_info < (3, 8):
-        print("Error: Python 3.8 or higher required")
+    # Check Python version (slotted dataclasses, TaskGroup and ISO 'Z' timestamps need 3.11)
+    if sys.version_info < (3, 11):
+        print("Error: Python 3.11 or higher required")
         sys.exit(1)
     
     print("🚀 Starting Qualitative Edge Backend Server...")
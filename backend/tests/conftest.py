@@ -7,6 +7,13 @@ from unittest.mock import patch
 os.environ["TESTING"] = "1"
 
 from app.main import app
+from app.services.data_service import _get_ticker
+
+@pytest.fixture(autouse=True)
+def clear_ticker_cache():
+    """Cached yf.Ticker objects would otherwise outlive each test's yfinance patch."""
+    _get_ticker.cache_clear()
+    yield
 
 @pytest.fixture
 def client():
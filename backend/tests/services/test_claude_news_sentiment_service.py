@@ -0,0 +1,85 @@
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch, AsyncMock
+from app.services.claude_news_sentiment_service import ClaudeNewsSentimentService, SentimentContext
+
+class TestClaudeNewsSentimentService:
+    """Test cases for the Claude news sentiment service."""
+
+    @pytest.fixture
+    def sentiment_service(self):
+        """Create a ClaudeNewsSentimentService instance for testing."""
+        return ClaudeNewsSentimentService()
+
+    @pytest.fixture
+    def context(self):
+        """Sample sentiment context."""
+        return SentimentContext(
+            ticker="TCS.NS",
+            company_name="Tata Consultancy Services",
+            sector="IT",
+            market_cap=1.2e13
+        )
+
+    def _cached_entry(self, context_hash, age=timedelta(hours=1)):
+        return {
+            "headlines": ["TCS wins large deal"],
+            "sentiment_score": 0.3,
+            "sentiment_label": "Positive",
+            "news_count": 1,
+            "last_updated": (datetime.now() - age).isoformat(),
+            "context_hash": context_hash
+        }
+
+    def test_context_hash_is_stable(self, sentiment_service, context):
+        """Identical contexts hash identically; changed fundamentals do not."""
+        same = SentimentContext(**vars(context))
+        changed = SentimentContext(**{**vars(context), "market_cap": 1.3e13})
+
+        assert sentiment_service._hash_context(context) == sentiment_service._hash_context(same)
+        assert sentiment_service._hash_context(context) != sentiment_service._hash_context(changed)
+
+    @pytest.mark.asyncio
+    async def test_force_refresh_skips_claude_when_context_unchanged(self, sentiment_service, context):
+        """Force refresh reuses the cached sentiment if the context hash matches."""
+        entry = self._cached_entry(sentiment_service._hash_context(context))
+
+        with patch.object(sentiment_service, '_get_cached_entry', AsyncMock(return_value=entry)), \
+             patch.object(sentiment_service, '_cache_sentiment', AsyncMock(return_value=True)), \
+             patch.object(sentiment_service, '_generate_claude_sentiment', AsyncMock()) as mock_generate:
+            result = await sentiment_service.get_contextual_sentiment(context, force_refresh=True)
+
+        mock_generate.assert_not_called()
+        assert result.headlines == entry["headlines"]
+        assert datetime.now() - result.last_updated < timedelta(minutes=1)
+
+    @pytest.mark.asyncio
+    async def test_force_refresh_regenerates_when_context_changed(self, sentiment_service, context):
+        """Force refresh calls Claude when the cached hash no longer matches."""
+        entry = self._cached_entry("stale-hash")
+        generated = {
+            "headlines": ["Fresh headline"],
+            "sentiment_score": 0.1,
+            "sentiment_label": "Neutral"
+        }
+
+        with patch.object(sentiment_service, '_get_cached_entry', AsyncMock(return_value=entry)), \
+             patch.object(sentiment_service, '_cache_sentiment', AsyncMock(return_value=True)), \
+             patch.object(sentiment_service, '_generate_claude_sentiment', AsyncMock(return_value=generated)) as mock_generate:
+            result = await sentiment_service.get_contextual_sentiment(context, force_refresh=True)
+
+        mock_generate.assert_awaited_once()
+        assert result.headlines == ["Fresh headline"]
+
+    def test_claude_availability_probe_is_cached(self, sentiment_service):
+        """A healthy probe is reused until the health TTL expires or a call fails."""
+        with patch('app.services.claude_news_sentiment_service.claude_service') as mock_claude:
+            mock_claude.is_available.return_value = True
+
+            assert sentiment_service._ensure_claude_available()
+            assert sentiment_service._ensure_claude_available()
+            assert mock_claude.is_available.call_count == 1
+
+            sentiment_service._claude_ok_until = 0.0
+            assert sentiment_service._ensure_claude_available()
+            assert mock_claude.is_available.call_count == 2
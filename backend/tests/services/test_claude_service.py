@@ -0,0 +1,598 @@
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock, MagicMock
+from app.services.claude_service import ClaudeService, AgenticAnalysisService, _pack_news_articles, _estimate_tokens, _dumps_for_prompt, close_http_client
+
+class TestClaudeService:
+    """Test cases for the Claude agent service."""
+
+    @pytest.fixture
+    def claude_service(self):
+        """Create a ClaudeService instance for testing."""
+        return ClaudeService()
+
+    @pytest.mark.asyncio
+    async def test_run_full_pipeline_runs_commentators_concurrently(self, claude_service):
+        """Bull and Bear agents are in flight at the same time."""
+        in_flight = []
+        peak = []
+
+        async def commentator(generator_output, checker_output, force_refresh=False):
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+            return {"commentary": "ok"}
+
+        with patch.object(claude_service, 'generator_agent', AsyncMock(return_value={"analysis": 1})), \
+             patch.object(claude_service, 'checker_agent', AsyncMock(return_value={"validation_report": {}})), \
+             patch.object(claude_service, 'bull_commentator_agent', side_effect=commentator), \
+             patch.object(claude_service, 'bear_commentator_agent', side_effect=commentator):
+            result = await claude_service.run_full_pipeline({"ticker": "TCS.NS"}, [])
+
+        assert max(peak) == 2
+        assert set(result.keys()) == {"generator", "checker", "bull", "bear"}
+
+    @pytest.mark.asyncio
+    async def test_run_full_pipeline_stops_when_checker_fails(self, claude_service):
+        """Commentators are not called if validation fails."""
+        with patch.object(claude_service, 'generator_agent', AsyncMock(return_value={"analysis": 1})), \
+             patch.object(claude_service, 'checker_agent', AsyncMock(return_value=None)), \
+             patch.object(claude_service, 'bull_commentator_agent', AsyncMock()) as mock_bull:
+            result = await claude_service.run_full_pipeline({"ticker": "TCS.NS"}, [])
+
+        assert result is None
+        mock_bull.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_agent_completion_served_from_cache(self, claude_service):
+        """Cached agent responses skip the Claude call unless force_refresh is set."""
+        claude_service.client = MagicMock()
+        claude_service.client.messages.create = AsyncMock()
+
+        with patch('app.services.claude_service.intelligent_cache') as mock_cache:
+            mock_cache.get = AsyncMock(return_value={"text": "cached summary"})
+            mock_cache.set = AsyncMock(return_value=True)
+
+            result = await claude_service.generate_completion(
+                prompt="p", system_prompt="s", cache_agent="technical_analyst"
+            )
+
+            assert result == "cached summary"
+            claude_service.client.messages.create.assert_not_called()
+
+            claude_service.client.messages.create.return_value = MagicMock(content=[MagicMock(text="fresh")])
+            result = await claude_service.generate_completion(
+                prompt="p", system_prompt="s", cache_agent="technical_analyst", force_refresh=True
+            )
+
+            assert result == "fresh"
+            mock_cache.set.assert_awaited_once()
+
+    def test_agent_cache_key_depends_on_full_request(self, claude_service):
+        """Changing any request component changes the cache key."""
+        base = claude_service._agent_cache_key("generator", "sys", "prompt", "model", 0.2, 6000)
+
+        assert base == claude_service._agent_cache_key("generator", "sys", "prompt", "model", 0.2, 6000)
+        assert base != claude_service._agent_cache_key("generator", "sys", "prompt2", "model", 0.2, 6000)
+        assert base != claude_service._agent_cache_key("checker", "sys", "prompt", "model", 0.2, 6000)
+
+    @pytest.mark.asyncio
+    async def test_batch_queue_coalesces_requests(self, claude_service):
+        """Queued requests are submitted as a single batch and routed back by custom_id."""
+        submitted = []
+
+        async def submit_batch(requests):
+            submitted.append(requests)
+            return "batch_1"
+
+        async def wait_for_batch(batch_id, poll_interval):
+            return {r["custom_id"]: r["params"]["messages"][0]["content"].upper() for r in submitted[0]}
+
+        claude_service.batch_queue.flush_delay = 0
+        with patch.object(claude_service, 'submit_batch', side_effect=submit_batch), \
+             patch.object(claude_service, 'wait_for_batch', side_effect=wait_for_batch):
+            results = await asyncio.gather(
+                claude_service.batch_queue.enqueue(claude_service._build_message_params("tcs", None, 100, 0.2, "m")),
+                claude_service.batch_queue.enqueue(claude_service._build_message_params("infy", None, 100, 0.2, "m"))
+            )
+
+        assert len(submitted) == 1
+        assert results == ["TCS", "INFY"]
+
+    def test_industry_context_peer_lookup(self, claude_service):
+        """Peers come from the ticker's own industry, with a sector fallback for unknown Indian tickers."""
+        context = claude_service._get_industry_context('Technology', 'TCS.NS')
+        assert "Key Peer Companies: INFY.NS, HCLTECH.NS, WIPRO.NS, TECHM.NS, LTI.NS" in context
+        assert "Indian Market" in context
+
+        context = claude_service._get_industry_context('Technology', 'AAPL')
+        assert "Key Peer Companies: MSFT, GOOGL, AMZN, TSLA, META" in context
+        assert "Global Market" in context
+
+        context = claude_service._get_industry_context('Healthcare', 'UNKNOWN.NS')
+        assert "Key Peer Companies: SUNPHARMA.NS, DRREDDY.NS, CIPLA.NS, DIVISLAB.NS, BIOCON.NS" in context
+
+    @pytest.mark.asyncio
+    async def test_generator_agent_extracts_json_from_wrapped_response(self, claude_service):
+        """JSON surrounded by prose (with braces inside strings) is still recovered."""
+        claude_service.client = MagicMock()
+        response = 'Here is the analysis:\n{"qualitative_analysis": {"note": "uses {braces}"}}\nThanks!'
+
+        with patch.object(claude_service, 'generate_completion', AsyncMock(return_value=response)):
+            result = await claude_service.generator_agent({"ticker": "TCS.NS", "info": {}}, [])
+
+        assert result == {"qualitative_analysis": {"note": "uses {braces}"}}
+
+    def test_parse_json_response(self, claude_service):
+        """Shared parser tolerates prose, markdown fences and control characters."""
+        assert claude_service._parse_json_response('{"score": 0.5}') == {"score": 0.5}
+        assert claude_service._parse_json_response('```json\n{"score":\x0b 0.5}\n```') == {"score": 0.5}
+        assert claude_service._parse_json_response('no json here') is None
+        assert claude_service._parse_json_response('{"broken": ') is None
+        assert claude_service._parse_json_response('{"a": 1} and {"b": 2}') == {"a": 1}
+
+    @pytest.mark.asyncio
+    async def test_sentiment_only_analysis_on_base_service(self, claude_service):
+        """News analysis works on plain ClaudeService, not just the agentic subclass."""
+        claude_service.client = MagicMock()
+        response = '{"overall_sentiment_score": 0.2, "sentiment_label": "slightly_positive"}'
+
+        with patch.object(claude_service, 'generate_completion', AsyncMock(return_value=response)):
+            result = await claude_service.analyze_news_sentiment(
+                "TCS.NS", [{"title": "TCS wins deal", "content": "..."}], analysis_depth="sentiment_only"
+            )
+
+        assert result["analysis_type"] == "sentiment_only"
+        assert result["overall_sentiment_score"] == 0.2
+
+    @pytest.mark.asyncio
+    async def test_generate_completion_stream_yields_deltas_and_caches(self, claude_service):
+        """Streamed deltas are forwarded in order and the full text is cached."""
+
+        class FakeStream:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            @property
+            async def text_stream(self):
+                for delta in ["RSI ", "is ", "neutral."]:
+                    yield delta
+
+        claude_service.client = MagicMock()
+        claude_service.client.messages.stream = MagicMock(return_value=FakeStream())
+
+        with patch('app.services.claude_service.intelligent_cache') as mock_cache:
+            mock_cache.get = AsyncMock(return_value=None)
+            mock_cache.set = AsyncMock(return_value=True)
+
+            chunks = [c async for c in claude_service.generate_completion_stream(
+                prompt="p", system_prompt="s", cache_agent="technical_analyst"
+            )]
+
+        assert chunks == ["RSI ", "is ", "neutral."]
+        assert mock_cache.set.await_args.args[2] == {"text": "RSI is neutral."}
+
+    @pytest.mark.asyncio
+    async def test_stalled_stream_reader_does_not_hold_concurrency_slot(self, claude_service):
+        """A consumer that stops reading releases its slot once the upstream stream finishes."""
+
+        class FakeStream:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            @property
+            async def text_stream(self):
+                for delta in ["RSI ", "is ", "neutral."]:
+                    yield delta
+
+        claude_service.client = MagicMock()
+        claude_service.client.messages.stream = MagicMock(return_value=FakeStream())
+        claude_service.client.messages.create = AsyncMock(return_value=MagicMock(content=[MagicMock(text="ok")], usage=None))
+
+        with patch('app.services.claude_service._request_semaphore', asyncio.Semaphore(1)):
+            stream = claude_service.generate_completion_stream(prompt="p")
+            assert await stream.__anext__() == "RSI "
+
+            # The reader stalls here while another request needs the only slot
+            text = await asyncio.wait_for(claude_service.generate_completion("q"), timeout=1)
+
+            assert text == "ok"
+            assert [c async for c in stream] == ["is ", "neutral."]
+
+    def test_technical_prompts_use_ticker_currency(self, claude_service):
+        """Indian tickers get the rupee system prompt, others the dollar one."""
+        indicators = {"rsi": 55.2, "signals": ["Golden Cross", "MACD Bullish"]}
+
+        prompt, system_prompt = claude_service._build_technical_prompts(indicators, "TCS.NS")
+        assert "Use ₹ for all price references" in system_prompt
+        assert "rsi: 55.2\nDetected Signals: Golden Cross, MACD Bullish" in prompt
+
+        _, system_prompt = claude_service._build_technical_prompts(indicators, "AAPL")
+        assert "Use $ for all price references" in system_prompt
+
+    @pytest.mark.asyncio
+    async def test_http_client_shared_across_instances(self, claude_service):
+        """Every ClaudeService, including per-request ones, uses the one pooled HTTP client."""
+        with patch('app.services.claude_service.get_user_api_keys', return_value={'claude_api_key': 'key'}):
+            claude_service.reinitialize_client()
+            http_client = claude_service.client._client
+            claude_service.reinitialize_client()
+            other = ClaudeService()
+
+        assert claude_service.client._client is http_client
+        assert other.client._client is http_client
+
+        await close_http_client()
+        assert http_client.is_closed
+
+    @pytest.mark.asyncio
+    async def test_concurrency_cap_is_shared_across_instances(self):
+        """Requests from separate per-request instances queue on one process-wide semaphore."""
+        in_flight = []
+        peak = []
+
+        async def create(**params):
+            in_flight.append(1)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+            return MagicMock(content=[MagicMock(text="ok")], usage=None)
+
+        services = [ClaudeService(), ClaudeService()]
+        for service in services:
+            service.client = MagicMock()
+            service.client.messages.create = create
+
+        with patch('app.services.claude_service._request_semaphore', asyncio.Semaphore(1)):
+            await asyncio.gather(*(service.generate_completion("p") for service in services))
+
+        assert max(peak) == 1
+
+    def test_pack_news_articles_respects_token_budget(self):
+        """Every article gets a share of the budget, without splitting characters."""
+        articles = [
+            {"url": f"https://example.com/{i}", "title": f"Story {i}", "content": "₹ crore " * 500}
+            for i in range(10)
+        ]
+
+        packed = _pack_news_articles(articles, budget=1000)
+
+        assert "ARTICLE 1:" in packed
+        assert "ARTICLE 10:" in packed
+        assert _estimate_tokens(packed) <= 1000 + 10
+
+        # A long first article can't use up the budget meant for the shorter ones after it
+        mixed = [{"url": "u", "title": "long", "content": "x" * 40000}] + [{"url": "u", "title": "t", "content": "short"}] * 4
+        packed = _pack_news_articles(mixed, budget=1000)
+        assert packed.count("Content: short...") == 4
+        assert _estimate_tokens(packed) <= 1000 + 10
+
+        short = [{"url": "u", "title": "t", "content": "short"}] * 2
+        assert _pack_news_articles(short) == "ARTICLE 1:\nURL: u\nTitle: t\nContent: short...\n\nARTICLE 2:\nURL: u\nTitle: t\nContent: short..."
+
+    def test_static_agent_prompts_marked_for_prompt_caching(self, claude_service):
+        """Agent system prompts carry cache_control; ad-hoc prompts are sent as plain text."""
+        from app.services.claude_service import _GENERATOR_SYSTEM_PROMPT
+
+        params = claude_service._build_message_params("p", _GENERATOR_SYSTEM_PROMPT, 100, 0.2, "m")
+        assert params["system"] == [
+            {"type": "text", "text": _GENERATOR_SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}
+        ]
+
+        params = claude_service._build_message_params("p", "Summarize briefly.", 100, 0.2, "m")
+        assert params["system"] == "Summarize briefly."
+
+    def test_agent_payloads_are_compact_json(self):
+        """Agent-to-agent JSON carries no indentation whitespace."""
+        assert _dumps_for_prompt({"swot": {"strengths": [1, 2]}}) == '{"swot":{"strengths":[1,2]}}'
+
+    def test_article_urls_and_titles_are_interned(self, claude_service):
+        """Equal URLs/titles from separate fetches collapse to one shared string."""
+        url = "".join(["https://example.com/", "tcs-q2"])
+        first = [{"url": url, "title": "TCS Q2", "content": "..."}]
+        second = [{"url": "".join(["https://example.com/", "tcs-q2"]), "title": None}]
+
+        claude_service._intern_article_fields(first)
+        claude_service._intern_article_fields(second)
+        claude_service._intern_article_fields(None)
+
+        assert first[0]["url"] is second[0]["url"]
+        assert second[0]["title"] is None
+
+    def test_generator_budget_fits_model_output_limit(self, claude_service):
+        """A Generator request never asks for more output than the default model allows."""
+        from app.services.claude_service import DEFAULT_CLAUDE_MODEL, MODEL_MAX_OUTPUT_TOKENS
+
+        assert claude_service.generator_max_tokens <= MODEL_MAX_OUTPUT_TOKENS[DEFAULT_CLAUDE_MODEL]
+
+    def test_company_name_from_ticker(self, claude_service):
+        """Known tickers map to display names; other NSE tickers get a derived name."""
+        assert claude_service._get_company_name_from_ticker('TCS.NS') == 'Tata Consultancy Services'
+        assert claude_service._get_company_name_from_ticker('WIPRO.NS') == 'WIPRO Limited'
+        assert claude_service._get_company_name_from_ticker('AAPL') == 'AAPL'
+        assert ClaudeService._get_company_name_from_ticker('WIPRO.NS') is claude_service._get_company_name_from_ticker('WIPRO.NS')
+
+
+    def test_format_articles_for_analysis(self, claude_service):
+        """Articles are numbered, capped, and fall back from summary to content."""
+        articles = [
+            {"title": "TCS wins deal", "summary": "Large deal", "source": {"name": "ET"}, "published_date": "2024-01-01"},
+            {"title": "TCS hiring", "summary": None, "content": "Hiring ramps up"},
+            {"title": "Not included"}
+        ]
+
+        formatted = claude_service._format_articles_for_analysis(articles, max_articles=2)
+
+        assert formatted == (
+            "Article 1:\nSource: ET\nDate: 2024-01-01\nTitle: TCS wins deal\nSummary: Large deal\n"
+            "\n---\n\n"
+            "Article 2:\nSource: Unknown source\nDate: Date unknown\nTitle: TCS hiring\nSummary: Hiring ramps up\n"
+        )
+        assert claude_service._format_articles_for_analysis([]) == "No recent articles available for analysis."
+
+    def test_near_duplicate_articles_are_dropped(self, claude_service):
+        """Syndicated copies of the same story use one slot; distinct stories fill the rest."""
+        articles = [
+            {"title": "TCS bags $2 billion deal from BSNL for 4G rollout"},
+            {"title": "TCS bags $2 billion deal from BSNL for 4G rollout - report"},
+            {"title": "Infosys cuts revenue guidance for FY25"},
+            {"title": "Wipro appoints new CFO"}
+        ]
+
+        selected = claude_service._select_distinct_articles(articles, max_articles=2)
+
+        assert [a["title"] for a in selected] == [articles[0]["title"], articles[2]["title"]]
+
+    def test_format_financial_data_handles_missing_and_non_finite(self, claude_service):
+        """None, NaN and inf render as N/A; real values keep their formats."""
+        formatted = claude_service._format_financial_data({"info": {
+            "longName": "TCS", "marketCap": 1.2e13, "profitMargins": 0.19,
+            "returnOnEquity": float("nan"), "beta": float("inf"), "trailingPE": 28
+        }})
+
+        assert "Company: TCS\nSector: N/A" in formatted
+        assert "Market Cap: $12,000,000,000,000" in formatted
+        assert "Profit Margin: 19.00%" in formatted
+        assert "ROE: N/A" in formatted
+        assert "P/E Ratio: 28.00" in formatted
+        assert "Beta: N/A" in formatted
+
+class TestAgenticAnalysisService:
+    """Test cases for the cost-optimized agentic analysis service."""
+
+    @pytest.fixture
+    def agentic_service(self):
+        """Create an AgenticAnalysisService instance for testing."""
+        return AgenticAnalysisService()
+
+    def test_cache_key_covers_full_payload(self, agentic_service):
+        """Changing any input payload changes the cache key; equal payloads match."""
+        base = agentic_service._compute_cache_key("TCS.NS", "core_batch", {"info": {"beta": 0.6}}, {"wacc": 11.0})
+
+        assert base.startswith("TCS.NS_")
+        assert base == agentic_service._compute_cache_key("TCS.NS", "core_batch", {"info": {"beta": 0.6}}, {"wacc": 11.0})
+        assert base != agentic_service._compute_cache_key("TCS.NS", "core_batch", {"info": {"beta": 0.7}}, {"wacc": 11.0})
+        assert base != agentic_service._compute_cache_key("TCS.NS", "sentiment_batch", {"info": {"beta": 0.6}}, {"wacc": 11.0})
+
+    @pytest.mark.asyncio
+    async def test_batched_core_analysis_single_call(self, agentic_service):
+        """Several tickers share one Claude call and results are split back per ticker."""
+        response = {"results": [
+            {"ticker": "TCS.NS", "investment_thesis": "TCS thesis"},
+            {"ticker": "INFY.NS", "investment_thesis": "INFY thesis"}
+        ]}
+        payload = {"company_data": {"info": {}}, "dcf_results": {}, "technical_data": {}}
+        agentic_service.max_tokens_core = 1000
+        agentic_service.core_batch_size = 3
+
+        with patch.object(agentic_service, 'generate_json_completion', AsyncMock(return_value=(response, {"input_tokens": 900, "output_tokens": 300}))) as mock_completion:
+            results = await agentic_service.generate_batched_core_analysis(
+                ["TCS.NS", "INFY.NS", "WIPRO.NS"], [payload, payload, payload]
+            )
+
+        assert mock_completion.await_count == 1
+        assert "=== TICKER: INFY.NS ===" in mock_completion.await_args.kwargs["prompt"]
+        assert mock_completion.await_args.kwargs["tool"]["name"] == "emit_core_analysis"
+        assert results["TCS.NS"]["investment_thesis"] == "TCS thesis"
+        assert results["INFY.NS"]["investment_thesis"] == "INFY thesis"
+        assert results["WIPRO.NS"] == agentic_service._get_fallback_core_analysis()
+        assert results["TCS.NS"]["input_tokens"] == 450
+        assert results["TCS.NS"]["token_usage"] == 600
+
+    @pytest.mark.asyncio
+    async def test_core_batches_fit_model_output_limit(self, agentic_service):
+        """Several uncached tickers share one call without exceeding the model's output limit."""
+        from app.services.claude_service import DEFAULT_CLAUDE_MODEL, MODEL_MAX_OUTPUT_TOKENS
+
+        limit = MODEL_MAX_OUTPUT_TOKENS[DEFAULT_CLAUDE_MODEL]
+        response = {"results": [
+            {"ticker": "TCS.NS", "investment_thesis": "TCS thesis"},
+            {"ticker": "INFY.NS", "investment_thesis": "INFY thesis"}
+        ]}
+        payload = {"company_data": {"info": {}}, "dcf_results": {}, "technical_data": {}}
+
+        with patch.object(agentic_service, 'generate_json_completion', AsyncMock(return_value=(response, {"output_tokens": 300}))) as mock_completion:
+            results = await agentic_service.generate_batched_core_analysis(["TCS.NS", "INFY.NS"], [payload, payload])
+
+        assert agentic_service.core_batch_size >= 2
+        assert agentic_service.core_batch_size * agentic_service.max_tokens_core <= limit
+        assert mock_completion.await_count == 1
+        assert mock_completion.await_args.kwargs["max_tokens"] <= limit
+        assert results["TCS.NS"]["investment_thesis"] == "TCS thesis"
+        assert results["INFY.NS"]["investment_thesis"] == "INFY thesis"
+
+    def test_message_params_clamp_max_tokens_to_model_limit(self, agentic_service):
+        """Oversized output budgets are clamped rather than rejected by the API."""
+        params = agentic_service._build_message_params("p", None, 30000, 0.2, "claude-3-haiku-20240307")
+
+        assert params["max_tokens"] == 4096
+
+    def test_batch_schema_sent_as_cached_system_block(self, agentic_service):
+        """Block-form system prompts pass through with the schema marked for caching."""
+        from app.services.claude_service import _CORE_BATCH_SYSTEM_BLOCKS, _CORE_BATCH_SCHEMA
+
+        params = agentic_service._build_message_params("p", _CORE_BATCH_SYSTEM_BLOCKS, 100, 0.2, "m")
+
+        assert params["system"][0] == {"type": "text", "text": _CORE_BATCH_SCHEMA, "cache_control": {"type": "ephemeral"}}
+        assert "cache_control" not in params["system"][1]
+
+
+    @pytest.mark.asyncio
+    async def test_comprehensive_analysis_falls_back_when_call_fails(self, agentic_service):
+        """A failing batch call degrades to fallback sections instead of failing the analysis."""
+        sentiment = {"news_sentiment": {"overall_tone": "Positive"}, "peer_context": [], "token_usage": 10}
+
+        with patch.object(agentic_service, 'generate_core_analysis_batch', AsyncMock(side_effect=RuntimeError("boom"))), \
+             patch.object(agentic_service, 'generate_sentiment_context_batch', AsyncMock(return_value=sentiment)), \
+             patch('app.services.claude_service.intelligent_cache') as mock_cache:
+            mock_cache.get = AsyncMock(return_value=None)
+            mock_cache.set = AsyncMock(return_value=True)
+            result = await agentic_service.generate_comprehensive_agentic_analysis("TCS.NS", {}, {}, {})
+
+        fallback = agentic_service._get_fallback_core_analysis()
+        assert result["investment_thesis"] == fallback["investment_thesis"]
+        assert result["analysis_quality"] != "fallback"
+
+    @pytest.mark.asyncio
+    async def test_sentiment_batch_served_from_memory_cache(self, agentic_service):
+        """A repeated sentiment request with identical inputs skips Claude."""
+        response = {"news_sentiment": {"overall_tone": "Positive"}, "peer_context": []}
+        news = [{"title": "TCS wins deal"}]
+
+        with patch.object(agentic_service, 'generate_json_completion', AsyncMock(return_value=(response, {"input_tokens": 900, "output_tokens": 300}))) as mock_completion:
+            first = await agentic_service.generate_sentiment_context_batch("TCS.NS", news, {})
+            second = await agentic_service.generate_sentiment_context_batch("TCS.NS", news, {})
+
+        assert mock_completion.await_count == 1
+        assert second is first
+        assert agentic_service.sentiment_cache.maxsize == 512
+
+    @pytest.mark.asyncio
+    async def test_sentiment_cache_requires_same_headlines_and_peers(self, agentic_service):
+        """Refetched identical headlines hit; flipped headlines or changed peer figures call Claude."""
+        response = {"news_sentiment": {"overall_tone": "Positive"}, "peer_context": []}
+        peers = {"peers": [{"name": "Infosys", "pe_ratio": 24.0}]}
+        positive = [{"title": "TCS shares rise 9%, beat estimates", "url": "https://example.com/a"}]
+
+        with patch.object(agentic_service, 'generate_json_completion', AsyncMock(return_value=(response, {"input_tokens": 900, "output_tokens": 300}))) as mock_completion:
+            await agentic_service.generate_sentiment_context_batch("TCS.NS", positive, peers)
+            await agentic_service.generate_sentiment_context_batch(
+                "TCS.NS", [{"title": "TCS  shares rise 9%, beat estimates ", "url": "https://example.com/b"}], peers
+            )
+            assert mock_completion.await_count == 1
+
+            await agentic_service.generate_sentiment_context_batch(
+                "TCS.NS", [{"title": "TCS shares fall 9%, miss estimates"}], peers
+            )
+            assert mock_completion.await_count == 2
+
+            await agentic_service.generate_sentiment_context_batch(
+                "TCS.NS", positive, {"peers": [{"name": "Infosys", "pe_ratio": 12.0}]}
+            )
+
+        assert mock_completion.await_count == 3
+
+    def test_estimated_cost_uses_reported_usage(self, agentic_service):
+        """Cost is priced from actual input/output/cache token counts."""
+        core = {"input_tokens": 1_000_000, "output_tokens": 0, "cache_read_input_tokens": 1_000_000}
+        sentiment = {"output_tokens": 1_000_000}
+
+        cost = agentic_service._calculate_estimated_cost(core, sentiment)
+
+        assert cost == pytest.approx(0.25 + 0.025 + 1.25)
+
+    def test_aggregate_costs_across_portfolio(self, agentic_service):
+        """Portfolio-wide cost sums every ticker's usage in one pass."""
+        results = [{"input_tokens": 100_000, "output_tokens": 20_000}] * 50
+
+        assert agentic_service._aggregate_costs(results) == pytest.approx(50 * (0.025 + 0.025))
+        assert agentic_service._aggregate_costs([]) == 0.0
+
+    def test_fallback_analyses_are_independent_copies(self, agentic_service):
+        """Mutating a returned fallback never leaks into the shared template."""
+        first = agentic_service._get_fallback_sentiment_analysis()
+        first["news_sentiment"]["key_themes"].append("mutated")
+
+        second = agentic_service._get_fallback_sentiment_analysis()
+        assert "mutated" not in second["news_sentiment"]["key_themes"]
+        assert isinstance(second, dict)
+
+    @pytest.mark.asyncio
+    async def test_json_completion_stops_when_object_closes(self, agentic_service):
+        """Streaming parse returns once braces balance, ignoring braces inside strings."""
+        deltas = ['Here you go: {"tone": "a {b', '}", "n": {"x": 1}', '} trailing', ' text that is never read']
+        consumed = []
+
+        def event(type_, **kwargs):
+            return MagicMock(type=type_, **kwargs)
+
+        class FakeStream:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def __aiter__(self):
+                yield event("message_start", message=MagicMock(usage=MagicMock(
+                    input_tokens=120, output_tokens=1, cache_creation_input_tokens=0, cache_read_input_tokens=0
+                )))
+                for text in deltas:
+                    consumed.append(text)
+                    yield event("content_block_delta", delta=MagicMock(type="text_delta", text=text))
+
+        agentic_service.client = MagicMock()
+        agentic_service.client.messages.stream = MagicMock(return_value=FakeStream())
+
+        parsed, usage = await agentic_service.generate_json_completion("p", "s")
+
+        assert parsed == {"tone": "a {b}", "n": {"x": 1}}
+        assert len(consumed) == 3
+        assert usage["input_tokens"] == 120
+        assert usage["output_tokens"] > 1
+
+    @pytest.mark.asyncio
+    async def test_sentiment_batch_skips_claude_without_inputs(self, agentic_service):
+        """No news and no peers returns the tagged fallback without calling Claude."""
+        agentic_service.client = MagicMock()
+        with patch.object(agentic_service, 'generate_json_completion', AsyncMock()) as mock_completion:
+            result = await agentic_service.generate_sentiment_context_batch("TCS.NS", [], {})
+            news_result = await agentic_service.analyze_news_sentiment("TCS.NS", [])
+
+        mock_completion.assert_not_called()
+        assert result["skipped_reason"] == "no_input_data"
+        assert news_result["skipped_reason"] == "no_input_data"
+        assert news_result["analysis_type"] == "fallback"
+
+    @pytest.mark.asyncio
+    async def test_json_completion_reads_forced_tool_input(self, agentic_service):
+        """With a tool, the request forces the call and the streamed tool input is parsed."""
+        from app.services.claude_service import _CORE_ANALYSIS_TOOL
+
+        class FakeStream:
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc):
+                return False
+
+            async def __aiter__(self):
+                for partial in ['{"results": [', '{"ticker": "TCS.NS"}]}']:
+                    yield MagicMock(type="content_block_delta", delta=MagicMock(type="input_json_delta", partial_json=partial))
+                yield MagicMock(type="message_delta", usage=MagicMock(output_tokens=42))
+
+        agentic_service.client = MagicMock()
+        agentic_service.client.messages.stream = MagicMock(return_value=FakeStream())
+
+        parsed, usage = await agentic_service.generate_json_completion("p", "s", tool=_CORE_ANALYSIS_TOOL)
+
+        params = agentic_service.client.messages.stream.call_args.kwargs
+        assert params["tool_choice"] == {"type": "tool", "name": "emit_core_analysis"}
+        assert parsed == {"results": [{"ticker": "TCS.NS"}]}
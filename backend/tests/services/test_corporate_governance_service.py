@@ -0,0 +1,301 @@
+import pytest
+import asyncio
+import json
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from unittest.mock import patch, PropertyMock, MagicMock, AsyncMock
+from app.services.corporate_governance_service import (
+    CorporateGovernanceService, ShareholdingPattern, GovernanceMetrics, _parse_dt
+)
+from app.services.intelligent_cache import CacheType
+
+INFO = {
+    'longName': 'Test Company Limited',
+    'sharesOutstanding': 1_000_000,
+    'floatShares': 400_000,
+    'currentPrice': 100.0,
+    'trailingEps': 10.0,
+    'overallRisk': 3
+}
+
+DIVIDENDS = pd.Series(
+    [1.0, 1.5, 1.0, 2.0, 1.2, 2.5],
+    index=pd.to_datetime(['2021-03-01', '2021-09-01', '2022-03-01', '2022-09-01', '2023-03-01', '2023-09-01'])
+)
+
+class TestCorporateGovernanceService:
+    """Test cases for the corporate governance service."""
+
+    @pytest.fixture
+    def governance_service(self):
+        """Create an uncached CorporateGovernanceService instance for testing."""
+        return CorporateGovernanceService(use_cache=False)
+
+    @pytest.mark.asyncio
+    async def test_info_fetched_once_per_analysis(self, governance_service):
+        """stock.info is a network round-trip, so it is read once and shared by every fetcher."""
+        with patch('yfinance.Ticker') as mock_ticker:
+            info = PropertyMock(return_value=INFO)
+            type(mock_ticker.return_value).info = info
+            mock_ticker.return_value.dividends = DIVIDENDS
+
+            result = await governance_service.get_corporate_governance_analysis("TEST.NS")
+
+        assert info.call_count == 1
+        assert result.company_name == 'Test Company Limited'
+        assert result.dividend_yield_ttm == pytest.approx((2.5 + 1.2 + 2.0 + 1.0) / 100.0 * 100)
+        assert result.dividend_payout_ratio == pytest.approx((2.5 + 1.2 + 2.0 + 1.0) / 10.0 * 100)
+        assert result.latest_shareholding.public_percentage == pytest.approx(40.0)
+        assert result.yearly_dividend_sums == pytest.approx([2.5, 3.0, 3.7])
+        assert result.analysis_date == result.last_updated == result.latest_shareholding.date == result.shareholding_history[0].date
+
+    @pytest.mark.asyncio
+    async def test_dividend_fetch_failure_degrades_gracefully(self, governance_service):
+        """A failed dividends request leaves an empty dividend history instead of failing the analysis."""
+        with patch('yfinance.Ticker') as mock_ticker:
+            mock_ticker.return_value.info = INFO
+            type(mock_ticker.return_value).dividends = PropertyMock(side_effect=ConnectionError("rate limited"))
+
+            result = await governance_service.get_corporate_governance_analysis("TEST.NS")
+
+        assert result.dividend_history == []
+        assert result.dividend_yield_ttm == 0.0
+        assert "Dividend history data unavailable" in result.data_warnings
+
+    @pytest.mark.asyncio
+    async def test_cache_dict_is_json_ready(self, governance_service):
+        """The cached form carries every field with datetimes already ISO-formatted."""
+        with patch('yfinance.Ticker') as mock_ticker:
+            mock_ticker.return_value.info = INFO
+            mock_ticker.return_value.dividends = DIVIDENDS
+
+            result = await governance_service.get_corporate_governance_analysis("TEST.NS")
+
+        cached = governance_service._to_cache_dict(result)
+
+        assert json.loads(json.dumps(cached)) == cached
+        assert cached['analysis_date'] == result.analysis_date.isoformat()
+        assert len(cached['shareholding_history']) == len(result.shareholding_history)
+        assert cached['dividend_history'][0]['ex_date'].startswith('2023-09-01')
+        assert cached['governance_metrics']['overall_governance_score'] == result.governance_metrics.overall_governance_score
+
+    def test_shareholding_history_is_bounded_and_newest_first(self, governance_service):
+        """Synthetic quarters stay within each holder's bounds and are ordered newest first."""
+        latest = ShareholdingPattern(
+            date=datetime.now(), promoter_percentage=99.5, fii_percentage=49.8,
+            dii_percentage=0.1, public_percentage=0.2, pledged_percentage=0.0
+        )
+
+        history = governance_service._generate_shareholding_history(latest)
+
+        assert len(history) == 8
+        assert [h.date for h in history] == sorted((h.date for h in history), reverse=True)
+        assert all(0 <= h.promoter_percentage <= 100 and 0 <= h.fii_percentage <= 50 for h in history)
+        assert all(0 <= h.pledged_percentage <= 20 and type(h.dii_percentage) is float for h in history)
+
+        governance_service._rng = np.random.default_rng(7)
+        first = governance_service._generate_shareholding_history(latest)
+        governance_service._rng = np.random.default_rng(7)
+        assert governance_service._generate_shareholding_history(latest) == first
+
+    def test_dividend_consistency_from_yearly_totals(self, governance_service):
+        """Coverage scores 20 per paying year; steady growth earns the full consistency bonus."""
+        steady = [10.0, 11.0, 12.1]
+        erratic = [10.0, 2.0, 12.0]
+
+        assert governance_service._calculate_dividend_consistency_score([]) == 0.0
+        assert governance_service._calculate_dividend_consistency_score(steady[:1]) == 30.0
+        assert governance_service._calculate_dividend_consistency_score(steady) == pytest.approx(90.0)
+        assert governance_service._calculate_dividend_consistency_score(erratic) == pytest.approx(60.0)
+
+    @pytest.mark.asyncio
+    async def test_info_served_from_ticker_info_cache(self):
+        """A cached info dict skips the yfinance info request entirely."""
+        governance_service = CorporateGovernanceService()
+        governance_service.cache_manager = MagicMock()
+        governance_service.cache_manager.peek.return_value = None
+        governance_service.cache_manager.get = AsyncMock(side_effect=lambda cache_type, key: INFO if cache_type is CacheType.TICKER_INFO else None)
+        governance_service.cache_manager.set = AsyncMock(return_value=True)
+
+        with patch('yfinance.Ticker') as mock_ticker:
+            info = PropertyMock(return_value={})
+            type(mock_ticker.return_value).info = info
+            mock_ticker.return_value.dividends = DIVIDENDS
+
+            result = await governance_service.get_corporate_governance_analysis("TEST.NS")
+
+        assert info.call_count == 0
+        assert result.company_name == 'Test Company Limited'
+
+    def test_parse_cached_datetimes(self):
+        """Cached timestamps parse from ISO strings, with 'Z' and invalid values handled."""
+        fallback = datetime(2024, 1, 1)
+
+        assert _parse_dt('2023-09-01T00:00:00') == datetime(2023, 9, 1)
+        assert _parse_dt('2023-09-01T00:00:00Z').utcoffset().total_seconds() == 0
+        assert _parse_dt('not a date', fallback) is fallback
+        assert _parse_dt(None, fallback) is fallback
+        assert _parse_dt(fallback) is fallback
+
+    @pytest.mark.asyncio
+    async def test_cache_round_trip_restores_full_analysis(self, governance_service):
+        """A cached analysis comes back identical, including history and dividend dates."""
+        with patch('yfinance.Ticker') as mock_ticker:
+            mock_ticker.return_value.info = INFO
+            mock_ticker.return_value.dividends = DIVIDENDS
+
+            result = await governance_service.get_corporate_governance_analysis("TEST.NS")
+
+        cached = json.loads(json.dumps(governance_service._to_cache_dict(result)))
+
+        assert governance_service._reconstruct_from_cache(cached) == result
+
+    def test_promoter_stability_score(self, governance_service):
+        """Stable holdings score near 100; too few non-zero quarters is neutral."""
+        def quarters(*promoter):
+            return [ShareholdingPattern(datetime.now(), p, 15.0, 15.0, 20.0) for p in promoter]
+
+        history = quarters(50.0, 50.0, 60.0, 40.0)
+        latest = history[0]
+
+        assert governance_service._calculate_promoter_stability_score(None, history) == 50.0
+        assert governance_service._calculate_promoter_stability_score(latest, quarters(50.0, 0.0)) == 50.0
+        assert governance_service._calculate_promoter_stability_score(latest, quarters(50.0, 50.0)) == 100.0
+        assert governance_service._calculate_promoter_stability_score(latest, history) == pytest.approx(100 - (50 ** 0.5) / 50 * 100)
+
+    def test_simple_mode_summary(self, governance_service):
+        """Summary sentences follow the holding, pledging, dividend and governance tiers."""
+        shareholding = ShareholdingPattern(datetime.now(), 55.25, 15.0, 15.0, 14.75, pledged_percentage=6.0)
+        metrics = GovernanceMetrics(80.0, 60.0, 70.0, 75.0, 76.0)
+
+        summary = governance_service._generate_simple_mode_summary(shareholding, [1.0, 1.0, 1.0], metrics)
+
+        assert summary == (
+            "Promoter holding at 55.2% indicates strong management control. "
+            "Moderate pledging at 6.0% requires monitoring. "
+            "Consistent dividend payments over 3 years demonstrates shareholder-friendly policy. "
+            "Strong corporate governance practices."
+        )
+        weak_metrics = GovernanceMetrics(80.0, 60.0, 70.0, 75.0, 50.0)
+        assert governance_service._generate_simple_mode_summary(None, [], weak_metrics) == (
+            "No dividend history available. Corporate governance practices need improvement."
+        )
+
+    @pytest.mark.asyncio
+    async def test_raw_cache_hit_skips_reconstruction(self):
+        """raw=True hands back the cached dict as-is; misses return the same dict shape."""
+        cached = {"ticker": "TEST.NS", "simple_mode_summary": "cached"}
+        governance_service = CorporateGovernanceService()
+        governance_service.cache_manager = MagicMock()
+        governance_service.cache_manager.peek.return_value = None
+        governance_service.cache_manager.get = AsyncMock(return_value=cached)
+
+        with patch.object(governance_service, '_reconstruct_from_cache') as mock_reconstruct:
+            result = await governance_service.get_corporate_governance_analysis("TEST.NS", raw=True)
+
+        assert result is cached
+        mock_reconstruct.assert_not_called()
+
+        with patch('yfinance.Ticker') as mock_ticker:
+            mock_ticker.return_value.info = INFO
+            mock_ticker.return_value.dividends = DIVIDENDS
+
+            fresh = await CorporateGovernanceService(use_cache=False).get_corporate_governance_analysis("TEST.NS", raw=True)
+
+        assert fresh["company_name"] == 'Test Company Limited'
+        assert isinstance(fresh["analysis_date"], str)
+
+    @pytest.mark.asyncio
+    async def test_in_memory_cache_hit_skips_disk_read(self):
+        """An entry held in memory is served by peek() without awaiting get()."""
+        cached = {"ticker": "TEST.NS"}
+        governance_service = CorporateGovernanceService()
+        governance_service.cache_manager = MagicMock()
+        governance_service.cache_manager.peek.return_value = cached
+        governance_service.cache_manager.get = AsyncMock()
+
+        result = await governance_service.get_corporate_governance_analysis("TEST.NS", raw=True)
+
+        assert result is cached
+        governance_service.cache_manager.get.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_batch_bounds_concurrency_and_isolates_failures(self, governance_service):
+        """Batch analyses run at most `concurrency` at a time; one failure doesn't sink the rest."""
+        in_flight = 0
+        peak = 0
+
+        async def fake_analysis(ticker):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if ticker == "BAD.NS":
+                raise ValueError("no data")
+            return ticker.lower()
+
+        tickers = ["TCS.NS", "INFY.NS", "BAD.NS", "WIPRO.NS", "HCLTECH.NS"]
+        with patch.object(governance_service, 'get_corporate_governance_analysis', side_effect=fake_analysis):
+            results = await governance_service.get_corporate_governance_batch(tickers, concurrency=2)
+
+        assert peak == 2
+        assert list(results) == tickers
+        assert results["TCS.NS"] == "tcs.ns"
+        assert isinstance(results["BAD.NS"], ValueError)
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_fetch_retries_with_backoff(self, governance_service):
+        """Rate-limit errors are retried with exponential backoff; other errors are not."""
+        calls = []
+
+        def flaky_fetch():
+            calls.append(1)
+            if len(calls) < 3:
+                raise Exception("Too Many Requests. Rate limited. Try after a while.")
+            return {"longName": "Recovered"}
+
+        with patch('app.services.corporate_governance_service.asyncio.sleep') as mock_sleep:
+            assert await governance_service._run_yfinance(flaky_fetch) == {"longName": "Recovered"}
+            assert [c.args[0] for c in mock_sleep.await_args_list] == [1, 2]
+
+            with pytest.raises(KeyError):
+                await governance_service._run_yfinance(lambda: {}["missing"])
+            assert mock_sleep.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_degraded_result_is_not_cached(self):
+        """An analysis built after a failed dividend fetch is returned but not cached."""
+        governance_service = CorporateGovernanceService()
+        governance_service.cache_manager = MagicMock()
+        governance_service.cache_manager.peek.return_value = None
+        governance_service.cache_manager.get = AsyncMock(return_value=None)
+        governance_service.cache_manager.set = AsyncMock(return_value=True)
+
+        with patch('yfinance.Ticker') as mock_ticker:
+            mock_ticker.return_value.info = INFO
+            type(mock_ticker.return_value).dividends = PropertyMock(side_effect=ConnectionError("reset"))
+
+            result = await governance_service.get_corporate_governance_analysis("TEST.NS")
+
+        assert result.dividend_history == []
+        cached_types = [c.args[0] for c in governance_service.cache_manager.set.await_args_list]
+        assert CacheType.FINANCIAL_DATA not in cached_types
+
+    def test_records_use_slots(self):
+        """Governance records are slotted, so cached analyses carry no per-instance __dict__."""
+        pattern = ShareholdingPattern(datetime.now(), 50.0, 15.0, 15.0, 20.0)
+
+        assert not hasattr(pattern, '__dict__')
+        with pytest.raises(AttributeError):
+            pattern.unknown_field = 1
+
+    def test_governance_metrics_from_info(self, governance_service):
+        """Risk fields default to 5 and the governance score inverts overall risk."""
+        metrics = governance_service._fetch_governance_metrics("TEST.NS", {'overallRisk': 3, 'auditRisk': 7})
+
+        assert metrics == {
+            'audit_risk': 7, 'board_risk': 5, 'compensation_risk': 5,
+            'shareholder_rights_risk': 5, 'overall_risk': 3, 'governance_score': 7
+        }
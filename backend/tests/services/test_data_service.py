@@ -1,6 +1,8 @@
 import pytest
-from unittest.mock import patch, MagicMock
+import pandas as pd
+from unittest.mock import patch, MagicMock, PropertyMock, AsyncMock
 from app.services.data_service import DataService
+from app.services.enhanced_data_service import EnhancedDataService
 
 class TestDataService:
     """Test cases for the data service."""
@@ -154,4 +156,177 @@ class TestDataService:
             
             assert result1 == result2
             # In a real caching implementation, we would assert that
-            # yfinance.Ticker was only called once
\ No newline at end of file
+            # yfinance.Ticker was only called once
+
+def _statement(rows: dict, years=(2023, 2022, 2021)) -> pd.DataFrame:
+    """yfinance-shaped statement: metrics as rows, fiscal year-ends as columns."""
+    return pd.DataFrame(rows, index=pd.to_datetime([f"{y}-03-31" for y in years])).T
+
+
+FINANCIALS = _statement({
+    'Total Revenue': [1000.0, 900.0, 800.0],
+    'EBIT': [200.0, 180.0, None],
+    'Net Income': [120.0, 100.0, 90.0],
+    'Depreciation And Amortization': [50.0, 45.0, 40.0]
+})
+BALANCE_SHEET = _statement({
+    'Total Debt': [100.0, 120.0, 140.0],
+    'Cash': [50.0, 40.0, 30.0],
+    'Ordinary Shares Number': [10.0, 10.0, 10.0]
+})
+CASHFLOW = _statement({
+    'Free Cash Flow': [80.0, 70.0, 60.0],
+    'Capital Expenditure': [-30.0, 0.0, -20.0],
+    'Change In Working Capital': [5.0, None, 3.0],
+    'Depreciation And Amortization': [50.0, 45.0, 40.0]
+})
+
+
+class TestFinancialData:
+    """Test cases for DCF financial data extraction."""
+
+    @pytest.fixture
+    def mock_ticker(self):
+        """Patch yfinance.Ticker to serve fixed statements."""
+        with patch('yfinance.Ticker') as mock_ticker:
+            mock_ticker.return_value.financials = FINANCIALS
+            mock_ticker.return_value.balance_sheet = BALANCE_SHEET
+            mock_ticker.return_value.cashflow = CASHFLOW
+            yield mock_ticker
+
+    def test_extracts_statements_newest_first(self, mock_ticker):
+        """Metrics come back per year, newest first, with alternates and missing values resolved."""
+        result = DataService.get_financial_data("TEST.NS")
+
+        assert result.years == [2023, 2022, 2021]
+        assert result.revenue == [1000.0, 900.0, 800.0]
+        assert result.ebitda == [250.0, 225.0, 40.0]
+        assert result.cash == [50.0, 40.0, 30.0]
+        assert result.capex == [-30.0, 0.0, -20.0]
+        assert result.working_capital_change == [5.0, 0.0, 3.0]
+        assert all(type(v) is float for v in result.free_cash_flow)
+
+    def test_latest_years_orders_newest_first(self):
+        """Only the requested number of periods is kept, newest first, whatever the input order."""
+        df = _statement({'Total Revenue': [800.0, 1000.0, 900.0]}, years=(2021, 2023, 2022))
+
+        latest = DataService._latest_years(df, 2)
+        assert [d.year for d in latest.columns] == [2023, 2022]
+        assert latest.loc['Total Revenue'].tolist() == [1000.0, 900.0]
+
+    def test_safe_extract_coerces_to_floats(self):
+        """Object rows with gaps come back as plain floats; unknown metrics as zeros."""
+        df = pd.DataFrame([[10, None, 2.5]], index=['Cash Equivalents'], dtype=object)
+
+        assert DataService._safe_extract(df, 'Cash And Cash Equivalents') == [10.0, 0.0, 2.5]
+        assert DataService._safe_extract(df, 'Goodwill') == [0.0, 0.0, 0.0]
+
+    def test_extract_rows_resolves_each_metric(self):
+        """Each requested metric maps to one row, using alternates and zero-filling gaps."""
+        df = _statement({'Total Debt': [100.0, None], 'Cash': [50.0, 40.0]}, years=(2023, 2022))
+
+        matrix = DataService._extract_rows(df, ('Total Debt', 'Cash And Cash Equivalents', 'Ordinary Shares Number'))
+        assert matrix.tolist() == [[100.0, 0.0], [50.0, 40.0], [0.0, 0.0]]
+
+    def test_ebitda_falls_back_to_net_income_build_up(self):
+        """Without EBIT, EBITDA is rebuilt from net income, interest, tax and D&A."""
+        income_stmt = _statement({
+            'Net Income Common Stockholders': [100.0, 90.0],
+            'Interest Expense': [10.0, None],
+            'Tax Provision': [30.0, 25.0],
+            'Depreciation And Amortization': [20.0, 15.0]
+        }, years=(2023, 2022))
+
+        assert DataService._calculate_ebitda(income_stmt) == [160.0, 130.0]
+
+    def test_failed_statement_does_not_raise(self, mock_ticker):
+        """A statement whose request fails is treated as empty rather than raising."""
+        type(mock_ticker.return_value).cashflow = PropertyMock(side_effect=ConnectionError("timeout"))
+
+        assert DataService.get_financial_data("TEST.NS") is None
+        financials, balance_sheet, cash_flow = DataService._fetch_statements("TEST.NS", mock_ticker.return_value)
+        assert financials is FINANCIALS and balance_sheet is BALANCE_SHEET and cash_flow.empty
+
+    def test_batch_fetch_returns_data_per_ticker(self, mock_ticker):
+        """Batch fetches deduplicate tickers and omit those without statements."""
+        def ticker_for(symbol):
+            stock = MagicMock()
+            stock.financials = pd.DataFrame() if symbol == "EMPTY.NS" else FINANCIALS
+            stock.balance_sheet = BALANCE_SHEET
+            stock.cashflow = CASHFLOW
+            return stock
+        mock_ticker.side_effect = ticker_for
+
+        results = DataService.get_financial_data_batch(["TCS.NS", "INFY.NS", "TCS.NS", "EMPTY.NS"])
+
+        assert list(results) == ["TCS.NS", "INFY.NS"]
+        assert results["INFY.NS"].ticker == "INFY.NS"
+        assert results["TCS.NS"].revenue == [1000.0, 900.0, 800.0]
+        assert DataService.get_financial_data_batch([]) == {}
+
+    def test_ticker_reused_across_lookups(self, mock_ticker):
+        """Repeat lookups for a symbol share one yf.Ticker, so its memoized statements are reused."""
+        DataService.get_financial_data("TEST.NS")
+        DataService.get_industry_multiples("TEST.NS")
+        DataService.get_financial_data("OTHER.NS")
+
+        assert [c.args for c in mock_ticker.call_args_list] == [("TEST.NS",), ("OTHER.NS",)]
+
+
+class TestEnhancedFinancialDataCache:
+    """Test persistent caching of extracted financial statements."""
+
+    @pytest.fixture
+    def enhanced_service(self):
+        """EnhancedDataService with the Kite session treated as initialized."""
+        service = EnhancedDataService()
+        service._initialized = True
+        service.kite_service = MagicMock()
+        service.kite_service.get_historical_data = AsyncMock(return_value=None)
+        return service
+
+    @pytest.mark.asyncio
+    async def test_cached_statements_skip_yfinance(self, enhanced_service):
+        """A cached extraction is returned without touching yfinance."""
+        cached = {"ticker": "TCS.NS", "years": [2023], "revenue": [1.0], "ebitda": [1.0], "net_income": [1.0],
+                  "free_cash_flow": [1.0], "total_debt": [1.0], "cash": [1.0], "shares_outstanding": [1.0]}
+
+        with patch.object(DataService, 'get_financial_data') as mock_fetch, \
+             patch('app.services.data_service.intelligent_cache') as mock_cache:
+            mock_cache.get = AsyncMock(return_value=cached)
+            result = await enhanced_service.get_financial_data("TCS.NS")
+
+        assert result.revenue == [1.0]
+        mock_fetch.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_fresh_statements_are_cached(self, enhanced_service):
+        """A fresh extraction is stored with the longer statements TTL."""
+        with patch('yfinance.Ticker') as mock_ticker, \
+             patch('app.services.data_service.intelligent_cache') as mock_cache:
+            mock_ticker.return_value.financials = FINANCIALS
+            mock_ticker.return_value.balance_sheet = BALANCE_SHEET
+            mock_ticker.return_value.cashflow = CASHFLOW
+            mock_cache.get = AsyncMock(return_value=None)
+            mock_cache.set = AsyncMock(return_value=True)
+
+            result = await enhanced_service.get_financial_data("TCS")
+
+        stored = mock_cache.set.await_args
+        assert stored.args[2] == result.dict()
+        assert stored.kwargs["ttl"] == DataService.financial_statements_ttl
+
+    @pytest.mark.asyncio
+    async def test_direct_callers_share_the_statements_cache(self):
+        """DataService.get_financial_data_cached serves the same cached extraction without yfinance."""
+        cached = {"ticker": "TCS.NS", "years": [2023], "revenue": [2.0], "ebitda": [1.0], "net_income": [1.0],
+                  "free_cash_flow": [1.0], "total_debt": [1.0], "cash": [1.0], "shares_outstanding": [1.0]}
+
+        with patch.object(DataService, 'get_financial_data') as mock_fetch, \
+             patch('app.services.data_service.intelligent_cache') as mock_cache:
+            mock_cache.get = AsyncMock(return_value=cached)
+            result = await DataService.get_financial_data_cached("TCS.NS")
+
+        assert result.revenue == [2.0]
+        assert mock_cache.get.await_args.kwargs == {"dataset": "dcf_financials", "years": 5}
+        mock_fetch.assert_not_called()
@@ -0,0 +1,100 @@
+import pytest
+import asyncio
+from unittest.mock import patch, MagicMock, AsyncMock
+from app.services.dcf_ai_insights_service import DCFAIInsightsService
+
+DCF_RESULT = {"fairValue": 4200.0, "currentPrice": 3900.0, "upside": 7.7, "method": "DCF", "confidence": 0.7}
+ASSUMPTIONS = {"wacc": 11.5, "revenue_growth_rate": 9.0, "terminal_growth_rate": 4.0}
+COMPANY_DATA = {"name": "Tata Consultancy Services", "sector": "IT Services"}
+
+class TestDCFAIInsightsService:
+    """Test cases for DCF AI insights generation."""
+
+    @pytest.fixture
+    def insights_service(self):
+        """Create a DCFAIInsightsService instance."""
+        return DCFAIInsightsService()
+
+    def test_input_hash_is_stable_and_order_independent(self):
+        """The cache fingerprint ignores key order and changes with the assumptions."""
+        reordered = dict(reversed(list(DCF_RESULT.items())))
+
+        assert DCFAIInsightsService._hash_inputs(DCF_RESULT, ASSUMPTIONS) == DCFAIInsightsService._hash_inputs(reordered, ASSUMPTIONS)
+        assert DCFAIInsightsService._hash_inputs(DCF_RESULT, ASSUMPTIONS) != DCFAIInsightsService._hash_inputs(DCF_RESULT, {**ASSUMPTIONS, "wacc": 12.0})
+
+    @pytest.mark.asyncio
+    async def test_cached_insights_skip_claude(self, insights_service):
+        """A cache hit is returned without constructing a Claude client."""
+        with patch('app.services.dcf_ai_insights_service.intelligent_cache') as mock_cache, \
+             patch('app.services.dcf_ai_insights_service.ClaudeService') as mock_claude:
+            mock_cache.get = AsyncMock(return_value={"investment_thesis_summary": "cached"})
+            result = await insights_service.generate_dcf_insights("TCS.NS", DCF_RESULT, ASSUMPTIONS, COMPANY_DATA)
+
+        assert result == {"investment_thesis_summary": "cached"}
+        mock_claude.assert_not_called()
+        assert mock_cache.get.await_args.kwargs["dcf_hash"].endswith(DCFAIInsightsService._hash_inputs(DCF_RESULT, ASSUMPTIONS))
+
+    def test_parse_fills_missing_fields_with_defaults(self, insights_service):
+        """Fields Claude omitted get defaults; token usage comes from the API report."""
+        analysis = {"investment_thesis_summary": "Fairly valued.", "smart_risk_flags": ["Rupee strength"]}
+
+        insights = insights_service._parse_dcf_insights(analysis, DCF_RESULT, ASSUMPTIONS, {"output_tokens": 180})
+        assert insights['investment_thesis_summary'] == "Fairly valued."
+        assert insights['smart_risk_flags'] == ["Rupee strength"]
+        assert insights['key_catalysts']
+        assert insights['model_used'] == 'claude-3-haiku-20240307'
+        assert insights['token_usage']['tokens'] == 180
+
+    def test_parse_falls_back_without_json(self, insights_service):
+        """Responses without a parseable JSON object produce the quantitative fallback insights."""
+        insights = insights_service._parse_dcf_insights(None, DCF_RESULT, ASSUMPTIONS, {"output_tokens": 40})
+        assert insights['model_used'] == 'fallback_sophisticated'
+
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_claude_call(self, insights_service):
+        """Identical requests arriving while Claude is busy await the first one's result."""
+        async def slow_completion(**kwargs):
+            await asyncio.sleep(0.01)
+            return {"investment_thesis_summary": "Fairly valued."}, {"output_tokens": 12}
+
+        with patch('app.services.dcf_ai_insights_service.intelligent_cache') as mock_cache, \
+             patch('app.services.dcf_ai_insights_service.ClaudeService') as mock_claude:
+            mock_cache.get = AsyncMock(return_value=None)
+            mock_cache.set = AsyncMock(return_value=True)
+            mock_claude.return_value.is_available.return_value = True
+            mock_claude.return_value.generate_json_completion = AsyncMock(side_effect=slow_completion)
+
+            results = await asyncio.gather(*[
+                insights_service.generate_dcf_insights("TCS.NS", DCF_RESULT, ASSUMPTIONS, COMPANY_DATA)
+                for _ in range(3)
+            ])
+
+        assert mock_claude.return_value.generate_json_completion.await_count == 1
+        assert all(r['investment_thesis_summary'] == "Fairly valued." for r in results)
+        assert insights_service._inflight == {}
+
+    def test_claude_service_reused_across_requests(self, insights_service):
+        """One ClaudeService is created lazily and then only has its API key refreshed."""
+        with patch('app.services.dcf_ai_insights_service.ClaudeService') as mock_claude:
+            first = insights_service._get_claude_service()
+            second = insights_service._get_claude_service()
+
+        assert first is second
+        mock_claude.assert_called_once()
+        mock_claude.return_value.reinitialize_client.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_empty_claude_output_reports_api_error(self, insights_service):
+        """A completion with no output tokens is surfaced as an API error and not cached."""
+        with patch('app.services.dcf_ai_insights_service.intelligent_cache') as mock_cache, \
+             patch('app.services.dcf_ai_insights_service.ClaudeService') as mock_claude:
+            mock_cache.get = AsyncMock(return_value=None)
+            mock_cache.set = AsyncMock(return_value=True)
+            mock_claude.return_value.is_available.return_value = True
+            mock_claude.return_value.generate_json_completion = AsyncMock(return_value=(None, {}))
+
+            result = await insights_service.generate_dcf_insights("TCS.NS", DCF_RESULT, ASSUMPTIONS, COMPANY_DATA)
+
+        assert result['error_type'] == "api_error"
+        mock_cache.set.assert_not_called()
+        assert mock_claude.return_value.generate_json_completion.await_args.kwargs["max_tokens"] == 800
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+from app.services.dcf_service import DCFService
+from app.models.dcf import FinancialData, DCFAssumptions
+
+@pytest.fixture
+def financial_data():
+    """Three years of statements, newest first."""
+    return FinancialData(
+        ticker="TCS.NS",
+        years=[2024, 2023, 2022],
+        revenue=[2400.0, 2250.0, 1920.0],
+        ebitda=[650.0, 600.0, 500.0],
+        net_income=[460.0, 420.0, 380.0],
+        free_cash_flow=[400.0, 380.0, 330.0],
+        total_debt=[80.0, 90.0, 100.0],
+        cash=[300.0, 250.0, 200.0],
+        shares_outstanding=[3.6, 0.0, 3.7]
+    )
+
+@pytest.fixture
+def assumptions():
+    """Base-case DCF assumptions."""
+    return DCFAssumptions(
+        revenue_growth_rate=10.0,
+        ebitda_margin=26.0,
+        tax_rate=25.0,
+        wacc=11.0,
+        terminal_growth_rate=4.0,
+        projection_years=5
+    )
+
+class TestDCFService:
+    """Test cases for the simple DCF model."""
+
+    def test_projections_compound_from_base_year(self, financial_data, assumptions):
+        """Each projection year grows revenue from the latest year and discounts its FCF at WACC."""
+        projections = DCFService._project_cash_flows(financial_data, assumptions)
+
+        assert [p.year for p in projections] == [2025, 2026, 2027, 2028, 2029]
+        assert projections[0].revenue == pytest.approx(2640.0)
+        assert projections[0].working_capital_change == pytest.approx(2.4)
+        assert [p.free_cash_flow for p in projections] == pytest.approx([479.4, 527.34, 580.074, 638.0814, 701.88954])
+        assert projections[-1].present_value == pytest.approx(701.88954 / 1.11 ** 5)
+        assert all(type(p.revenue) is float for p in projections)
+
+    def test_calculate_dcf(self, financial_data, assumptions):
+        """Terminal, enterprise and per-share values follow from the projections."""
+        valuation = DCFService.calculate_dcf(financial_data, assumptions, current_price=3900.0)
+
+        assert valuation.terminal_value == pytest.approx(6188.553869284963)
+        assert valuation.enterprise_value == pytest.approx(8309.453106309758)
+        assert valuation.intrinsic_value_per_share == pytest.approx(2305.2575962999344)
+        assert valuation.upside_downside == pytest.approx((2305.2575962999344 / 3900.0 - 1) * 100)
+
+    def test_sensitivity_grid_matches_full_dcf(self, financial_data, assumptions):
+        """Every cell of the broadcast grid equals a full DCF run at that WACC and terminal growth."""
+        analysis = DCFService.generate_sensitivity_analysis(financial_data, assumptions)
+
+        assert analysis.wacc_range == [10.0, 10.5, 11.0, 11.5, 12.0]
+        assert analysis.terminal_growth_range == [3.0, 3.5, 4.0, 4.5, 5.0]
+        for i, wacc in enumerate(analysis.wacc_range):
+            for j, terminal_growth in enumerate(analysis.terminal_growth_range):
+                cell = assumptions.model_copy(update={"wacc": wacc, "terminal_growth_rate": terminal_growth})
+                expected = DCFService.calculate_dcf(financial_data, cell).intrinsic_value_per_share
+                assert analysis.sensitivity_matrix[i][j] == pytest.approx(expected)
+        assert analysis.sensitivity_matrix[2][2] == pytest.approx(2305.2575962999344)
+
+    def test_sensitivity_empty_when_wacc_equals_terminal_growth(self, financial_data, assumptions):
+        """A grid cell where WACC meets terminal growth invalidates the analysis, as before."""
+        cell = assumptions.model_copy(update={"wacc": 5.0})
+
+        assert DCFService.generate_sensitivity_analysis(financial_data, cell).sensitivity_matrix == []
+
+    def test_historical_averages_skip_non_positive_denominators(self):
+        """Growth and margin averages ignore years without positive revenue."""
+        assert DCFService._calculate_average_growth_rate([2400.0, 2250.0, 1920.0]) == pytest.approx(11.927083333333332)
+        assert DCFService._calculate_average_growth_rate([1100.0, 1000.0, 0.0]) == pytest.approx(10.0)
+        assert DCFService._calculate_average_growth_rate([500.0, 0.0]) == 8.0
+        assert DCFService._calculate_average_margin([2400.0, 0.0, 1920.0], [650.0, 10.0, 500.0]) == pytest.approx((650 / 2400 + 500 / 1920) / 2 * 100)
+        assert DCFService._calculate_average_margin([100.0], [300.0]) == 50.0
+
+    def test_latest_shares_outstanding(self, financial_data):
+        """The last positive share count is used, falling back to 1."""
+        assert DCFService._latest_shares_outstanding(financial_data) == 3.7
+        assert DCFService._latest_shares_outstanding(financial_data.model_copy(update={"shares_outstanding": [3.6, 0.0]})) == 3.6
+        assert DCFService._latest_shares_outstanding(financial_data.model_copy(update={"shares_outstanding": [0.0, -1.0]})) == 1
+
+    @pytest.mark.asyncio
+    async def test_default_assumptions_fetch_price_and_wacc_concurrently(self, financial_data):
+        """The blocking price lookup runs in a thread while sector WACC is awaited."""
+        price_started = threading.Event()
+
+        def get_price(ticker):
+            price_started.set()
+            return 3500.0
+
+        async def calculate_wacc(sector):
+            # Only completes if the price fetch is already running alongside it
+            for _ in range(100):
+                if price_started.is_set():
+                    return 0.115
+                await asyncio.sleep(0.01)
+            raise AssertionError("price fetch did not run concurrently")
+
+        price = MagicMock(get_price_for_dcf=get_price)
+        sector_service = MagicMock(calculate_wacc=calculate_wacc)
+        sector_service.get_sector_intelligence.return_value = SimpleNamespace(
+            terminal_growth_rate=0.05, effective_tax_rate=0.22
+        )
+
+        with patch("app.services.dcf_service.price_service", price), \
+             patch("app.services.dcf_service.sector_intelligence_service", sector_service):
+            defaults = await DCFService.calculate_default_assumptions(financial_data, "TCS.NS", "IT")
+
+        assert defaults.current_price == 3500.0
+        assert defaults.wacc == pytest.approx(11.5)
+        assert defaults.terminal_growth_rate == pytest.approx(5.0)
+        assert defaults.tax_rate == pytest.approx(22.0)
+
+    @pytest.mark.asyncio
+    async def test_default_assumptions_fall_back_on_fetch_errors(self, financial_data):
+        """A failing price or sector lookup keeps the standard fallbacks."""
+        price = MagicMock()
+        price.get_price_for_dcf.side_effect = RuntimeError("yfinance down")
+        sector_service = MagicMock()
+        sector_service.get_sector_intelligence.side_effect = KeyError("IT")
+
+        with patch("app.services.dcf_service.price_service", price), \
+             patch("app.services.dcf_service.sector_intelligence_service", sector_service):
+            defaults = await DCFService.calculate_default_assumptions(financial_data, "TCS.NS", "IT")
+
+        assert defaults.current_price == 0.0
+        assert (defaults.wacc, defaults.terminal_growth_rate, defaults.tax_rate) == (12.0, 4.0, 25.0)
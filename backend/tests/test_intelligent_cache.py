@@ -1,5 +1,6 @@
 import pytest
 import asyncio
+import numpy as np
 import tempfile
 import shutil
 from datetime import datetime, timedelta
@@ -108,6 +109,15 @@ class TestIntelligentCacheManager:
             CacheType.NEWS_ARTICLES, 'TCS.NS', max_articles=10
         )
         assert key4 != key5
+        
+        # Parameter order, including inside nested values, should not affect key
+        key6 = cache_manager._generate_cache_key(
+            CacheType.AI_INSIGHTS, 'TCS.NS', dataset='dcf', params={'wacc': 11.5, 'growth': 9.0}
+        )
+        key7 = cache_manager._generate_cache_key(
+            CacheType.AI_INSIGHTS, 'TCS.NS', params={'growth': 9.0, 'wacc': 11.5}, dataset='dcf'
+        )
+        assert key6 == key7
     
     @pytest.mark.asyncio
     async def test_cache_set_and_get(self, cache_manager, sample_financial_data):
@@ -168,6 +178,24 @@ class TestIntelligentCacheManager:
             # Restore original TTL
             cache_manager.ttl_config[CacheType.FINANCIAL_DATA] = original_ttl
     
+    @pytest.mark.asyncio
+    async def test_per_entry_ttl_override(self, cache_manager):
+        """Test per-entry TTL overrides the cache type default."""
+        
+        await cache_manager.set(
+            CacheType.AGENT_OUTPUTS, 'technical_analyst', {'text': 'summary'},
+            ttl=timedelta(milliseconds=100), content_hash='abc'
+        )
+        
+        cached_data = await cache_manager.get(CacheType.AGENT_OUTPUTS, 'technical_analyst', content_hash='abc')
+        assert cached_data == {'text': 'summary'}
+        
+        await asyncio.sleep(0.2)
+        
+        # Type default is 24h, but the entry's own TTL has elapsed
+        cached_data = await cache_manager.get(CacheType.AGENT_OUTPUTS, 'technical_analyst', content_hash='abc')
+        assert cached_data is None
+    
     @pytest.mark.asyncio
     async def test_cache_with_parameters(self, cache_manager, sample_news_data):
         """Test cache key generation with additional parameters."""
@@ -382,6 +410,55 @@ class TestIntelligentCacheManager:
         # Should have 2 cache files
         cache_files = list(cache_manager.cache_dir.glob('*.json'))
         assert len(cache_files) == 2
+    
+    @pytest.mark.asyncio
+    async def test_concurrent_sets_same_key(self, cache_manager):
+        """Concurrent writes of one key never leave partial files behind."""
+        
+        results = await asyncio.gather(*(
+            cache_manager.set(CacheType.AI_ANALYSIS, 'TCS.NS', {'version': i}) for i in range(5)
+        ))
+        
+        assert all(results)
+        assert list(cache_manager.cache_dir.glob('*.tmp')) == []
+        cached_data = await cache_manager.get(CacheType.AI_ANALYSIS, 'TCS.NS')
+        assert cached_data['version'] in range(5)
+    
+    @pytest.mark.asyncio
+    async def test_peek_serves_recent_entries_from_memory(self, cache_manager):
+        """Test peek() returns entries this process wrote or read, and forgets invalidated ones."""
+        
+        assert cache_manager.peek(CacheType.FINANCIAL_DATA, 'TCS.NS') is None
+        
+        # Returned entries are copies of what was stored
+        await cache_manager.set(CacheType.FINANCIAL_DATA, 'TCS.NS', {'price': 1})
+        peeked = cache_manager.peek(CacheType.FINANCIAL_DATA, 'TCS.NS')
+        peeked['price'] = 2
+        assert cache_manager.peek(CacheType.FINANCIAL_DATA, 'TCS.NS') == {'price': 1}
+        
+        await cache_manager.invalidate(CacheType.FINANCIAL_DATA, 'TCS.NS')
+        assert cache_manager.peek(CacheType.FINANCIAL_DATA, 'TCS.NS') is None
+        
+        # Expired entries are never served
+        await cache_manager.set(CacheType.FINANCIAL_DATA, 'INFY.NS', {'price': 3}, ttl=timedelta(seconds=-1))
+        assert cache_manager.peek(CacheType.FINANCIAL_DATA, 'INFY.NS') is None
+    
+    @pytest.mark.asyncio
+    async def test_round_trips_numpy_datetimes_and_int_keys(self, cache_manager):
+        """Test entries with numpy scalars, datetimes and int keys survive a write and a fresh read."""
+        
+        await cache_manager.set(CacheType.FINANCIAL_DATA, 'TCS.NS', {
+            'eps': np.float64(12.5),
+            'shares': np.int64(3_000_000),
+            'as_of': datetime(2024, 3, 31, 15, 30),
+            'yearly': {2023: 10.0}
+        })
+        
+        # Read back through a fresh manager so the entry comes from disk
+        fresh_manager = IntelligentCacheManager(cache_dir=str(cache_manager.cache_dir))
+        cached_data = await fresh_manager.get(CacheType.FINANCIAL_DATA, 'TCS.NS')
+        
+        assert cached_data == {'eps': 12.5, 'shares': 3_000_000, 'as_of': '2024-03-31T15:30:00', 'yearly': {'2023': 10.0}}
 
 if __name__ == "__main__":
-    pytest.main([__file__, "-v"])
\ No newline at end of file
+    pytest.main([__file__, "-v"])